@@ -0,0 +1,59 @@
+"""
+This file contains a benchmark to validate the performance of Locust itself.
+More precisely, the performance of `Runner.stop_users` and `Runner.user_classes_count`
+when ramping down a large number of running users. This benchmark is to be used
+by people working on Locust's development.
+"""
+
+from locust import User, constant
+from locust.env import Environment
+
+import argparse
+import gc
+import time
+
+import gevent
+from prettytable import PrettyTable
+
+NUMBER_OF_USER_CLASSES: int = 5
+USER_CLASSES: list[type[User]] = [
+    type(f"User{i}", (User,), {"wait_time": constant(600), "tasks": [lambda user: None]})
+    for i in range(NUMBER_OF_USER_CLASSES)
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-u", "--users", default=100_000, type=int, help="number of users to ramp down from")
+    parser.add_argument("-s", "--steps", default=10, type=int, help="number of ramp-down steps")
+    args = parser.parse_args()
+
+    environment = Environment(user_classes=USER_CLASSES)
+    runner = environment.create_local_runner()
+    users_per_class = args.users // NUMBER_OF_USER_CLASSES
+
+    ts = time.perf_counter()
+    runner.spawn_users({user_class.__name__: users_per_class for user_class in USER_CLASSES})
+    gevent.sleep(0)  # let the users start, so that they are waiting when they are stopped
+    spawn_duration = time.perf_counter() - ts
+
+    table = PrettyTable()
+    table.field_names = ["Step", "Running users", "stop_users (ms)", "user_classes_count (ms)"]
+    table.align = "r"
+
+    step_count = users_per_class // args.steps
+    for step in range(1, args.steps + 1):
+        gc.disable()
+        ts = time.perf_counter()
+        runner.stop_users({user_class.__name__: step_count for user_class in USER_CLASSES})
+        stop_duration = time.perf_counter() - ts
+        gevent.sleep(0)  # let the stopped greenlets finish
+        ts = time.perf_counter()
+        runner.user_classes_count
+        count_duration = time.perf_counter() - ts
+        gc.enable()
+        table.add_row([step, f"{runner.user_count:,}", f"{1000 * stop_duration:.1f}", f"{1000 * count_duration:.3f}"])
+
+    print(f"Spawned {users_per_class * NUMBER_OF_USER_CLASSES:,} users in {spawn_duration:.1f}s")
+    print(table)
+    runner.quit()
@@ -0,0 +1,80 @@
+"""
+This file contains a benchmark to validate the performance of Locust itself.
+More precisely, the hub overhead and the wake-up jitter of users waiting for their
+wait_time, with and without the timer wheel (--timer-wheel). This benchmark is to be used
+by people working on Locust's development.
+"""
+
+from locust import User, task
+from locust.env import Environment
+from locust.timer_wheel import TimerWheel
+
+import argparse
+import random
+import time
+
+import gevent
+from prettytable import PrettyTable
+
+
+class SleepingUser(User):
+    max_wait = 10.0
+    lateness: list[float] = []
+
+    def wait_time(self):
+        seconds = random.uniform(self.max_wait / 2, self.max_wait)
+        self.deadline = time.perf_counter() + seconds
+        return seconds
+
+    @task
+    def t(self):
+        deadline = getattr(self, "deadline", None)
+        if deadline is not None:
+            SleepingUser.lateness.append(time.perf_counter() - deadline)
+
+
+def percentile(values: list[float], percent: float) -> float:
+    return values[min(int(len(values) * percent), len(values) - 1)]
+
+
+def run(user_count: int, timer_wheel: bool, duration: float) -> list:
+    environment = Environment(user_classes=[SleepingUser])
+    environment.timer_wheel = TimerWheel() if timer_wheel else None
+    runner = environment.create_local_runner()
+    runner.spawn_users({SleepingUser.__name__: user_count})
+    # let every user get through its first (unmeasured) wait
+    gevent.sleep(SleepingUser.max_wait)
+
+    SleepingUser.lateness = []
+    cpu = time.process_time()
+    gevent.sleep(duration)
+    cpu = time.process_time() - cpu
+    lateness = sorted(SleepingUser.lateness)
+    runner.quit()
+
+    return [
+        f"{user_count:,}",
+        "timer wheel" if timer_wheel else "gevent",
+        f"{len(lateness) / duration:,.0f}",
+        f"{100 * cpu / duration:.1f}",
+        f"{1000 * percentile(lateness, 0.5):.2f}",
+        f"{1000 * percentile(lateness, 0.99):.2f}",
+        f"{1000 * lateness[-1]:.2f}",
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-u", "--users", default=[10_000, 100_000], type=int, nargs="+", help="numbers of users")
+    parser.add_argument("-w", "--max-wait", default=10.0, type=float, help="users wait between half this and this")
+    parser.add_argument("-d", "--duration", default=10.0, type=float, help="seconds to measure for")
+    args = parser.parse_args()
+    SleepingUser.max_wait = args.max_wait
+
+    table = PrettyTable()
+    table.field_names = ["Users", "Sleep", "Wake-ups/s", "CPU (%)", "Late p50 (ms)", "Late p99 (ms)", "Late max (ms)"]
+    table.align = "r"
+    for user_count in args.users:
+        for timer_wheel in [False, True]:
+            table.add_row(run(user_count, timer_wheel, args.duration))
+    print(table)
@@ -328,6 +328,11 @@ def parse_locustfile_option(args=None) -> tuple[argparse.Namespace, list[str]]:
         action="store_true",
         env_var="LOCUST_MODE_WORKER",
     )
+    parser.add_argument(
+        "--relay",
+        action="store_true",
+        env_var="LOCUST_MODE_RELAY",
+    )
     parser.add_argument(
         "--master",  # this is just here to prevent argparse from giving the dreaded "ambiguous option: --master could match --master-host, --master-port"
         action="store_true",
@@ -382,7 +387,7 @@ def parse_locustfiles_from_master(locustfile_sources) -> list[str]:
 
 
 def retrieve_locustfiles_from_master(options) -> list[str]:
-    if not options.worker:
+    if not options.worker and not options.relay:
         sys.stderr.write(
             "locustfile was set to '-' (meaning to download from master) but --worker was not specified.\n"
         )
@@ -494,6 +499,20 @@ def setup_parser_arguments(parser):
         help="Rate to spawn users at (users per second). Primarily used together with --headless or --autostart",
         env_var="LOCUST_SPAWN_RATE",
     )
+    parser.add_argument(
+        "--arrival-rate",
+        type=gt_zero(float),
+        metavar="<float>",
+        help="Use an open workload model: start this many task iterations per second (in total), no matter how long they take, instead of having each user wait its wait_time between tasks. Users are only used as a pool of concurrent iterations, so set -u high enough",
+        env_var="LOCUST_ARRIVAL_RATE",
+    )
+    parser.add_argument(
+        "--correct-coordinated-omission",
+        action="store_true",
+        default=False,
+        help="Also record response times corrected for coordinated omission (the requests that paced users or --arrival-rate iterations should have made while waiting for a slow response), and report their percentiles next to the regular ones",
+        env_var="LOCUST_CORRECT_COORDINATED_OMISSION",
+    )
     parser.add_argument(
         "-t",
         "--run-time",
@@ -672,6 +691,20 @@ def setup_parser_arguments(parser):
         dest="enable_rebalancing",
         help="Re-distribute users if new workers are added or removed during a test run. Experimental.",
     )
+    master_group.add_argument(
+        "--rpc-compression",
+        choices=["none", "zlib", "lz4"],
+        default="none",
+        help="Ask workers to compress large stats reports sent to the master. lz4 requires the lz4 package on both master and workers. Defaults to none.",
+        env_var="LOCUST_RPC_COMPRESSION",
+    )
+    master_group.add_argument(
+        "--rpc-decode-thread",
+        action="store_true",
+        default=False,
+        help="Decode large messages from workers (typically stats reports) in a separate thread, so that the web UI and heartbeats stay responsive on a busy master. Also used by relays. Experimental.",
+        env_var="LOCUST_RPC_DECODE_THREAD",
+    )
     master_group.add_argument(
         "--expect-slaves",
         action=raise_argument_type_error("The --expect-slaves parameter has been renamed --expect-workers"),
@@ -690,6 +723,12 @@ Typically ONLY these options (and --locustfile) need to be specified on workers,
         help="Set locust to run in distributed mode with this process as worker. Can be combined with setting --locustfile to '-' to download it from master.",
         env_var="LOCUST_MODE_WORKER",
     )
+    worker_group.add_argument(
+        "--relay",
+        action="store_true",
+        help="Set locust to run as a relay between the master (see --master-host/--master-port) and workers, which connect to the relay like they would to a master (see --master-bind-host/--master-bind-port). The relay merges the stats reports of its workers, which lets a master handle a lot more workers. Experimental.",
+        env_var="LOCUST_MODE_RELAY",
+    )
     worker_group.add_argument(
         "--processes",
         type=int,
@@ -782,6 +821,14 @@ Typically ONLY these options (and --locustfile) need to be specified on workers,
         help="Reset statistics once spawning has been completed. Should be set on both master and workers when running in distributed mode",
         env_var="LOCUST_RESET_STATS",
     )
+    stats_group.add_argument(
+        "--max-request-names",
+        type=int,
+        default=1000,
+        metavar="<int>",
+        help="Maximum number of entries (distinct request name and type combinations) in the statistics. Once it is reached, new names are grouped by URL template (with numbers, UUIDs and hex ids replaced by placeholders), or else into a single 'Other' entry. 0 means no limit. Default: 1000",
+        env_var="LOCUST_MAX_REQUEST_NAMES",
+    )
     stats_group.add_argument(
         "--html",
         metavar="<filename>",
@@ -873,6 +920,34 @@ Typically ONLY these options (and --locustfile) need to be specified on workers,
         dest="equal_weights",
         help="Use equally distributed task weights, overriding the weights specified in the locustfile.",
     )
+    other_group.add_argument(
+        "--timer-wheel",
+        action="store_true",
+        default=False,
+        help="Wake users up after their wait_time using a single timer wheel, instead of a gevent timer per user. Reduces the overhead of running a very large number of (mostly idle) users",
+        env_var="LOCUST_TIMER_WHEEL",
+    )
+    other_group.add_argument(
+        "--event-listener-timing",
+        action="store_true",
+        default=False,
+        help="Record the number of calls and the total and max time spent in each event listener (e.g. request event listeners). Shown at /stats/listeners and in the HTML report",
+        env_var="LOCUST_EVENT_LISTENER_TIMING",
+    )
+    other_group.add_argument(
+        "--no-hub-lag-monitor",
+        action="store_true",
+        default=False,
+        help="Don't measure the gevent hub lag, or count the requests that were running while it lagged. Also leaves out the hub lag columns of the CSV files",
+        env_var="LOCUST_NO_HUB_LAG_MONITOR",
+    )
+    other_group.add_argument(
+        "--batch-request-events",
+        action="store_true",
+        default=False,
+        help="Record requests in the statistics in batches (every 0.1s or 1000 requests), instead of as each request event is fired. Reduces the overhead per request. Ignored when using --correct-coordinated-omission",
+        env_var="LOCUST_BATCH_REQUEST_EVENTS",
+    )
     other_group.add_argument(
         "--profile",
         type=str,
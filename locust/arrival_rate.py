@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import logging
+import time
+
+import gevent
+from gevent.event import Event
+from gevent.queue import Channel, Full
+
+logger = logging.getLogger(__name__)
+
+"""An iteration that starts more than this many seconds after it was scheduled is counted as late"""
+LATE_ITERATION_THRESHOLD = 0.1
+"""Minimum number of seconds between warnings about dropped iterations"""
+DROPPED_WARNING_INTERVAL = 10.0
+
+
+class ArrivalRateScheduler:
+    """
+    Starts task iterations at a fixed rate (open workload model), instead of letting each user run its
+    tasks back to back separated by its wait_time (closed workload model).
+
+    The running users form a pool: a user that has finished a task waits (see :meth:`wait_for_iteration`)
+    until the scheduler hands it the next iteration. If every user is busy when an iteration is due, the
+    iteration is dropped, so the number of users (-u) is the maximum number of concurrent iterations.
+    """
+
+    def __init__(self, rate: float = 0.0) -> None:
+        """
+        :param rate: Number of iterations to start per second
+        """
+        self.rate = rate
+        self.dropped_iterations = 0
+        self.late_iterations = 0
+        # handing over an iteration (its intended start time) only succeeds if a user is waiting for one
+        self._idle_users: Channel = Channel()
+        # set when a user starts waiting for an iteration
+        self._user_ready = Event()
+        self._last_dropped_warning = 0.0
+
+    def set_rate(self, rate: float) -> None:
+        self.rate = rate
+
+    def reset_counters(self) -> None:
+        self.dropped_iterations = 0
+        self.late_iterations = 0
+
+    def wait_for_iteration(self) -> float:
+        """
+        Block the calling user until it is its turn to start an iteration
+
+        :returns: How many seconds later than scheduled the iteration starts
+        """
+        self._user_ready.set()
+        intended_start = self._idle_users.get()
+        lag = time.perf_counter() - intended_start
+        if lag > LATE_ITERATION_THRESHOLD:
+            self.late_iterations += 1
+        return lag
+
+    def run(self) -> None:
+        # the runner starts the scheduler before spawning the users, so don't drop iterations until one is ready
+        if self._idle_users.balance >= 0:
+            self._user_ready.clear()
+            self._user_ready.wait()
+        next_iteration = time.perf_counter()
+        while True:
+            if self.rate <= 0:
+                gevent.sleep(0.1)
+                next_iteration = time.perf_counter()
+                continue
+            now = time.perf_counter()
+            while next_iteration <= now:
+                try:
+                    self._idle_users.put_nowait(next_iteration)
+                except Full:
+                    self.dropped_iterations += 1
+                    if now - self._last_dropped_warning > DROPPED_WARNING_INTERVAL:
+                        self._last_dropped_warning = now
+                        logger.warning(
+                            "All users were busy when an iteration was due, so it was dropped (%d dropped so far). Increase the number of users to sustain an arrival rate of %g/s",
+                            self.dropped_iterations,
+                            self.rate,
+                        )
+                next_iteration += 1 / self.rate
+            gevent.sleep(next_iteration - now)
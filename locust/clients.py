@@ -19,7 +19,7 @@ from requests.compat import basestring
 from requests.exceptions import InvalidSchema, InvalidURL, MissingSchema, RequestException
 from requests.utils import DEFAULT_CA_BUNDLE_PATH, extract_zipped_paths
 from urllib3 import PoolManager
-from urllib3.util import create_urllib3_context
+from urllib3.util import Retry, create_urllib3_context
 
 from .exception import CatchResponseError, LocustError, ResponseError
 
@@ -115,8 +115,10 @@ class HttpSession(requests.Session):
             # configure requests to use basic auth
             self.auth = HTTPBasicAuth(parsed_url.username, parsed_url.password)
 
-        self.mount("https://", LocustHttpAdapter(pool_manager=pool_manager))
-        self.mount("http://", LocustHttpAdapter(pool_manager=pool_manager))
+        # a single adapter handles both schemes (just like a single PoolManager does)
+        adapter = LocustHttpAdapter(pool_manager=pool_manager)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
 
     def _build_url(self, path) -> str:
         """prepend url with hostname unless it's already an absolute URL"""
@@ -478,14 +480,36 @@ class ResponseContextManager(Response):
         self._manual_result = exc
 
 
+# Same as the default of HTTPAdapter. Retry objects are never modified, so all adapters can share one
+_NO_RETRIES = Retry(0, read=False)
+
+
 class LocustHttpAdapter(HTTPAdapter):
+    _poolmanager: PoolManager | None = None
+    _poolmanager_args: tuple[tuple, dict] | None = None
+
     def __init__(self, pool_manager: PoolManager | None, *args, **kwargs):
-        self.poolmanager = pool_manager
+        self._poolmanager = pool_manager
+        if not args:
+            kwargs.setdefault("max_retries", _NO_RETRIES)
         super().__init__(*args, **kwargs)
 
     def init_poolmanager(self, *args, **kwargs):
-        if self.poolmanager is None:
+        # Creating a PoolManager is the most expensive part of creating an HttpUser, so
+        # we postpone it until it is used (which also spreads the cost out during ramp-up)
+        if self._poolmanager is None:
+            self._poolmanager_args = (args, kwargs)
+
+    @property
+    def poolmanager(self) -> PoolManager:
+        if self._poolmanager is None and self._poolmanager_args is not None:
+            args, kwargs = self._poolmanager_args
             super().init_poolmanager(*args, **kwargs)
+        return self._poolmanager  # type: ignore[return-value]
+
+    @poolmanager.setter
+    def poolmanager(self, pool_manager: PoolManager) -> None:
+        self._poolmanager = pool_manager
 
     # In python requests version 2.32.5 they reverted
     # https://github.com/psf/requests/pull/6667
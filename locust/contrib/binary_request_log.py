@@ -0,0 +1,382 @@
+"""
+Compact binary per-request log for Locust.
+
+Like :mod:`locust.contrib.csv_request_logger`, this records every completed
+request, but in a fixed-size binary record (36 bytes, instead of about 80 for
+a CSV row) that is written through a memory-mapped file, so that logging a
+request costs very little even in long soak tests.  The log can later be
+re-aggregated into the same statistics that Locust itself produces, e.g. with
+different percentiles or for a part of the run only.
+
+Usage::
+
+    from locust import HttpUser, task, events
+    from locust.contrib.binary_request_log import BinaryRequestLogger
+
+    logger = BinaryRequestLogger("results/requests.bin")
+
+    @events.init.add_listener
+    def on_locust_init(environment, **kwargs):
+        logger.register(environment)
+
+Reading the log back::
+
+    $ python -m locust.contrib.binary_request_log results/requests.bin --start 60 --percentiles 0.5,0.99,0.999
+
+or from Python, using :func:`iter_requests` and :func:`aggregate`.
+
+File format
+-----------
+The log consists of two files:
+
+``<filepath>``
+    A 24 byte header (the magic bytes ``LOCUSTRL``, the format version, the
+    record size and the number of records), followed by one record per
+    request: timestamp (float64, seconds), response time (float64, ms, NaN
+    when it was ``None``), name id, request type id, error id, response
+    length (uint32 each) and status code (uint16).  All values are little
+    endian.
+``<filepath>.strings``
+    The string table: each name, request type and error message that occurs
+    in the log, as a uint32 length followed by that many bytes of UTF-8.
+    The id of a string is its position in the table.  Id 0 is the empty
+    string, which is used as the error of successful requests.
+
+Errors are stored the way :class:`~locust.stats.StatsError` identifies them,
+so re-aggregated failures are grouped exactly like in the live run.  The
+header's record count is updated after each request, so if Locust crashes the
+log is still readable up to the last request.
+"""
+
+from __future__ import annotations
+
+from locust import stats as stats_module
+from locust.contrib.csv_request_logger import CSV_COLUMNS, _status_code
+from locust.stats import RequestStats, StatsError
+
+import argparse
+import csv
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+    from locust.env import Environment
+
+MAGIC = b"LOCUSTRL"
+VERSION = 1
+
+#: magic, version, record size, (reserved), number of records
+HEADER = struct.Struct("<8sHHIQ")
+_COUNT = struct.Struct("<Q")
+_COUNT_OFFSET = HEADER.size - _COUNT.size
+#: timestamp, response time, name id, request type id, error id, response length, status code
+RECORD = struct.Struct("<ddIIIIH2x")
+STRING_LENGTH = struct.Struct("<I")
+
+#: The log file is grown by this many records at a time
+GROW_BY_RECORDS = 32768
+
+_MAX_UINT32 = 0xFFFFFFFF
+_MAX_UINT16 = 0xFFFF
+
+
+class LoggedRequest(NamedTuple):
+    timestamp: float
+    request_type: str
+    name: str
+    response_time: float | None
+    response_length: int
+    status_code: int
+    error: str | None
+
+
+class BinaryRequestLogger:
+    """Listens to Locust's ``request`` event and appends one binary record per request.
+
+    Parameters
+    ----------
+    filepath:
+        Path to the output file (the string table is written next to it, to
+        ``<filepath>.strings``).  Parent directories must already exist.  If
+        the files exist they will be **overwritten** at the start of each run.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        self.filepath = filepath
+        self.strings_filepath = filepath + ".strings"
+        self.count = 0
+
+        self._file: Any = None
+        self._mmap: mmap.mmap | None = None
+        self._strings_file: Any = None
+        self._capacity = 0
+        self._string_ids: dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def register(self, environment: Environment) -> None:
+        """Attach this logger to *environment*'s event hooks.
+
+        Must be called once, typically inside an ``@events.init`` listener.
+        """
+        environment.events.request.add_listener(self._on_request)
+        environment.events.quitting.add_listener(self._on_quitting)
+        self._open()
+
+    def close(self) -> None:
+        """Write the final record count, truncate the file to its used size and close it.
+
+        Safe to call multiple times.
+        """
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap.close()
+            self._mmap = None
+            self._file.truncate(HEADER.size + self.count * RECORD.size)
+            self._file.close()
+            self._strings_file.close()
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _open(self) -> None:
+        self.close()
+        self.count = 0
+        self._string_ids = {}
+        self._strings_file = open(self.strings_filepath, "wb")
+        self._intern("")
+        self._file = open(self.filepath, "w+b")
+        self._map(GROW_BY_RECORDS)
+        HEADER.pack_into(self._mmap, 0, MAGIC, VERSION, RECORD.size, 0, 0)  # type: ignore[arg-type]
+
+    def _map(self, capacity: int) -> None:
+        """(Re)map the file, with room for *capacity* records"""
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.truncate(HEADER.size + capacity * RECORD.size)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self._capacity = capacity
+
+    def _intern(self, string: str) -> int:
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = self._string_ids[string] = len(self._string_ids)
+            encoded = string.encode("utf-8")
+            self._strings_file.write(STRING_LENGTH.pack(len(encoded)) + encoded)
+            # the string must be readable before any record that refers to it
+            self._strings_file.flush()
+        return string_id
+
+    def _on_request(
+        self,
+        *,
+        request_type: str,
+        name: str,
+        response_time: float | None,
+        response_length: int,
+        exception: Any = None,
+        response: Any = None,
+        start_time: float | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Event handler — called by Locust for every completed request."""
+        if self._mmap is None:
+            return
+        if self.count == self._capacity:
+            self._map(self._capacity + GROW_BY_RECORDS)
+        RECORD.pack_into(
+            self._mmap,  # type: ignore[arg-type]
+            HEADER.size + self.count * RECORD.size,
+            start_time if start_time is not None else time.time(),
+            math.nan if response_time is None else response_time,
+            self._intern(name),
+            self._intern(request_type),
+            self._intern(StatsError.parse_error(exception)) if exception is not None else 0,
+            min(max(response_length or 0, 0), _MAX_UINT32),
+            min(max(_status_code(response, exception), 0), _MAX_UINT16),
+        )
+        self.count += 1
+        _COUNT.pack_into(self._mmap, _COUNT_OFFSET, self.count)  # type: ignore[arg-type]
+
+    def _on_quitting(self, **kwargs: Any) -> None:
+        """Close when Locust shuts down."""
+        self.close()
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+
+
+def read_strings(filepath: str) -> list[str]:
+    """Read the string table of the log at *filepath* (an incompletely written last string is ignored)"""
+    with open(filepath + ".strings", "rb") as f:
+        data = f.read()
+    strings = []
+    offset = 0
+    while offset + STRING_LENGTH.size <= len(data):
+        (length,) = STRING_LENGTH.unpack_from(data, offset)
+        offset += STRING_LENGTH.size
+        if offset + length > len(data):
+            break
+        strings.append(data[offset : offset + length].decode("utf-8"))
+        offset += length
+    return strings
+
+
+def iter_requests(filepath: str) -> Iterator[LoggedRequest]:
+    """Iterate over the requests in the log at *filepath*, in the order they were logged
+
+    :raises ValueError: If the file isn't a request log written by this version of Locust
+    """
+    strings = read_strings(filepath)
+    with open(filepath, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{filepath} is not a binary request log")
+        _, version, record_size, _, count = HEADER.unpack(header)
+        if version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{filepath} has an unsupported format version ({version})")
+        count = min(count, (os.fstat(f.fileno()).st_size - HEADER.size) // RECORD.size)
+        if not count:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                records = view[HEADER.size : HEADER.size + count * RECORD.size]
+                try:
+                    for timestamp, response_time, name_id, type_id, error_id, length, status in RECORD.iter_unpack(
+                        records
+                    ):
+                        yield LoggedRequest(
+                            timestamp,
+                            strings[type_id],
+                            strings[name_id],
+                            None if math.isnan(response_time) else response_time,
+                            length,
+                            status,
+                            strings[error_id] if error_id else None,
+                        )
+                finally:
+                    records.release()
+
+
+def aggregate(
+    filepath: str, *, start: float | None = None, end: float | None = None, stats: RequestStats | None = None
+) -> RequestStats:
+    """
+    Replay the requests in the log at *filepath* into a RequestStats, as if they had been made during a test run
+
+    :param start: Only include requests made at or after this (unix) timestamp
+    :param end: Only include requests made before this (unix) timestamp
+    :param stats: The RequestStats to add the requests to. A new one is created by default
+    """
+    if stats is None:
+        stats = RequestStats(use_response_times_cache=False)
+    first = True
+    for request in iter_requests(filepath):
+        timestamp = request.timestamp
+        if (start is not None and timestamp < start) or (end is not None and timestamp >= end):
+            continue
+        entry = stats.get(request.name, request.request_type)
+        stats.log_request(
+            request.request_type,
+            request.name,
+            request.response_time,  # type: ignore[arg-type]
+            request.response_length,
+            timestamp=timestamp,
+        )
+        if first:
+            stats.total.start_time = timestamp
+            first = False
+        if entry.num_requests == 1:
+            entry.start_time = timestamp
+        if request.error is not None:
+            stats.log_error(request.request_type, request.name, request.error, timestamp=timestamp)
+    return stats
+
+
+def _write_csv(filepath: str, csv_filepath: str) -> None:
+    with open(csv_filepath, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for request in iter_requests(filepath):
+            writer.writerow(
+                [
+                    round(request.timestamp, 6),
+                    request.request_type,
+                    request.name,
+                    "" if request.response_time is None else round(request.response_time, 2),
+                    request.response_length,
+                    request.status_code,
+                    request.error or "",
+                ]
+            )
+
+
+def main(args: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m locust.contrib.binary_request_log",
+        description="Print the statistics of a binary request log, or convert it to CSV",
+    )
+    parser.add_argument("filepath", help="The request log (the string table is read from <filepath>.strings)")
+    parser.add_argument(
+        "--start",
+        type=float,
+        help="Only include requests made this many seconds or more after the first request",
+    )
+    parser.add_argument(
+        "--end",
+        type=float,
+        help="Only include requests made less than this many seconds after the first request",
+    )
+    parser.add_argument(
+        "--percentiles",
+        help="Comma separated list of the response time percentiles to print, e.g. 0.5,0.95,0.99",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the statistics as JSON instead of tables")
+    parser.add_argument(
+        "--csv",
+        metavar="CSV_FILEPATH",
+        help="Instead of printing statistics, write one row per request to this CSV file (in the format of CsvRequestLogger)",
+    )
+    options = parser.parse_args(args)
+
+    try:
+        percentiles = [float(p) for p in options.percentiles.split(",")] if options.percentiles else None
+        if options.csv:
+            _write_csv(options.filepath, options.csv)
+            return 0
+        start = end = None
+        if options.start is not None or options.end is not None:
+            first_request = next(iter_requests(options.filepath), None)
+            if first_request is not None:
+                if options.start is not None:
+                    start = first_request.timestamp + options.start
+                if options.end is not None:
+                    end = first_request.timestamp + options.end
+        stats = aggregate(options.filepath, start=start, end=end)
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"{e}\n")
+        return 1
+
+    if options.json:
+        stats_module.print_stats_json(stats)
+        return 0
+    print("\n".join(stats_module.get_stats_summary(stats, current=False)), end="\n\n")
+    print("\n".join(stats_module.get_percentile_stats_summary(stats, percentiles=percentiles)), end="\n\n")
+    if stats.errors:
+        print("\n".join(stats_module.get_error_report_summary(stats)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,6 +25,14 @@ Usage::
 The CSV file is created (or truncated) when :meth:`CsvRequestLogger.register`
 is called and closed when the ``quitting`` event fires.
 
+At high request rates, pass ``queued=True`` to move the formatting and writing
+of the rows off the gevent loop, to a separate OS thread::
+
+    logger = CsvRequestLogger("results/requests.csv", queued=True, overflow="drop")
+
+Large logs can also be split into several files (``rotate_bytes`` /
+``rotate_seconds``) and/or gzip compressed (``compress=True``).
+
 CSV columns
 -----------
 ``timestamp``
@@ -45,10 +53,19 @@ CSV columns
 """
 
 import csv
+import gzip
 import io
 import logging
+import os
+import random
 import time
-from typing import TYPE_CHECKING, Any
+from collections import deque
+from typing import TYPE_CHECKING, Any, Literal
+
+import gevent
+from gevent import monkey
+from gevent.event import Event
+from gevent.threadpool import ThreadPool
 
 if TYPE_CHECKING:
     from locust.env import Environment
@@ -67,6 +84,15 @@ CSV_COLUMNS = (
     "exception",
 )
 
+#: What to do with a request when the queue of a queued logger is full (see :class:`CsvRequestLogger`).
+OverflowPolicy = Literal["block", "drop", "sample"]
+
+#: How often (in seconds) the writer thread of a queued logger checks for new rows, when it has nothing to do.
+QUEUE_POLL_INTERVAL = 0.05
+
+# the writer thread must really sleep, not yield to a gevent hub
+_thread_sleep = monkey.get_original("time", "sleep")
+
 
 def _status_code(response: Any, exception: Any) -> int:
     """Extract the HTTP status code from a response object.
@@ -95,15 +121,94 @@ class CsvRequestLogger:
         Number of rows to buffer before flushing to disk.  Use ``1`` for
         immediate write-through (safest for crash recovery), or a larger value
         for better performance on high-RPS tests.  Defaults to ``1``.
+    queued:
+        If ``True``, the ``request`` event handler only puts the request in a
+        bounded queue, and a separate OS thread formats the rows and writes
+        them, so that disk I/O never blocks the gevent loop.  The queue is
+        also flushed to disk whenever it has been emptied.  Defaults to
+        ``False``.
+    queue_size:
+        Maximum number of requests waiting to be written (queued mode only).
+        Defaults to ``10000``.
+    overflow:
+        What to do when the writer thread can't keep up (queued mode only):
+
+        * ``"block"`` (default): the User that made the request waits until
+          there is room in the queue.  Nothing is lost, but the load drops.
+        * ``"drop"``: requests that don't fit in the queue are not logged.
+        * ``"sample"``: once the queue is half full, only a random
+          *sample_rate* fraction of the requests is logged (and none when it
+          is full).
+
+        Requests that were not logged are counted in :attr:`dropped`.
+    sample_rate:
+        Fraction of the requests to log when sampling.  Defaults to ``0.1``.
+    rotate_bytes:
+        Start a new file when the current one has grown to this many
+        (uncompressed) bytes.
+    rotate_seconds:
+        Start a new file when the current one has been written to for this
+        many seconds.  The files after the first one are named like
+        ``requests.1.csv``, ``requests.2.csv``, etc, and each of them has a
+        header row.
+    compress:
+        Write gzip compressed files (``.gz`` is appended to the file names).
+        Defaults to ``False``.
+
+    Attributes
+    ----------
+    dropped:
+        Number of requests that were not logged because the queue was full
+        (or the writer thread had failed).
+    filepaths:
+        Paths of the files written during the current run, in order.
     """
 
-    def __init__(self, filepath: str, *, flush_interval: int = 1) -> None:
+    def __init__(
+        self,
+        filepath: str,
+        *,
+        flush_interval: int = 1,
+        queued: bool = False,
+        queue_size: int = 10_000,
+        overflow: OverflowPolicy = "block",
+        sample_rate: float = 0.1,
+        rotate_bytes: int | None = None,
+        rotate_seconds: float | None = None,
+        compress: bool = False,
+    ) -> None:
+        if overflow not in ("block", "drop", "sample"):
+            raise ValueError(f"Unknown overflow policy {overflow!r} (must be 'block', 'drop' or 'sample')")
         self.filepath = filepath
         self.flush_interval = max(1, flush_interval)
+        self.queued = queued
+        self.queue_size = max(1, queue_size)
+        self.overflow = overflow
+        self.sample_rate = sample_rate
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compress = compress
+        self.dropped = 0
+        self.filepaths: list[str] = []
 
         self._filehandle: io.TextIOWrapper | None = None
         self._writer: CSVWriter | None = None
         self._pending: int = 0
+        self._segment = 0
+        self._segment_bytes = 0
+        self._segment_started = 0.0
+
+        # raw request fields, waiting for the writer thread (queued mode only)
+        self._queue: deque[tuple] = deque()
+        self._pool: ThreadPool | None = None
+        self._writer_result: Any = None
+        self._writer_running = False
+        self._stopping = False
+        # with the "block" overflow policy, users wait for this to be set when the queue is full. It's set (on the
+        # gevent loop) by sending the threadsafe _room_signal from the writer thread, when it has made room
+        self._room = Event()
+        self._room_signal: Any = None
+        self._waiting_for_room = False
 
     # ------------------------------------------------------------------
     # Public API
@@ -120,13 +225,24 @@ class CsvRequestLogger:
         logger.debug("CsvRequestLogger: writing per-request log to %s", self.filepath)
 
     def close(self) -> None:
-        """Flush and close the underlying file handle.
+        """Write any queued requests, then flush and close the underlying file handle.
 
         Safe to call multiple times.
         """
+        if self._writer_result is not None:
+            self._stopping = True
+            # waits for the writer thread without blocking the gevent loop
+            self._writer_result.get()
+            self._pool.kill()  # type: ignore[union-attr]
+            self._pool = None
+            self._writer_result = None
+            self._room_signal.close()
+            self._room_signal = None
         if self._filehandle is not None and not self._filehandle.closed:
             self._filehandle.flush()
             self._filehandle.close()
+            if self.dropped:
+                logger.warning("CsvRequestLogger: %d requests were not logged because the queue was full", self.dropped)
             logger.debug("CsvRequestLogger: closed %s", self.filepath)
         self._filehandle = None
         self._writer = None
@@ -139,10 +255,76 @@ class CsvRequestLogger:
     def _open(self) -> None:
         """Open (or re-open) the CSV file and write the header row."""
         self.close()
-        self._filehandle = open(self.filepath, "w", newline="", encoding="utf-8")
-        self._writer = csv.writer(self._filehandle)
-        self._writer.writerow(CSV_COLUMNS)
-        self._filehandle.flush()
+        self.dropped = 0
+        self.filepaths = []
+        self._segment = 0
+        self._open_segment()
+        if self.queued:
+            self._queue.clear()
+            self._stopping = False
+            self._writer_running = True
+            self._room_signal = gevent.get_hub().loop.async_()
+            self._room_signal.start(self._room.set)
+            self._pool = ThreadPool(1)
+            self._writer_result = self._pool.spawn(self._write_queued)
+
+    def _segment_path(self, segment: int) -> str:
+        if segment:
+            base, ext = os.path.splitext(self.filepath)
+            path = f"{base}.{segment}{ext}"
+        else:
+            path = self.filepath
+        return path + ".gz" if self.compress else path
+
+    def _open_segment(self) -> None:
+        path = self._segment_path(self._segment)
+        if self.compress:
+            self._filehandle = gzip.open(path, "wt", newline="", encoding="utf-8")  # type: ignore[assignment]
+        else:
+            self._filehandle = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._filehandle)  # type: ignore[arg-type]
+        self._segment_bytes = self._writer.writerow(CSV_COLUMNS)
+        self._segment_started = time.monotonic()
+        self._filehandle.flush()  # type: ignore[union-attr]
+        self.filepaths.append(path)
+
+    def _rotate(self) -> None:
+        """Close the current file and continue in the next one."""
+        self._filehandle.close()  # type: ignore[union-attr]
+        self._pending = 0
+        self._segment += 1
+        self._open_segment()
+
+    def _write_row(self, row: list) -> None:
+        self._segment_bytes += self._writer.writerow(row)  # type: ignore[union-attr]
+        self._pending += 1
+        if self._pending >= self.flush_interval:
+            self._filehandle.flush()  # type: ignore[union-attr]
+            self._pending = 0
+        if (self.rotate_bytes is not None and self._segment_bytes >= self.rotate_bytes) or (
+            self.rotate_seconds is not None and time.monotonic() - self._segment_started >= self.rotate_seconds
+        ):
+            self._rotate()
+
+    @staticmethod
+    def _format_row(
+        ts: float,
+        request_type: str,
+        name: str,
+        response_time: float,
+        response_length: int,
+        status_code: int,
+        exception: Any,
+    ) -> list:
+        return [
+            round(ts, 6),
+            request_type,
+            name,
+            round(response_time, 2),
+            response_length,
+            status_code,
+            str(exception) if exception is not None else "",
+        ]
 
     def _on_request(
         self,
@@ -163,24 +345,58 @@ class CsvRequestLogger:
 
         ts = start_time if start_time is not None else time.time()
         status_code = _status_code(response, exception)
-        exc_str = str(exception) if exception is not None else ""
-
-        self._writer.writerow(
-            [
-                round(ts, 6),
-                request_type,
-                name,
-                round(response_time, 2),
-                response_length,
-                status_code,
-                exc_str,
-            ]
-        )
+        record = (ts, request_type, name, response_time, response_length, status_code, exception)
 
-        self._pending += 1
-        if self._pending >= self.flush_interval:
-            self._filehandle.flush()  # type: ignore[union-attr]
-            self._pending = 0
+        if not self.queued:
+            self._write_row(self._format_row(*record))
+            return
+
+        queue = self._queue
+        if self.overflow == "sample" and len(queue) >= self.queue_size // 2 and random.random() >= self.sample_rate:
+            self.dropped += 1
+            return
+        if len(queue) >= self.queue_size:
+            if self.overflow != "block":
+                self.dropped += 1
+                return
+            while len(queue) >= self.queue_size and self._writer_running:
+                # the writer thread checks the flag after taking a request from the queue, so check
+                # again after setting it, to not miss the room it made in between
+                self._waiting_for_room = True
+                self._room.clear()
+                if len(queue) >= self.queue_size and self._writer_running:
+                    self._room.wait()
+        if not self._writer_running:
+            # nothing is taking requests off the queue any more, so don't let it grow without limit
+            self.dropped += 1
+            return
+        queue.append(record)
+
+    def _write_queued(self) -> None:
+        """Body of the writer thread: writes queued requests until the logger is closed."""
+        queue = self._queue
+        try:
+            while True:
+                # checked before draining, so that requests queued before close() are always written
+                stopping = self._stopping
+                if not queue:
+                    if stopping:
+                        return
+                    _thread_sleep(QUEUE_POLL_INTERVAL)
+                    continue
+                while queue:
+                    self._write_row(self._format_row(*queue.popleft()))
+                    if self._waiting_for_room:
+                        self._waiting_for_room = False
+                        self._room_signal.send()
+                self._filehandle.flush()  # type: ignore[union-attr]
+                self._pending = 0
+        except Exception:
+            logger.exception("CsvRequestLogger: writing to %s failed", self.filepath)
+        finally:
+            # don't leave users waiting for room that will never be made
+            self._writer_running = False
+            self._room_signal.send()
 
     def _on_quitting(self, **kwargs: Any) -> None:
         """Flush and close when Locust shuts down."""
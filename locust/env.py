@@ -6,12 +6,14 @@ from typing import TypeVar
 
 from configargparse import Namespace
 
+from .arrival_rate import ArrivalRateScheduler
 from .dispatch import UsersDispatcher
 from .event import Events
 from .exception import RunnerAlreadyExistsError
-from .runners import LocalRunner, MasterRunner, Runner, WorkerRunner
+from .runners import LocalRunner, MasterRunner, RelayRunner, Runner, WorkerRunner
 from .shape import LoadTestShape
 from .stats import RequestStats, StatsCSV
+from .timer_wheel import TimerWheel
 from .user import User
 from .user.task import TaskHolder, TaskSet, filter_tasks_by_tags
 from .web import WebUI
@@ -47,6 +49,12 @@ class Environment:
         self.web_ui: WebUI | None = None
         """Reference to the WebUI instance"""
 
+        self.arrival_rate_scheduler: ArrivalRateScheduler | None = None
+        """
+        If set (see :meth:`Runner.set_arrival_rate <locust.runners.Runner.set_arrival_rate>`), users start their
+        tasks at the rate given by this scheduler instead of waiting for their wait_time between tasks
+        """
+
         self.process_exit_code: int | None = None
         """
         If set it'll be the exit code of the Locust process
@@ -98,6 +106,25 @@ class Environment:
         """Reference to the parsed command line options (used to pre-populate fields in Web UI). When using Locust as a library, this should either be `None` or an object created by `argument_parser.parse_args()`"""
         self.parsed_locustfiles = parsed_locustfiles
         """A list of all locustfiles for the test"""
+        self.correct_coordinated_omission = bool(getattr(parsed_options, "correct_coordinated_omission", False))
+        """
+        If True, response times are also recorded corrected for coordinated omission, for users that use an
+        arrival rate or a pacing wait_time (constant_pacing/constant_throughput)
+        """
+        self.monitor_hub_lag = not getattr(parsed_options, "no_hub_lag_monitor", False)
+        """
+        If True (the default), runners measure the hub lag and count the requests that were running while
+        it lagged (see :class:`HubLagMonitor <locust.hub_lag.HubLagMonitor>`)
+        """
+        self.timer_wheel: TimerWheel | None = TimerWheel() if getattr(parsed_options, "timer_wheel", False) else None
+        """
+        If set, users sleep (between tasks) using this single timer wheel instead of a gevent timer each,
+        see --timer-wheel
+        """
+        if parsed_options and getattr(parsed_options, "max_request_names", None) is not None:
+            self.stats.max_request_names = parsed_options.max_request_names
+        if getattr(parsed_options, "event_listener_timing", False):
+            self.events.enable_listener_timing()
         self.available_user_classes = available_user_classes
         """List of the available User Classes to pick from in the UserClass Picker"""
         self.available_shape_classes = available_shape_classes
@@ -135,34 +162,65 @@ class Environment:
         """
         return self._create_runner(LocalRunner)
 
-    def create_master_runner(self, master_bind_host="*", master_bind_port=5557) -> MasterRunner:
+    def create_master_runner(
+        self, master_bind_host="*", master_bind_port=5557, master_ipc_path: str | None = None
+    ) -> MasterRunner:
         """
         Create a :class:`MasterRunner <locust.runners.MasterRunner>` instance for this Environment
 
         :param master_bind_host: Interface/host that the master should use for incoming worker connections.
                                  Defaults to "*" which means all interfaces.
         :param master_bind_port: Port that the master should listen for incoming worker connections on
+        :param master_ipc_path: Optional ipc:// socket path that the master should also listen for incoming
+                                worker connections on (only usable by workers on the same machine)
         """
         return self._create_runner(
             MasterRunner,
             master_bind_host=master_bind_host,
             master_bind_port=master_bind_port,
+            master_ipc_path=master_ipc_path,
         )
 
-    def create_worker_runner(self, master_host: str, master_port: int) -> WorkerRunner:
+    def create_worker_runner(
+        self, master_host: str, master_port: int, master_ipc_path: str | None = None
+    ) -> WorkerRunner:
         """
         Create a :class:`WorkerRunner <locust.runners.WorkerRunner>` instance for this Environment
 
         :param master_host: Host/IP of a running master node
         :param master_port: Port on master node to connect to
+        :param master_ipc_path: Optional ipc:// socket path to connect to the master on, instead of using tcp
         """
         # Create a new RequestStats with use_response_times_cache set to False to save some memory
         # and CPU cycles, since the response_times_cache is not needed for Worker nodes
-        self.stats = RequestStats(use_response_times_cache=False)
+        self.stats = RequestStats(use_response_times_cache=False, max_request_names=self.stats.max_request_names)
         return self._create_runner(
             WorkerRunner,
             master_host=master_host,
             master_port=master_port,
+            master_ipc_path=master_ipc_path,
+        )
+
+    def create_relay_runner(
+        self, master_host: str, master_port: int, relay_bind_host="*", relay_bind_port=5557
+    ) -> RelayRunner:
+        """
+        Create a :class:`RelayRunner <locust.runners.RelayRunner>` instance for this Environment
+
+        :param master_host: Host/IP of a running master node
+        :param master_port: Port on master node to connect to
+        :param relay_bind_host: Interface/host that the relay should use for incoming worker connections.
+                                Defaults to "*" which means all interfaces.
+        :param relay_bind_port: Port that the relay should listen for incoming worker connections on
+        """
+        # the relay only passes the stats of its workers on to the master, so it doesn't need a response_times_cache either
+        self.stats = RequestStats(use_response_times_cache=False, max_request_names=self.stats.max_request_names)
+        return self._create_runner(
+            RelayRunner,
+            master_host=master_host,
+            master_port=master_port,
+            relay_bind_host=relay_bind_host,
+            relay_bind_port=relay_bind_port,
         )
 
     def create_web_ui(
@@ -286,6 +344,7 @@ class Environment:
                 else:
                     raise ValueError("Unrecognized task type in user")
             u.tasks = user_tasks
+            u.task_weights = {}
 
     def _validate_user_class_name_uniqueness(self):
         # Validate there's no class with the same name but in different modules
@@ -3,13 +3,51 @@ from __future__ import annotations
 import logging
 import time
 import traceback
-from collections.abc import Generator
+from collections.abc import Callable, Generator
 from contextlib import contextmanager
-from typing import Any
+from typing import Any, TypedDict
+
+import gevent
 
 from . import log
 from .exception import InterruptTaskSet, RescheduleTask, RescheduleTaskImmediately, StopTest, StopUser
 
+"""Default maximum number of events that are buffered for batch listeners before they are flushed"""
+EVENT_BATCH_SIZE = 1000
+"""Default maximum time (in seconds) that events are buffered for batch listeners before they are flushed"""
+EVENT_BATCH_INTERVAL = 0.1
+"""The arguments of the request event that are buffered for batch listeners (e.g. not the response object)"""
+REQUEST_BATCH_FIELDS = ("request_type", "name", "response_time", "response_length", "exception", "start_time")
+
+
+class ListenerTimingDict(TypedDict):
+    event: str
+    listener: str
+    calls: int
+    total_time: float
+    avg_time: float
+    max_time: float
+
+
+def _listener_name(handler: Callable | str) -> str:
+    if isinstance(handler, str):
+        return handler
+    name = getattr(handler, "__qualname__", None) or repr(handler)
+    module = getattr(handler, "__module__", None)
+    return f"{module}.{name}" if module else name
+
+
+def _record_timing(timings: dict[Callable | str, list], handler: Callable, start: float) -> None:
+    elapsed = (time.perf_counter() - start) * 1000
+    timing = timings.get(handler)
+    if timing is None:
+        timings[handler] = [1, elapsed, elapsed]
+    else:
+        timing[0] += 1
+        timing[1] += elapsed
+        if elapsed > timing[2]:
+            timing[2] = elapsed
+
 
 class EventHook:
     """
@@ -25,10 +63,26 @@ class EventHook:
 
     If reverse is True, then the handlers will run in the reverse order
     that they were inserted
+
+    Listeners added with :meth:`add_batch_listener` are instead called with lists of the keyword arguments
+    of many events at once (see :ref:`batched-request-events`).
     """
 
     def __init__(self):
         self._handlers = []
+        self._batch_handlers = []
+        # keyword arguments of the events that haven't been delivered to the batch listeners yet
+        self._batch: list[dict[str, Any]] = []
+        self._flush_greenlet: gevent.Greenlet | None = None
+        self.batch_size = EVENT_BATCH_SIZE
+        """ Number of buffered events at which they are flushed to the batch listeners """
+        self.batch_interval = EVENT_BATCH_INTERVAL
+        """ Maximum time (in seconds) an event is buffered before it is flushed to the batch listeners """
+        self.batch_fields: tuple[str, ...] | None = None
+        """ If set, only these keyword arguments of each event are buffered for the batch listeners """
+        # listener => [number of calls, total time, max time] (in ms), when timing is enabled (see
+        # Events.enable_listener_timing). Timings merged from other processes are keyed by the listener name.
+        self._timings: dict[Callable | str, list] | None = None
 
     def add_listener(self, handler):
         self._handlers.append(handler)
@@ -37,21 +91,83 @@ class EventHook:
     def remove_listener(self, handler):
         self._handlers.remove(handler)
 
+    def add_batch_listener(self, handler):
+        """
+        Add a listener that is called with a list of the keyword arguments (as dicts) of the events that have
+        been fired since the last call, instead of once per event. Events are buffered until there are
+        :attr:`batch_size` of them, :attr:`batch_interval` seconds have passed or :meth:`flush` is called.
+        """
+        self._batch_handlers.append(handler)
+        return handler
+
+    def remove_batch_listener(self, handler):
+        self.flush()
+        self._batch_handlers.remove(handler)
+
+    def flush(self) -> None:
+        """
+        Deliver the buffered events to the batch listeners right away
+        """
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        for handler in self._batch_handlers:
+            start = time.perf_counter()
+            try:
+                handler(batch)
+            except Exception:
+                logging.error("Uncaught exception in event handler: \n%s", traceback.format_exc())
+                log.unhandled_greenlet_exception = True
+            finally:
+                if self._timings is not None:
+                    _record_timing(self._timings, handler, start)
+
+    def _flush_later(self) -> None:
+        self._flush_greenlet = None
+        self.flush()
+
     def fire(self, *, reverse=False, **kwargs):
-        if reverse:
-            handlers = reversed(self._handlers)
-        else:
-            handlers = self._handlers
+        # skipped altogether when there are only batch listeners
+        if self._handlers:
+            if reverse:
+                handlers = reversed(self._handlers)
+            else:
+                handlers = self._handlers
+            if self._timings is not None:
+                self._fire_timed(handlers, kwargs)
+            else:
+                for handler in handlers:
+                    try:
+                        handler(**kwargs)
+                    except (StopUser, StopTest, RescheduleTask, RescheduleTaskImmediately, InterruptTaskSet):
+                        # These exceptions could be thrown by, for example, a request handler,
+                        # in which case they are entirely appropriate and should not be caught
+                        raise
+                    except Exception:
+                        logging.error("Uncaught exception in event handler: \n%s", traceback.format_exc())
+                        log.unhandled_greenlet_exception = True
+        if self._batch_handlers:
+            fields = self.batch_fields
+            self._batch.append(kwargs if fields is None else {field: kwargs.get(field) for field in fields})
+            if len(self._batch) >= self.batch_size:
+                self.flush()
+            elif self._flush_greenlet is None:
+                self._flush_greenlet = gevent.spawn_later(self.batch_interval, self._flush_later)
+
+    def _fire_timed(self, handlers, kwargs):
         for handler in handlers:
+            start = time.perf_counter()
             try:
                 handler(**kwargs)
             except (StopUser, StopTest, RescheduleTask, RescheduleTaskImmediately, InterruptTaskSet):
-                # These exceptions could be thrown by, for example, a request handler,
-                # in which case they are entirely appropriate and should not be caught
                 raise
             except Exception:
                 logging.error("Uncaught exception in event handler: \n%s", traceback.format_exc())
                 log.unhandled_greenlet_exception = True
+            finally:
+                # the timings may have been reset (or disabled) by the listener itself
+                if self._timings is not None:
+                    _record_timing(self._timings, handler, start)
 
     @contextmanager
     def measure(
@@ -134,7 +250,7 @@ class Events:
     data to the dicts that are regularly sent to the master. It's fired regularly when a report
     is to be sent to the master server.
 
-    Note that the keys "stats" and "errors" are used by Locust and shouldn't be overridden.
+    Note that the keys "stats", "stats_total", "stats_delta" and "errors" are used by Locust and shouldn't be overridden.
 
     Event arguments:
 
@@ -295,3 +411,78 @@ class Events:
         for name, value in self.__annotations__.items():
             if value == "EventHook":
                 setattr(self, name, EventHook())
+
+        # don't keep e.g. the responses of requests alive until the batch listeners have been called
+        self.request.batch_fields = REQUEST_BATCH_FIELDS
+
+    def _event_hooks(self) -> Generator[tuple[str, EventHook]]:
+        for name, value in vars(self).items():
+            if isinstance(value, EventHook):
+                yield name, value
+
+    def enable_listener_timing(self) -> None:
+        """
+        Start recording the number of calls, and the total and max time spent in each listener of each event
+        (see --event-listener-timing). Does nothing if timing is already enabled.
+        """
+        for _, event_hook in self._event_hooks():
+            if event_hook._timings is None:
+                event_hook._timings = {}
+
+    @property
+    def listener_timing_enabled(self) -> bool:
+        return any(event_hook._timings is not None for _, event_hook in self._event_hooks())
+
+    def get_listener_timings(self) -> list[ListenerTimingDict]:
+        """
+        Return the recorded listener timings (with times in ms), slowest listener (in total) first
+        """
+        timings: dict[tuple[str, str], list] = {}
+        for event_name, event_hook in self._event_hooks():
+            for handler, (calls, total_time, max_time) in (event_hook._timings or {}).items():
+                key = (event_name, _listener_name(handler))
+                if key in timings:
+                    # e.g. bound methods of different instances of the same class
+                    timing = timings[key]
+                    timing[0] += calls
+                    timing[1] += total_time
+                    timing[2] = max(timing[2], max_time)
+                else:
+                    timings[key] = [calls, total_time, max_time]
+        return sorted(
+            (
+                ListenerTimingDict(
+                    event=event_name,
+                    listener=listener,
+                    calls=calls,
+                    total_time=total_time,
+                    avg_time=total_time / calls,
+                    max_time=max_time,
+                )
+                for (event_name, listener), (calls, total_time, max_time) in timings.items()
+            ),
+            key=lambda timing: timing["total_time"],
+            reverse=True,
+        )
+
+    def merge_listener_timings(self, listener_timings: list[ListenerTimingDict]) -> None:
+        """
+        Add listener timings from another process (e.g. reported by a worker) to the ones recorded here
+        """
+        self.enable_listener_timing()
+        for row in listener_timings:
+            event_hook = getattr(self, row["event"], None)
+            if not isinstance(event_hook, EventHook) or event_hook._timings is None:
+                continue
+            timing = event_hook._timings.get(row["listener"])
+            if timing is None:
+                event_hook._timings[row["listener"]] = [row["calls"], row["total_time"], row["max_time"]]
+            else:
+                timing[0] += row["calls"]
+                timing[1] += row["total_time"]
+                timing[2] = max(timing[2], row["max_time"])
+
+    def reset_listener_timings(self) -> None:
+        for _, event_hook in self._event_hooks():
+            if event_hook._timings is not None:
+                event_hook._timings = {}
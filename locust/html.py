@@ -59,9 +59,10 @@ def get_html_report(
         {**exc, "nodes": ", ".join(exc["nodes"])} for exc in environment.runner.exceptions.values()
     ]
 
-    if request_stats.history and request_stats.history[-1]["time"] < end_time:
-        stats.update_stats_history(environment.runner, end_time)
-    history = request_stats.history
+    last_history_timestamp = request_stats.history.last_timestamp
+    if last_history_timestamp is not None and int(last_history_timestamp) < int(end_ts):
+        stats.update_stats_history(environment.runner, end_ts)
+    history = request_stats.history.points(stats.HISTORY_CHART_POINTS)
 
     is_distributed = isinstance(environment.runner, MasterRunner)
     user_spawned = (
@@ -83,6 +84,7 @@ def get_html_report(
             "requests_statistics": [stat.to_dict() for stat in requests_statistics],
             "failures_statistics": [stat.to_dict() for stat in failures_statistics],
             "exceptions_statistics": [stat for stat in exceptions_statistics],
+            "listener_timings_statistics": environment.events.get_listener_timings(),
             "response_time_statistics": [
                 {
                     "name": stat.name,
@@ -94,6 +96,19 @@ def get_html_report(
                 }
                 for stat in requests_statistics
             ],
+            "corrected_response_time_statistics": [
+                {
+                    "name": stat.name,
+                    "method": stat.method or "",
+                    **{
+                        str(percentile): stat.get_corrected_response_time_percentile(percentile)
+                        for percentile in PERCENTILES_FOR_HTML_REPORT
+                    },
+                }
+                for stat in requests_statistics
+            ]
+            if environment.correct_coordinated_omission
+            else [],
             "start_time": start_time,
             "end_time": end_time,
             "duration": format_duration(request_stats.start_time, end_ts),
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from typing import TYPE_CHECKING, NoReturn
+
+import gevent
+
+if TYPE_CHECKING:
+    from .stats import RequestStats
+
+"""Number of seconds the hub lag monitor sleeps between measurements"""
+HUB_LAG_SAMPLE_INTERVAL = 0.01
+"""Hub lag (in seconds) above which requests that were running at the same time are counted as lagged"""
+SIGNIFICANT_HUB_LAG = 0.01
+"""Number of recent periods of significant hub lag to keep, for checking which requests they overlapped"""
+LAG_PERIODS_TO_KEEP = 100
+
+
+class HubLagMonitor:
+    """
+    Measures how much later than requested the gevent hub wakes up a greenlet that sleeps for a short interval.
+
+    That delay is time during which the hub was blocked (e.g. by CPU heavy task code, or by the load generator
+    being saturated), so any request that was running meanwhile had its response time inflated by it. The lag of
+    each measurement is logged to :attr:`RequestStats.hub_lag <locust.stats.RequestStats.hub_lag>`, and
+    requests that overlapped significant lag are counted by the runner (see :meth:`lagged_during`).
+    """
+
+    def __init__(self, stats: RequestStats) -> None:
+        self.stats = stats
+        # (start, end) perf_counter timestamps of recent periods of significant lag
+        self._lag_periods: deque[tuple[float, float]] = deque(maxlen=LAG_PERIODS_TO_KEEP)
+        # when the monitor should wake up next (inf when it isn't running)
+        self._expected_wake_up = math.inf
+
+    def run(self) -> NoReturn:
+        try:
+            while True:
+                self._expected_wake_up = time.perf_counter() + HUB_LAG_SAMPLE_INTERVAL
+                gevent.sleep(HUB_LAG_SAMPLE_INTERVAL)
+                now = time.perf_counter()
+                lag = max(now - self._expected_wake_up, 0.0)
+                self.stats.log_hub_lag(lag * 1000)
+                if lag > SIGNIFICANT_HUB_LAG:
+                    self._lag_periods.append((self._expected_wake_up, now))
+        finally:
+            self._expected_wake_up = math.inf
+
+    def lagged_during(self, seconds: float, end: float | None = None) -> bool:
+        """
+        Check if there was significant hub lag during the last *seconds* seconds
+        (e.g. while a request that just finished was running)
+
+        :param end: perf_counter() timestamp of the end of the period to check, if it isn't now
+        """
+        if end is None:
+            end = time.perf_counter()
+        if end - self._expected_wake_up > SIGNIFICANT_HUB_LAG:
+            # the monitor hadn't gotten to run yet because the hub was lagging
+            return True
+        start = end - seconds
+        # periods are in chronological order, so only the most recent ones can overlap
+        for lag_start, lag_end in reversed(self._lag_periods):
+            if lag_end <= start:
+                return False
+            if lag_start < end:
+                return True
+        return False
@@ -10,14 +10,17 @@ import inspect
 import itertools
 import logging
 import os
+import shutil
 import signal
 import sys
+import tempfile
 import time
 import traceback
 import webbrowser
 from typing import TYPE_CHECKING
 
 import gevent
+import zmq
 
 from . import log, stats
 from .argument_parser import (
@@ -145,6 +148,35 @@ def merge_locustfiles_content(
     return available_user_classes, available_shape_classes, available_user_tasks, shape_class
 
 
+def create_master_ipc_path() -> str | None:
+    """
+    Create an ipc:// socket path for the master and its --processes children to talk over,
+    in a new private directory, so that a stale or foreign file can't get in the way of the bind.
+
+    Returns None (and the children connect over tcp loopback instead) if an ipc socket can't be bound there,
+    e.g. because the path is too long for a unix socket. The caller is responsible for removing the directory.
+    """
+    ipc_dir = tempfile.mkdtemp(prefix="locust-")
+    ipc_path = os.path.join(ipc_dir, "master.ipc")
+    context = zmq.Context()
+    socket = context.socket(zmq.ROUTER)
+    try:
+        socket.bind(f"ipc://{ipc_path}")
+    except zmq.ZMQError as e:
+        logging.debug(f"Could not bind ipc socket at {ipc_path} ({e}), using tcp for worker processes")
+        shutil.rmtree(ipc_dir, ignore_errors=True)
+        return None
+    finally:
+        socket.close(linger=0)
+        context.term()
+    # the probe socket may leave the socket file behind, and the master needs to bind there again
+    try:
+        os.remove(ipc_path)
+    except FileNotFoundError:
+        pass
+    return ipc_path
+
+
 def main():
     # find specified locustfile(s) and make sure it exists, using a very simplified
     # command line parser that is only used to parse the -f option.
@@ -187,6 +219,8 @@ def main():
             start_message += ", OpenTelemetry enabled"
 
     children = []
+    # ipc:// socket path used by the master and its child worker processes when running with --processes
+    master_ipc_path = None
     logger = logging.getLogger(__name__)
 
     logger.info(start_message)
@@ -208,6 +242,12 @@ def main():
                 "--master cannot be combined with --processes. Remove --master, as it is implicit as long as --worker is not set.\n"
             )
             sys.exit(1)
+        elif options.relay:
+            sys.stderr.write("--relay cannot be combined with --processes\n")
+            sys.exit(1)
+        if not options.worker and zmq.has("ipc"):
+            # the children connect to the master in this process over an ipc socket instead of over tcp loopback
+            master_ipc_path = create_master_ipc_path()
         # Optimize copy-on-write-behavior to save some memory (aprx 26MB -> 15MB rss) in child processes
         gc.collect()  # avoid freezing garbage
         if hasattr(gc, "freeze"):
@@ -293,6 +333,9 @@ def main():
 
                 atexit.register(kill_workers, children)
 
+                if master_ipc_path:
+                    atexit.register(shutil.rmtree, os.path.dirname(master_ipc_path), ignore_errors=True)
+
     greenlet_exception_handler = greenlet_exception_logger(logger)
 
     if options.list_commands:
@@ -397,7 +440,18 @@ See https://github.com/locustio/locust/wiki/Installation#increasing-maximum-numb
         print_task_ratio_json(user_classes, options.num_users)
         sys.exit(0)
 
-    if options.master:
+    if options.relay:
+        if options.master or options.worker:
+            logger.error("The --relay argument cannot be combined with --master or --worker")
+            sys.exit(-1)
+        runner = environment.create_relay_runner(
+            options.master_host,
+            options.master_port,
+            relay_bind_host=options.master_bind_host,
+            relay_bind_port=options.master_bind_port,
+        )
+        logger.debug("Relaying to locust master: %s:%s", options.master_host, options.master_port)
+    elif options.master:
         if options.worker:
             logger.error("The --master argument cannot be combined with --worker")
             sys.exit(-1)
@@ -407,10 +461,11 @@ See https://github.com/locustio/locust/wiki/Installation#increasing-maximum-numb
         runner = environment.create_master_runner(
             master_bind_host=options.master_bind_host,
             master_bind_port=options.master_bind_port,
+            master_ipc_path=master_ipc_path,
         )
     elif options.worker:
         try:
-            runner = environment.create_worker_runner(options.master_host, options.master_port)
+            runner = environment.create_worker_runner(options.master_host, options.master_port, master_ipc_path)
             logger.debug(
                 "Connected to locust master: %s:%s%s", options.master_host, options.master_port, options.web_base_path
             )
@@ -424,7 +479,7 @@ See https://github.com/locustio/locust/wiki/Installation#increasing-maximum-numb
     main_greenlet = runner.greenlet
 
     if options.run_time:
-        if options.worker:
+        if options.worker or options.relay:
             logger.debug("--run-time specified for a worker node will be ignored.")
 
     if options.csv_prefix:
@@ -439,7 +494,7 @@ See https://github.com/locustio/locust/wiki/Installation#increasing-maximum-numb
         stats_csv_writer = stats.StatsCSV(environment, stats.PERCENTILES_TO_REPORT)
 
     # start Web UI
-    if not options.headless and not options.worker:
+    if not options.headless and not options.worker and not options.relay:
         protocol = "https" if options.tls_cert and options.tls_key else "http"
 
         if options.web_base_path and options.web_base_path[0] != "/":
@@ -478,7 +533,7 @@ See https://github.com/locustio/locust/wiki/Installation#increasing-maximum-numb
     if options.autostart and options.headless:
         logger.info("The --autostart argument is implied by --headless, no need to set both.")
 
-    if options.autostart and options.worker:
+    if options.autostart and (options.worker or options.relay):
         logger.debug("The --autostart argument has no meaning on a worker.")
 
     def assign_equal_weights(environment, **kwargs):
@@ -520,7 +575,9 @@ See https://github.com/locustio/locust/wiki/Installation#increasing-maximum-numb
 
     headless_master_greenlet = None
     stats_printer_greenlet = None
-    if not options.only_summary and (options.print_stats or (options.headless and not options.worker)):
+    if not options.only_summary and (
+        options.print_stats or (options.headless and not options.worker and not options.relay)
+    ):
         # spawn stats printing greenlet
         stats_printer_greenlet = gevent.spawn(stats.stats_printer(runner.stats))
         stats_printer_greenlet.link_exception(greenlet_exception_handler)
@@ -552,7 +609,7 @@ See https://github.com/locustio/locust/wiki/Installation#increasing-maximum-numb
                 #       Right now, if the user sends a ctrl+c, the master will not gracefully
                 #       shutdown resulting in all the already started workers to stay active.
                 time.sleep(1)
-        if not options.worker:
+        if not options.worker and not options.relay:
             # apply headless mode defaults
             if options.num_users is None:
                 options.num_users = 1
@@ -585,7 +642,7 @@ See https://github.com/locustio/locust/wiki/Installation#increasing-maximum-numb
         start_automatic_run()
 
     input_listener_greenlet = None
-    if not options.worker:
+    if not options.worker and not options.relay:
         # spawn input listener greenlet
         input_listener_greenlet = gevent.spawn(
             input_listener(
@@ -654,10 +711,14 @@ See https://github.com/locustio/locust/wiki/Installation#increasing-maximum-numb
             stats.print_stats_json(runner.stats)
         if options.json_file:
             stats.save_stats_json(runner.stats, options.json_file)
-        elif not isinstance(runner, locust.runners.WorkerRunner):
+        elif not isinstance(runner, (locust.runners.WorkerRunner, locust.runners.RelayRunner)):
             stats.print_stats(runner.stats, current=False)
             stats.print_percentile_stats(runner.stats)
             stats.print_error_report(runner.stats)
+            if runner.arrival_rate is not None:
+                logger.info(
+                    f"Arrival rate: {runner.dropped_iterations} iterations dropped (all users busy), {runner.late_iterations} iterations started late"
+                )
         environment.events.quit.fire(exit_code=code)
         sys.exit(code)
 
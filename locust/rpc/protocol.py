@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import datetime
+import zlib
+from collections.abc import Callable
+from typing import Any
 
 import msgpack
 
@@ -13,6 +16,30 @@ except ImportError:
             raise Exception("You need to install pymongo or at least bson to be able to send/receive ObjectIds")
 
 
+"""
+Version of the compact wire format used for the most frequent messages (see Message.serialize).
+Workers only use it if the master has announced support for the same version in its "ack" message.
+"""
+COMPACT_FORMAT_VERSION = 1
+"""0xc1 is never used by msgpack, so a compact message can't be mistaken for a regular one"""
+COMPACT_FORMAT_MARKER = 0xC1
+"""Compact messages smaller than this (in bytes) are not compressed"""
+COMPRESSION_THRESHOLD = 1024
+
+COMPRESSORS: dict[str, tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (zlib.compress, zlib.decompress),
+}
+try:
+    import lz4.frame
+
+    COMPRESSORS["lz4"] = (lz4.frame.compress, lz4.frame.decompress)
+except ImportError:
+    pass
+
+_COMPRESSION_IDS = {"zlib": 1, "lz4": 2}
+_COMPRESSION_NAMES = {v: k for k, v in _COMPRESSION_IDS.items()}
+
+
 def decode(obj):
     if "__datetime__" in obj:
         obj = datetime.datetime.strptime(obj["as_str"], "%Y%m%dT%H:%M:%S.%f")
@@ -29,6 +56,74 @@ def encode(obj):
     return obj
 
 
+_HEARTBEAT_KEYS = ("state", "current_cpu_usage", "current_memory_usage")
+_STATS_KEYS = ("stats_delta", "errors", "user_count", "user_classes_count")
+_STATS_DELTA_KEYS = ("version", "names", "entries", "total")
+_STATS_ERROR_KEYS = ("method", "name", "error", "occurrences", "first_seen", "last_seen")
+
+
+def _encode_heartbeat(data: Any) -> list | None:
+    if not isinstance(data, dict) or data.keys() != set(_HEARTBEAT_KEYS):
+        return None
+    return [data[key] for key in _HEARTBEAT_KEYS]
+
+
+def _decode_heartbeat(fields: list) -> dict[str, Any]:
+    return dict(zip(_HEARTBEAT_KEYS, fields))
+
+
+def _encode_spawning(data: Any) -> list | None:
+    return [] if data is None else None
+
+
+def _decode_spawning(fields: list) -> None:
+    return None
+
+
+def _encode_stats(data: Any) -> list | None:
+    # only delta encoded stats reports (see StatsReportCodec) have a compact representation
+    if not isinstance(data, dict) or not all(key in data for key in _STATS_KEYS):
+        return None
+    delta = data["stats_delta"]
+    if delta.keys() != set(_STATS_DELTA_KEYS):
+        return None
+    try:
+        # error keys are sha256 hex digests
+        errors = [[bytes.fromhex(key), *(error[k] for k in _STATS_ERROR_KEYS)] for key, error in data["errors"].items()]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return [
+        [delta[key] for key in _STATS_DELTA_KEYS],
+        errors,
+        data["user_count"],
+        data["user_classes_count"],
+        {key: value for key, value in data.items() if key not in _STATS_KEYS},
+    ]
+
+
+def _decode_stats(fields: list) -> dict[str, Any]:
+    delta, errors, user_count, user_classes_count, extra = fields
+    return {
+        "stats_delta": dict(zip(_STATS_DELTA_KEYS, delta)),
+        "errors": {error[0].hex(): dict(zip(_STATS_ERROR_KEYS, error[1:])) for error in errors},
+        "user_count": user_count,
+        "user_classes_count": user_classes_count,
+        **extra,
+    }
+
+
+# message type => (schema id, encoder, decoder)
+# An encoder returns None if the data doesn't fit the schema, in which case the regular format is used
+_COMPACT_SCHEMAS: dict[str, tuple[int, Callable[[Any], list | None], Callable[[list], Any]]] = {
+    "heartbeat": (1, _encode_heartbeat, _decode_heartbeat),
+    "spawning": (2, _encode_spawning, _decode_spawning),
+    "stats": (3, _encode_stats, _decode_stats),
+}
+_COMPACT_SCHEMAS_BY_ID = {
+    schema_id: (message_type, dec) for message_type, (schema_id, _, dec) in _COMPACT_SCHEMAS.items()
+}
+
+
 class Message:
     def __init__(self, message_type, data, node_id):
         self.type = message_type
@@ -38,10 +133,51 @@ class Message:
     def __repr__(self):
         return f"<Message {self.type}:{self.node_id}>"
 
-    def serialize(self):
+    def serialize(self, compact=False, compression=None):
+        """
+        Serialize the message as msgpack. If compact is True, heartbeat, spawning and (delta encoded)
+        stats messages are sent as positional arrays instead of dicts, optionally compressed with
+        the specified compression (one of COMPRESSORS). Other messages use the regular format.
+        """
+        if compact and (schema := _COMPACT_SCHEMAS.get(self.type)):
+            schema_id, encoder, _ = schema
+            fields = encoder(self.data)
+            if fields is not None:
+                body = msgpack.dumps((schema_id, self.node_id, fields), default=encode)
+                compression_id = 0
+                if compression and len(body) > COMPRESSION_THRESHOLD:
+                    body = COMPRESSORS[compression][0](body)
+                    compression_id = _COMPRESSION_IDS[compression]
+                return bytes((COMPACT_FORMAT_MARKER, COMPACT_FORMAT_VERSION, compression_id)) + body
         return msgpack.dumps((self.type, self.data, self.node_id), default=encode)
 
     @classmethod
     def unserialize(cls, data):
+        if data[:1] == bytes((COMPACT_FORMAT_MARKER,)):
+            if data[1] != COMPACT_FORMAT_VERSION:
+                raise ValueError(f"Unsupported compact message format version {data[1]}")
+            body = data[3:]
+            if data[2]:
+                compression = _COMPRESSION_NAMES.get(data[2])
+                if compression not in COMPRESSORS:
+                    raise ValueError(f"Unsupported message compression {compression or data[2]}")
+                try:
+                    body = COMPRESSORS[compression][1](body)
+                except Exception as e:
+                    raise ValueError(f"Failed to decompress {compression} message") from e
+            try:
+                schema_id, node_id, fields = msgpack.loads(body, raw=False, strict_map_key=False, object_hook=decode)
+                schema = _COMPACT_SCHEMAS_BY_ID.get(schema_id)
+            except TypeError as e:
+                raise ValueError("Malformed compact message") from e
+            if schema is None:
+                raise ValueError(f"Unknown compact message schema {schema_id}")
+            message_type, decoder = schema
+            try:
+                data = decoder(fields)
+            except (TypeError, IndexError, KeyError, AttributeError) as e:
+                # raised as ValueError, like other broken messages, so that receiving fails with RPCReceiveError
+                raise ValueError(f"Malformed compact {message_type} message") from e
+            return cls(message_type, data, node_id)
         msg = cls(*msgpack.loads(data, raw=False, strict_map_key=False, object_hook=decode))
         return msg
@@ -7,9 +7,13 @@ from socket import gaierror, has_dualstack_ipv6
 import msgpack.exceptions as msgerr
 import zmq.error as zmqerr
 import zmq.green as zmq
+from gevent.threadpool import ThreadPool
 
 from .protocol import Message
 
+"""Received messages larger than this (in bytes) are decoded in the decoder thread, if it is enabled"""
+THREADED_DECODE_THRESHOLD = 16 * 1024
+
 
 class BaseSocket:
     def __init__(self, sock_type, ipv4_only):
@@ -21,25 +25,35 @@ class BaseSocket:
         if has_dualstack_ipv6() and not ipv4_only:
             self.socket.setsockopt(zmq.IPV6, 1)
 
+        # use the compact message format (and compression) when sending, see Message.serialize
+        self.compact = False
+        self.compression = None
+        # node id => identity of the connection that messages for that node are sent through
+        # (used by send_to_client, for workers that are connected via a relay)
+        self.routes: dict[str, str] = {}
+        # OS thread used to decode large messages, so that they don't block the gevent loop
+        self.decoder: ThreadPool | None = None
+
     @retry()
     def send(self, msg):
         try:
-            self.socket.send(msg.serialize(), zmq.NOBLOCK)
+            self.socket.send(msg.serialize(self.compact, self.compression), zmq.NOBLOCK)
         except zmqerr.ZMQError as e:
             raise RPCSendError("ZMQ sent failure") from e
 
     @retry()
     def send_to_client(self, msg):
         try:
-            self.socket.send_multipart([msg.node_id.encode(), msg.serialize()])
+            identity = self.routes.get(msg.node_id, msg.node_id)
+            self.socket.send_multipart([identity.encode(), msg.serialize()])
         except zmqerr.ZMQError as e:
             raise RPCSendError("ZMQ sent failure") from e
 
     def recv(self):
         try:
             data = self.socket.recv()
-            msg = Message.unserialize(data)
-        except msgerr.ExtraData as e:
+            msg = self._unserialize(data)
+        except (msgerr.ExtraData, ValueError) as e:
             raise RPCReceiveError("ZMQ interrupted message") from e
         except zmqerr.ZMQError as e:
             raise RPCError("ZMQ network broken") from e
@@ -54,13 +68,24 @@ class BaseSocket:
         except zmqerr.ZMQError as e:
             raise RPCError("ZMQ network broken") from e
         try:
-            msg = Message.unserialize(data[1])
-        except (UnicodeDecodeError, msgerr.ExtraData) as e:
+            msg = self._unserialize(data[1])
+        except (UnicodeDecodeError, msgerr.ExtraData, ValueError) as e:
             raise RPCReceiveError("ZMQ interrupted or corrupted message", addr=addr) from e
         return addr, msg
 
+    def _unserialize(self, data):
+        if self.decoder is not None and len(data) >= THREADED_DECODE_THRESHOLD:
+            # the calling greenlet waits for the result, other greenlets keep running in the meantime
+            msg, error = self.decoder.apply(_unserialize_catching_errors, (data,))
+            if error is not None:
+                raise error
+            return msg
+        return Message.unserialize(data)
+
     def close(self, linger=None):
         self.socket.close(linger=linger)
+        if self.decoder is not None:
+            self.decoder.kill()
 
     def ipv4_only(self, host, port) -> bool:
         try:
@@ -74,9 +99,23 @@ class BaseSocket:
         return False
 
 
+def _unserialize_catching_errors(data):
+    # exceptions are passed back to the caller, instead of being logged by the thread pool
+    try:
+        return Message.unserialize(data), None
+    except Exception as e:
+        return None, e
+
+
 class Server(BaseSocket):
-    def __init__(self, host, port):
+    def __init__(self, host, port, decode_in_thread=False, ipc_path=None):
+        """
+        :param ipc_path: If set, also listen on an ipc:// socket at this path, which is faster than tcp for
+                         clients running on the same machine (e.g. workers started with --processes)
+        """
         BaseSocket.__init__(self, zmq.ROUTER, self.ipv4_only(host, port))
+        if decode_in_thread:
+            self.decoder = ThreadPool(1)
         if port == 0:
             self.port = self.socket.bind_to_random_port(f"tcp://{host}")
         else:
@@ -85,10 +124,21 @@ class Server(BaseSocket):
                 self.port = port
             except zmqerr.ZMQError as e:
                 raise RPCError(f"Socket bind failure: {e}")
+        if ipc_path:
+            try:
+                self.socket.bind(f"ipc://{ipc_path}")
+            except zmqerr.ZMQError as e:
+                raise RPCError(f"Socket bind failure: {e}")
 
 
 class Client(BaseSocket):
-    def __init__(self, host, port, identity):
-        BaseSocket.__init__(self, zmq.DEALER, self.ipv4_only(host, port))
+    def __init__(self, host, port, identity, ipc_path=None):
+        """
+        :param ipc_path: If set, connect to the server's ipc:// socket at this path instead of using tcp
+        """
+        BaseSocket.__init__(self, zmq.DEALER, ipc_path is not None or self.ipv4_only(host, port))
         self.socket.setsockopt(zmq.IDENTITY, identity.encode())
-        self.socket.connect("tcp://%s:%i" % (host, port))
+        if ipc_path:
+            self.socket.connect(f"ipc://{ipc_path}")
+        else:
+            self.socket.connect("tcp://%s:%i" % (host, port))
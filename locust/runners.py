@@ -4,6 +4,7 @@ from locust import __version__
 
 import functools
 import inspect
+import itertools
 import json
 import logging
 import os
@@ -27,11 +28,22 @@ from gevent.event import Event
 from gevent.pool import Group
 
 from . import argument_parser
+from .arrival_rate import ArrivalRateScheduler
 from .dispatch import UsersDispatcher
 from .exception import RPCError, RPCReceiveError, RPCSendError, StopTest
+from .hub_lag import HubLagMonitor
 from .log import get_logs, greenlet_exception_logger
 from .rpc import Message, rpc
-from .stats import RequestStats, StatsError, setup_distributed_stats_event_listeners
+from .rpc.protocol import COMPACT_FORMAT_VERSION, COMPRESSORS
+from .stats import (
+    RequestStats,
+    ResponseTimeHistogram,
+    StatsError,
+    StatsReportCodec,
+    current_iteration_schedule,
+    setup_distributed_stats_event_listeners,
+)
+from .timer_wheel import TimerWheel
 from .util.directory import get_abspaths_in
 from .util.url import is_url
 
@@ -61,6 +73,7 @@ MASTER_HEARTBEAT_TIMEOUT = 60
 FALLBACK_INTERVAL = 5
 CONNECT_TIMEOUT = 5
 CONNECT_RETRY_COUNT = 60
+SPAWN_BATCH_SIZE = 100
 
 
 def locust_exception_handler(environment: Environment):
@@ -101,6 +114,8 @@ class Runner:
     def __init__(self, environment: Environment) -> None:
         self.environment = environment
         self.user_greenlets = Group()
+        # user class name => greenlets of the running users of that class, in the order they were spawned
+        self._user_greenlets_by_class: dict[str, dict[gevent.Greenlet, User]] = defaultdict(dict)
         self.greenlet = Group()
         self.state = STATE_INIT
         self.spawning_greenlet: gevent.Greenlet | None = None
@@ -119,16 +134,20 @@ class Runner:
         # target_user_count is set before the ramp-up/ramp-down occurs.
         self.target_user_count: int = 0
         self.custom_messages: dict[str, tuple[Callable, bool]] = {}
+        # iterations per second, if running an open workload model (see set_arrival_rate)
+        self.arrival_rate: float | None = None
+        self.arrival_rate_greenlet: gevent.Greenlet | None = None
+        # only started by the runners that run users
+        self.hub_lag_monitor: HubLagMonitor | None = HubLagMonitor(self.stats) if environment.monitor_hub_lag else None
+        self.hub_lag_monitor_greenlet: gevent.Greenlet | None = None
 
         self._users_dispatcher: UsersDispatcher | None = None
 
-        # set up event listeners for recording requests
-        def on_request(request_type, name, response_time, response_length, exception=None, **_kwargs):
-            self.stats.log_request(request_type, name, response_time, response_length)
-            if exception:
-                self.stats.log_error(request_type, name, exception)
-
-        self.environment.events.request.add_listener(on_request)
+        # set up event listener for recording requests
+        self.request_events_batched = False
+        self.environment.events.request.add_listener(self._on_request)
+        if getattr(environment.parsed_options, "batch_request_events", False):
+            self.batch_request_events()
 
         self.connection_broken = False
         self.final_user_classes_count: dict[str, int] = {}  # just for the ratio report, fills before runner stops
@@ -155,6 +174,66 @@ class Runner:
     def user_classes_by_name(self) -> dict[str, type[User]]:
         return self.environment.user_classes_by_name
 
+    def _on_request(self, request_type, name, response_time, response_length, exception=None, **_kwargs) -> None:
+        iteration_schedule = None
+        if self.environment.correct_coordinated_omission:
+            # requests made outside of a scheduled task iteration are logged uncorrected
+            iteration_schedule = current_iteration_schedule.get() or (0.0, 0.0)
+        lagged = (
+            response_time is not None
+            and self.hub_lag_monitor is not None
+            and self.hub_lag_monitor.lagged_during(response_time / 1000)
+        )
+        self.stats.log_request(request_type, name, response_time, response_length, iteration_schedule, lagged)
+        if exception:
+            self.stats.log_error(request_type, name, exception)
+
+    def _on_requests(self, requests: list[dict[str, Any]]) -> None:
+        # the requests were made a little while ago, so the hub lag is checked for when each of them finished
+        # (which is only known if the client reported when the request started)
+        time_offset = time.perf_counter() - time.time()
+        for request in requests:
+            response_time = request["response_time"]
+            start_time = request.get("start_time")
+            lagged = False
+            if self.hub_lag_monitor is not None and response_time is not None and start_time:
+                end = start_time + response_time / 1000 + time_offset
+                lagged = self.hub_lag_monitor.lagged_during(response_time / 1000, end)
+            request_type, name = request["request_type"], request["name"]
+            self.stats.log_request(
+                request_type, name, response_time, request["response_length"], lagged=lagged, timestamp=start_time
+            )
+            if exception := request.get("exception"):
+                self.stats.log_error(request_type, name, exception, timestamp=start_time)
+
+    def _start_hub_lag_monitor(self) -> None:
+        if self.hub_lag_monitor is not None:
+            self.hub_lag_monitor_greenlet = self.greenlet.spawn(self.hub_lag_monitor.run)
+            self.hub_lag_monitor_greenlet.link_exception(locust_exception_handler(self.environment))
+
+    def disable_hub_lag_monitor(self) -> None:
+        """Stop measuring the hub lag (see --no-hub-lag-monitor)"""
+        self.environment.monitor_hub_lag = False
+        self.hub_lag_monitor = None
+        if self.hub_lag_monitor_greenlet is not None:
+            self.hub_lag_monitor_greenlet.kill(block=False)
+            self.hub_lag_monitor_greenlet = None
+
+    def batch_request_events(self) -> None:
+        """
+        Record requests in the stats in batches (see :ref:`batched-request-events`), instead of one by one
+        as each request event is fired
+        """
+        if self.request_events_batched:
+            return
+        if self.environment.correct_coordinated_omission:
+            # the iteration schedule of each request is only known while the request event is fired
+            logger.warning("Request events can't be batched when correcting for coordinated omission")
+            return
+        self.environment.events.request.remove_listener(self._on_request)
+        self.environment.events.request.add_batch_listener(self._on_requests)
+        self.request_events_batched = True
+
     @property
     def stats(self) -> RequestStats:
         return self.environment.stats
@@ -175,24 +254,10 @@ class Runner:
         """
         :returns: Number of currently running users for each user class
         """
-        user_classes_count = {user_class.__name__: 0 for user_class in self.user_classes}
-        for user_greenlet in self.user_greenlets:
-            try:
-                user = user_greenlet.args[0]
-            except IndexError:
-                # TODO: Find out why args is sometimes empty. In gevent code,
-                #       the supplied args are cleared in the gevent.greenlet.Greenlet.__free,
-                #       so it seems a good place to start investigating. My suspicion is that
-                #       the supplied args are emptied whenever the greenlet is dead, so we can
-                #       simply ignore the greenlets with empty args.
-                logger.debug(
-                    "ERROR: While calculating number of running users, we encountered a user that didn't have proper args %s (user_greenlet.dead=%s)",
-                    user_greenlet,
-                    user_greenlet.dead,
-                )
-                continue
-            user_classes_count[user.__class__.__name__] += 1
-        return user_classes_count
+        return {
+            user_class.__name__: len(self._user_greenlets_by_class.get(user_class.__name__, ()))
+            for user_class in self.user_classes
+        }
 
     def update_state(self, new_state: str) -> None:
         """
@@ -211,6 +276,45 @@ class Runner:
             )
         return self.cpu_warning_emitted
 
+    def set_arrival_rate(self, rate: float) -> None:
+        """
+        Switch to an open workload model, where the running users start a new task every 1/rate seconds
+        (in total), regardless of how long the tasks take, instead of waiting for their wait_time between tasks.
+        The users act as a pool, so there must be enough of them to run the expected number of concurrent
+        iterations. Can be called from :meth:`LoadTestShape.tick <locust.LoadTestShape.tick>` to shape the rate.
+
+        :param rate: Number of task iterations to start per second
+        """
+        self.arrival_rate = rate
+        if self.environment.arrival_rate_scheduler is None:
+            self.environment.arrival_rate_scheduler = ArrivalRateScheduler()
+        self.environment.arrival_rate_scheduler.set_rate(rate)
+        if self.state in (STATE_SPAWNING, STATE_RUNNING):
+            self._start_arrival_rate_scheduler()
+
+    def _start_arrival_rate_scheduler(self) -> None:
+        scheduler = self.environment.arrival_rate_scheduler
+        if scheduler is not None and self.arrival_rate_greenlet is None:
+            scheduler.reset_counters()
+            self.arrival_rate_greenlet = self.greenlet.spawn(scheduler.run)
+            self.arrival_rate_greenlet.link_exception(locust_exception_handler(self.environment))
+
+    @property
+    def dropped_iterations(self) -> int:
+        """
+        :returns: Number of iterations that weren't started because all users were busy (see set_arrival_rate)
+        """
+        scheduler = self.environment.arrival_rate_scheduler
+        return scheduler.dropped_iterations if scheduler is not None else 0
+
+    @property
+    def late_iterations(self) -> int:
+        """
+        :returns: Number of iterations that started noticeably later than they were scheduled to (see set_arrival_rate)
+        """
+        scheduler = self.environment.arrival_rate_scheduler
+        return scheduler.late_iterations if scheduler is not None else 0
+
     def spawn_users(self, user_classes_spawn_count: dict[str, int], wait: bool = False):
         if self.state == STATE_INIT or self.state == STATE_STOPPED:
             self.update_state(STATE_SPAWNING)
@@ -222,17 +326,27 @@ class Runner:
         def spawn(user_class: str, spawn_count: int) -> list[User]:
             n = 0
             new_users: list[User] = []
+            user_class_obj = self.user_classes_by_name[user_class]
+            user_greenlets = self._user_greenlets_by_class[user_class]
             while n < spawn_count:
-                new_user = self.user_classes_by_name[user_class](self.environment)
+                # yield between batches so that already running users aren't starved during a fast ramp-up
+                if n and n % SPAWN_BATCH_SIZE == 0:
+                    logger.debug("%i users spawned", self.user_count)
+                    gevent.sleep(0)
+                    if self.state in (STATE_STOPPING, STATE_STOPPED):
+                        break
+                new_user = user_class_obj(self.environment)
                 assert hasattr(new_user, "environment"), (
                     f"Attribute 'environment' is missing on user {user_class}. Perhaps you defined your own __init__ and forgot to call the base constructor? (super().__init__(*args, **kwargs))"
                 )
                 new_user.start(self.user_greenlets)
+                user_greenlet = new_user.greenlet
+                user_greenlets[user_greenlet] = new_user
+                # forget the user as soon as its greenlet has finished, however that happens
+                user_greenlet.rawlink(user_greenlets.pop)
                 new_users.append(new_user)
                 n += 1
-                if n % 10 == 0 or n == spawn_count:
-                    logger.debug("%i users spawned" % self.user_count)
-            logger.debug(f"All users of class {user_class} spawned")
+            logger.debug("All users of class %s spawned (%i users running)", user_class, self.user_count)
             return new_users
 
         new_users: list[User] = []
@@ -249,22 +363,8 @@ class Runner:
         stop_group = Group()
 
         for user_class, stop_count in user_classes_stop_count.items():
-            if self.user_classes_count[user_class] == 0:
-                continue
-
-            to_stop: list[greenlet.greenlet] = []
-            for user_greenlet in self.user_greenlets:
-                if len(to_stop) == stop_count:
-                    break
-                try:
-                    user = user_greenlet.args[0]
-                except IndexError:
-                    logger.error(
-                        "While stopping users, we encountered a user that didn't have proper args %s", user_greenlet
-                    )
-                    continue
-                if type(user) is self.user_classes_by_name[user_class]:
-                    to_stop.append(user)
+            # the oldest users of the class are stopped first
+            to_stop = list(itertools.islice(self._user_greenlets_by_class.get(user_class, {}).values(), stop_count))
 
             if not to_stop:
                 continue
@@ -402,7 +502,13 @@ class Runner:
                 self.shape_greenlet = None
             self.shape_last_tick = None
 
+        if self.arrival_rate_greenlet is not None:
+            self.arrival_rate_greenlet.kill(block=True)
+            self.arrival_rate_greenlet = None
+
         self.stop_users(self.user_classes_count)
+        # record the requests of the stopped users
+        self.environment.events.request.flush()
 
         self._users_dispatcher = None
 
@@ -455,6 +561,7 @@ class LocalRunner(Runner):
         # Only when running in standalone mode (non-distributed)
         self._local_worker_node = WorkerNode(id="local")
         self._local_worker_node.user_classes_count = self.user_classes_count
+        self._start_hub_lag_monitor()
 
         # register listener that's logs the exception for the local runner
         def on_user_error(user_instance, exception, tb):
@@ -463,6 +570,9 @@ class LocalRunner(Runner):
 
         self.environment.events.user_error.add_listener(on_user_error)
 
+        if arrival_rate := getattr(environment.parsed_options, "arrival_rate", None):
+            self.set_arrival_rate(arrival_rate)
+
     def _start(self, user_count: int, spawn_rate: float, wait: bool = False, user_classes: list | None = None) -> None:
         """
         Start running a load test
@@ -485,6 +595,8 @@ class LocalRunner(Runner):
             self.environment._filter_tasks_by_tags()
             self.environment.events.test_start.fire(environment=self.environment)
 
+        self._start_arrival_rate_scheduler()
+
         if wait and user_count - self.user_count > spawn_rate:
             raise ValueError("wait is True but the amount of users to add is greater than the spawn rate")
 
@@ -584,7 +696,20 @@ class LocalRunner(Runner):
 class DistributedRunner(Runner):
     def __init__(self, environment) -> None:
         super().__init__(environment)
-        setup_distributed_stats_event_listeners(self.environment.events, self.stats)
+        self.stats_report_codec = setup_distributed_stats_event_listeners(self.environment.events, self.stats)
+
+        # send the event listener timings (if enabled) since the last report, and gather the ones of the workers
+        def on_report_to_master(client_id: str, data: dict[str, Any]) -> None:
+            if self.environment.events.listener_timing_enabled:
+                data["listener_timings"] = self.environment.events.get_listener_timings()
+                self.environment.events.reset_listener_timings()
+
+        def on_worker_report(client_id: str, data: dict[str, Any]) -> None:
+            if "listener_timings" in data:
+                self.environment.events.merge_listener_timings(data["listener_timings"])
+
+        self.environment.events.report_to_master.add_listener(on_report_to_master)
+        self.environment.events.worker_report.add_listener(on_worker_report)
 
 
 class WorkerNode:
@@ -597,6 +722,11 @@ class WorkerNode:
         self.memory_usage: int = 0
         # The reported users running on the worker
         self.user_classes_count: dict[str, int] = {}
+        # The reported number of dropped and late iterations (when using an arrival rate)
+        self.dropped_iterations = 0
+        self.late_iterations = 0
+        # The reported hub lag (see locust.hub_lag)
+        self.hub_lag = ResponseTimeHistogram()
 
     @property
     def user_count(self) -> int:
@@ -656,24 +786,38 @@ class MasterRunner(DistributedRunner):
     :class:`WorkerRunners <WorkerRunner>` will aggregated.
     """
 
-    def __init__(self, environment, master_bind_host, master_bind_port) -> None:
+    def __init__(self, environment, master_bind_host, master_bind_port, master_ipc_path=None) -> None:
         """
         :param environment: Environment instance
         :param master_bind_host: Host/interface to use for incoming worker connections
         :param master_bind_port: Port to use for incoming worker connections
+        :param master_ipc_path: Optional ipc:// socket path to also accept worker connections on
         """
         super().__init__(environment)
         self.worker_cpu_warning_emitted = False
         self.master_bind_host = master_bind_host
         self.master_bind_port = master_bind_port
+        self.master_ipc_path = master_ipc_path
         self.spawn_rate: float = 0.0
         self.spawning_completed = False
         self.worker_indexes: dict[str, int] = {}
         self.worker_index_max = 0
+        self.rpc_compression: str | None = None
+        rpc_compression = getattr(environment.parsed_options, "rpc_compression", "none")
+        if rpc_compression in COMPRESSORS:
+            self.rpc_compression = rpc_compression
+        elif rpc_compression != "none":
+            logger.warning(
+                f"{rpc_compression} compression is not available (is the lz4 package installed?), messages from workers will not be compressed"
+            )
+
+        self.rpc_decode_thread = bool(getattr(environment.parsed_options, "rpc_decode_thread", False))
 
         self.clients = WorkerNodes()
         try:
-            self.server = rpc.Server(master_bind_host, master_bind_port)
+            self.server = rpc.Server(
+                master_bind_host, master_bind_port, decode_in_thread=self.rpc_decode_thread, ipc_path=master_ipc_path
+            )
         except RPCError as e:
             if e.args[0] == "Socket bind failure: Address already in use":
                 port_string = (
@@ -685,6 +829,9 @@ class MasterRunner(DistributedRunner):
                 sys.exit(1)
             else:
                 raise
+        # workers that are connected via a relay: worker id => id of the relay (see RelayRunner)
+        self.relay_routes: dict[str, str] = {}
+        self.server.routes = self.relay_routes
 
         self._users_dispatcher: UsersDispatcher | None = None
 
@@ -693,19 +840,54 @@ class MasterRunner(DistributedRunner):
 
         # listener that gathers info on how many users the worker has spawned
         def on_worker_report(client_id: str, data: dict[str, Any]) -> None:
+            if "relayed_user_classes_count" in data:
+                # combined report from a relay, for all of the workers connected to it
+                for worker_id, user_classes_count in data["relayed_user_classes_count"].items():
+                    if worker_id in self.clients:
+                        self.clients[worker_id].user_classes_count = user_classes_count
+                for worker_id, (dropped, late) in data.get("relayed_iterations", {}).items():
+                    if worker_id in self.clients:
+                        self.clients[worker_id].dropped_iterations = dropped
+                        self.clients[worker_id].late_iterations = late
+                for worker_id, hub_lag in data.get("relayed_hub_lag", {}).items():
+                    if worker_id in self.clients:
+                        self.clients[worker_id].hub_lag.extend(hub_lag)
+                return
             if client_id not in self.clients:
                 logger.info("Discarded report from unrecognized worker %s", client_id)
                 return
             self.clients[client_id].user_classes_count = data["user_classes_count"]
+            if "dropped_iterations" in data:
+                self.clients[client_id].dropped_iterations = data["dropped_iterations"]
+                self.clients[client_id].late_iterations = data["late_iterations"]
+            self.clients[client_id].hub_lag.extend(data.get("hub_lag", {}))
 
         self.environment.events.worker_report.add_listener(on_worker_report)
 
+        # the hub lag of each worker is reset along with the stats
+        def on_reset_stats() -> None:
+            self._reset_worker_hub_lag()
+
+        def on_spawning_complete(user_count: int) -> None:
+            if environment.reset_stats:
+                self._reset_worker_hub_lag()
+
+        self.environment.events.reset_stats.add_listener(on_reset_stats)
+        self.environment.events.spawning_complete.add_listener(on_spawning_complete)
+
         # register listener that sends quit message to worker nodes
         def on_quitting(environment: Environment, **kw):
             self.quit()
 
         self.environment.events.quitting.add_listener(on_quitting)
 
+        if arrival_rate := getattr(environment.parsed_options, "arrival_rate", None):
+            self.set_arrival_rate(arrival_rate)
+
+    def _reset_worker_hub_lag(self) -> None:
+        for client in self.clients.values():
+            client.hub_lag = ResponseTimeHistogram()
+
     def rebalancing_enabled(self) -> bool:
         return self.environment.parsed_options is not None and cast(
             bool, self.environment.parsed_options.enable_rebalancing
@@ -728,6 +910,21 @@ class MasterRunner(DistributedRunner):
     def user_count(self) -> int:
         return sum([c.user_count for c in self.clients.values()])
 
+    def set_arrival_rate(self, rate: float) -> None:
+        # the rate is split evenly between the workers, and updated whenever users are (re)dispatched
+        self.arrival_rate = rate
+        workers = self.clients.ready + self.clients.spawning + self.clients.running
+        for client in workers:
+            self.server.send_to_client(Message("arrival_rate", {"rate": rate / len(workers)}, client.id))
+
+    @property
+    def dropped_iterations(self) -> int:
+        return sum(c.dropped_iterations for c in self.clients.values())
+
+    @property
+    def late_iterations(self) -> int:
+        return sum(c.late_iterations for c in self.clients.values())
+
     def cpu_log_warning(self) -> bool:
         warning_emitted = Runner.cpu_log_warning(self)
         if self.worker_cpu_warning_emitted:
@@ -771,6 +968,7 @@ class MasterRunner(DistributedRunner):
 
         if self.state != STATE_RUNNING and self.state != STATE_SPAWNING:
             self.stats.clear_all()
+            self._reset_worker_hub_lag()
             self.exceptions = {}
             self.environment._filter_tasks_by_tags()
             self.environment.events.test_start.fire(environment=self.environment)
@@ -796,6 +994,8 @@ class MasterRunner(DistributedRunner):
                         if self.environment.parsed_options
                         else {},
                     }
+                    if self.arrival_rate is not None:
+                        data["arrival_rate"] = self.arrival_rate / len(dispatched_users)
                     dispatch_greenlets.add(
                         gevent.spawn_later(
                             0,
@@ -966,7 +1166,13 @@ class MasterRunner(DistributedRunner):
         logger.info("Resetting RPC server and all worker connections.")
         try:
             self.server.close(linger=0)
-            self.server = rpc.Server(self.master_bind_host, self.master_bind_port)
+            self.server = rpc.Server(
+                self.master_bind_host,
+                self.master_bind_port,
+                decode_in_thread=self.rpc_decode_thread,
+                ipc_path=self.master_ipc_path,
+            )
+            self.server.routes = self.relay_routes
             self.connection_broken = False
         except RPCError as e:
             logger.error(f"Temporary failure when resetting connection: {e}, will retry later.")
@@ -1011,6 +1217,10 @@ class MasterRunner(DistributedRunner):
                     "Got KeyboardInterrupt in client_listener. Other greenlets should catch this and shut down."
                 )
                 continue
+            if msg.node_id != client_id:
+                # message from a worker that is connected via a relay, send replies through the relay
+                self.relay_routes[msg.node_id] = client_id
+                client_id = msg.node_id
             self.handle_message(client_id, msg)
 
     def handle_message(self, client_id: str, msg: Message) -> None:
@@ -1028,7 +1238,17 @@ class MasterRunner(DistributedRunner):
                         logger.warning(
                             f"A worker ({client_id}) running a different version ({msg.data}) connected, master version is {__version__}"
                         )
-                self.send_message("ack", client_id=client_id, data={"index": self.get_worker_index(client_id)})
+                # the worker will announce the names of its stats entries again after (re)connecting
+                self.stats_report_codec.forget_worker(client_id)
+                self.send_message(
+                    "ack",
+                    client_id=client_id,
+                    data={
+                        "index": self.get_worker_index(client_id),
+                        "stats_delta": StatsReportCodec.version,
+                        "compact_format": {"version": COMPACT_FORMAT_VERSION, "compression": self.rpc_compression},
+                    },
+                )
                 self.environment.events.worker_connect.fire(client_id=msg.node_id)
                 client_already_connected = client_id in self.clients
                 self.clients[client_id] = WorkerNode(client_id, heartbeat_liveness=HEARTBEAT_LIVENESS)
@@ -1132,7 +1352,25 @@ class MasterRunner(DistributedRunner):
                     self.server.send_to_client(Message("heartbeat", None, msg.node_id))
                 else:
                     logging.debug(f"Got heartbeat message from unknown worker {msg.node_id}")
+            case "relay_ready":
+                # the relay will announce the names of its combined stats entries again after (re)connecting
+                self.stats_report_codec.forget_worker(client_id)
+                self.send_message(
+                    "ack",
+                    client_id=client_id,
+                    data={
+                        "stats_delta": StatsReportCodec.version,
+                        "compact_format": {"version": COMPACT_FORMAT_VERSION, "compression": self.rpc_compression},
+                    },
+                )
+                logger.info(f"Relay {client_id} connected")
             case "stats":
+                if "stats_delta" in msg.data and self.stats_report_codec.has_unknown_entries(
+                    msg.node_id, msg.data["stats_delta"]
+                ):
+                    # the names of these entries were announced to a previous master, ask for them again
+                    logger.warning(f"Got stats for unknown entries from {msg.node_id}, asking it to reconnect")
+                    self.server.send_to_client(Message("reconnect", None, msg.node_id))
                 self.environment.events.worker_report.fire(client_id=msg.node_id, data=msg.data)
             case "spawning":
                 try:
@@ -1155,6 +1393,7 @@ class MasterRunner(DistributedRunner):
                         if not self._users_dispatcher.dispatch_in_progress and self.state == STATE_RUNNING:
                             # TODO: Test this situation
                             self.start(self.target_user_count, self.spawn_rate)
+                    self.relay_routes.pop(msg.node_id, None)
                     logger.info(
                         f"Worker {msg.node_id!r} (index {self.get_worker_index(msg.node_id)}) quit. {len(self.clients.ready)} workers ready."
                     )
@@ -1214,7 +1453,49 @@ class MasterRunner(DistributedRunner):
                 self.server.send_to_client(Message(msg_type, data, client.id))
 
 
-class WorkerRunner(DistributedRunner):
+class MasterClientRunner(DistributedRunner):
+    """
+    Base class for the runners that connect to a master (or a relay) and send their stats reports to it,
+    i.e. :class:`WorkerRunner` and :class:`RelayRunner`
+    """
+
+    client: rpc.Client
+    client_id: str
+    last_heartbeat_timestamp: float | None
+
+    def heartbeat_timeout_checker(self) -> NoReturn:
+        while True:
+            gevent.sleep(1)
+            if self.last_heartbeat_timestamp and self.last_heartbeat_timestamp < time.time() - MASTER_HEARTBEAT_TIMEOUT:
+                logger.error(f"Didn't get heartbeat from master in over {MASTER_HEARTBEAT_TIMEOUT}s")
+                self.quit()
+
+    def stats_reporter(self) -> NoReturn:
+        while True:
+            try:
+                self._send_stats()
+            except RPCError as e:
+                logger.error(f"Temporary connection lost to master server: {e}, will retry later.")
+            gevent.sleep(WORKER_REPORT_INTERVAL)
+
+    def send_message(self, msg_type: str, data: dict[str, Any] | None = None, client_id: str | None = None) -> None:
+        """
+        Sends a message to master node
+
+        :param msg_type: The type of the message to send
+        :param data: Optional data to send
+        :param client_id: (unused)
+        """
+        logger.debug(f"Sending {msg_type} message to master")
+        self.client.send(Message(msg_type, data, self.client_id))
+
+    def _send_stats(self) -> None:
+        data: dict[str, Any] = {}
+        self.environment.events.report_to_master.fire(client_id=self.client_id, data=data)
+        self.client.send(Message("stats", data, self.client_id))
+
+
+class WorkerRunner(MasterClientRunner):
     """
     Runner used to run distributed load tests across multiple processes and/or machines.
 
@@ -1226,11 +1507,14 @@ class WorkerRunner(DistributedRunner):
     # the worker index is set on ACK, if master provided it (masters <= 2.10.2 do not provide it)
     worker_index = -1
 
-    def __init__(self, environment: Environment, master_host: str, master_port: int) -> None:
+    def __init__(
+        self, environment: Environment, master_host: str, master_port: int, master_ipc_path: str | None = None
+    ) -> None:
         """
         :param environment: Environment instance
         :param master_host: Host/IP to use for connection to the master
         :param master_port: Port to use for connecting to the master
+        :param master_ipc_path: Optional ipc:// socket path to connect to the master on, instead of using tcp
         """
         super().__init__(environment)
         self.retry = 0
@@ -1241,22 +1525,28 @@ class WorkerRunner(DistributedRunner):
         self.client_id = socket.gethostname() + "_" + uuid4().hex
         self.master_host = master_host
         self.master_port = master_port
+        self.master_ipc_path = master_ipc_path
         self.web_base_path = environment.parsed_options.web_base_path if environment.parsed_options else ""
         self.logs: list[str] = []
         self.worker_cpu_warning_emitted = False
         self._users_dispatcher: UsersDispatcher | None = None
-        self.client = rpc.Client(master_host, master_port, self.client_id)
+        self.compact_format: dict[str, Any] | None = None
+        self.client = rpc.Client(master_host, master_port, self.client_id, ipc_path=master_ipc_path)
         self.greenlet.spawn(self.worker).link_exception(locust_exception_handler(self.environment))
         self.connect_to_master()
         self.greenlet.spawn(self.heartbeat).link_exception(locust_exception_handler(self.environment))
         self.greenlet.spawn(self.heartbeat_timeout_checker).link_exception(locust_exception_handler(self.environment))
         self.greenlet.spawn(self.stats_reporter).link_exception(locust_exception_handler(self.environment))
         self.greenlet.spawn(self.logs_reporter).link_exception(locust_exception_handler(self.environment))
+        self._start_hub_lag_monitor()
 
         # register listener that adds the current number of spawned users to the report that is sent to the master node
         def on_report_to_master(client_id: str, data: dict[str, Any]):
             data["user_classes_count"] = self.user_classes_count
             data["user_count"] = self.user_count
+            if self.environment.arrival_rate_scheduler is not None:
+                data["dropped_iterations"] = self.dropped_iterations
+                data["late_iterations"] = self.late_iterations
 
         self.environment.events.report_to_master.add_listener(on_report_to_master)
 
@@ -1338,18 +1628,18 @@ class WorkerRunner(DistributedRunner):
                 self.reset_connection()
             gevent.sleep(HEARTBEAT_INTERVAL)
 
-    def heartbeat_timeout_checker(self) -> NoReturn:
-        while True:
-            gevent.sleep(1)
-            if self.last_heartbeat_timestamp and self.last_heartbeat_timestamp < time.time() - MASTER_HEARTBEAT_TIMEOUT:
-                logger.error(f"Didn't get heartbeat from master in over {MASTER_HEARTBEAT_TIMEOUT}s")
-                self.quit()
+    def _configure_message_format(self, compact_format: dict[str, Any] | None) -> None:
+        self.compact_format = compact_format
+        _configure_message_format(self.client, compact_format)
 
     def reset_connection(self) -> None:
         logger.info("Reset connection to master")
         try:
             self.client.close()
-            self.client = rpc.Client(self.master_host, self.master_port, self.client_id)
+            self.client = rpc.Client(self.master_host, self.master_port, self.client_id, ipc_path=self.master_ipc_path)
+            self._configure_message_format(self.compact_format)
+            # the master may have been restarted, so announce the names of our stats entries again
+            self.stats_report_codec.reset_announced_names()
         except RPCError as e:
             logger.error(f"Temporary failure when resetting connection: {e}, will retry later.")
 
@@ -1369,6 +1659,11 @@ class WorkerRunner(DistributedRunner):
                 # backward-compatible support of masters that do not send a worker index
                 if msg.data is not None and "index" in msg.data:
                     self.worker_index = msg.data["index"]
+                # only send delta encoded stats reports to masters that support them
+                self.stats_report_codec.delta_enabled = (
+                    msg.data is not None and msg.data.get("stats_delta") == StatsReportCodec.version
+                )
+                self._configure_message_format(msg.data.get("compact_format") if msg.data is not None else None)
                 self.connection_event.set()
             case "spawn":
                 self.client.send(Message("spawning", None, self.client_id))
@@ -1394,6 +1689,18 @@ class WorkerRunner(DistributedRunner):
                     or k in ["expect_workers", "tags", "exclude_tags"]
                 }
                 vars(self.environment.parsed_options).update(custom_args_from_master)
+                if job["parsed_options"].get("correct_coordinated_omission"):
+                    self.environment.correct_coordinated_omission = True
+                if job["parsed_options"].get("timer_wheel") and self.environment.timer_wheel is None:
+                    self.environment.timer_wheel = TimerWheel()
+                if job["parsed_options"].get("event_listener_timing"):
+                    self.environment.events.enable_listener_timing()
+                if job["parsed_options"].get("max_request_names") is not None:
+                    self.stats.max_request_names = job["parsed_options"]["max_request_names"]
+                if job["parsed_options"].get("batch_request_events"):
+                    self.batch_request_events()
+                if job["parsed_options"].get("no_hub_lag_monitor"):
+                    self.disable_hub_lag_monitor()
 
                 if self.worker_state != STATE_RUNNING and self.worker_state != STATE_SPAWNING:
                     self.stats.clear_all()
@@ -1403,6 +1710,10 @@ class WorkerRunner(DistributedRunner):
                     self.environment._filter_tasks_by_tags()
                     self.environment.events.test_start.fire(environment=self.environment)
 
+                if "arrival_rate" in job:
+                    self.set_arrival_rate(job["arrival_rate"])
+                self._start_arrival_rate_scheduler()
+
                 self.worker_state = STATE_SPAWNING
 
                 if self.spawning_greenlet:
@@ -1418,6 +1729,7 @@ class WorkerRunner(DistributedRunner):
                 # random delays inherent to distributed systems.
                 additional_wait = int(os.getenv("LOCUST_WORKER_ADDITIONAL_WAIT_BEFORE_READY_AFTER_STOP", 0))
                 gevent.sleep(self.environment.stop_timeout + additional_wait)
+                self.stats_report_codec.reset_announced_names()
                 self.client.send(Message("client_ready", __version__, self.client_id))
                 self.worker_state = STATE_INIT
             case "quit":
@@ -1435,6 +1747,8 @@ class WorkerRunner(DistributedRunner):
                 )
             case "update_user_class":
                 self.environment.update_user_class(msg.data)
+            case "arrival_rate":
+                self.set_arrival_rate(msg.data["rate"])
             case "spawning_complete":
                 # master says we have finished spawning (happens only once during a normal rampup)
                 self.environment.events.spawning_complete.fire(user_count=msg.data["user_count"])
@@ -1448,14 +1762,6 @@ class WorkerRunner(DistributedRunner):
             case _:
                 logger.warning(f"Unknown message type received: {msg.type}")
 
-    def stats_reporter(self) -> NoReturn:
-        while True:
-            try:
-                self._send_stats()
-            except RPCError as e:
-                logger.error(f"Temporary connection lost to master server: {e}, will retry later.")
-            gevent.sleep(WORKER_REPORT_INTERVAL)
-
     def logs_reporter(self) -> None:
         if WORKER_LOG_REPORT_INTERVAL < 0:
             return
@@ -1475,27 +1781,12 @@ class WorkerRunner(DistributedRunner):
             self.logs = current_logs
             gevent.sleep(WORKER_LOG_REPORT_INTERVAL)
 
-    def send_message(self, msg_type: str, data: dict[str, Any] | None = None, client_id: str | None = None) -> None:
-        """
-        Sends a message to master node
-
-        :param msg_type: The type of the message to send
-        :param data: Optional data to send
-        :param client_id: (unused)
-        """
-        logger.debug(f"Sending {msg_type} message to master")
-        self.client.send(Message(msg_type, data, self.client_id))
-
-    def _send_stats(self) -> None:
-        data: dict[str, Any] = {}
-        self.environment.events.report_to_master.fire(client_id=self.client_id, data=data)
-        self.client.send(Message("stats", data, self.client_id))
-
     def _send_logs(self, current_logs) -> None:
         self.send_message("logs", {"worker_id": self.client_id, "logs": current_logs})
 
     def connect_to_master(self):
         self.retry += 1
+        self.stats_report_codec.reset_announced_names()
         self.client.send(Message("client_ready", __version__, self.client_id))
         try:
             success = self.connection_event.wait(timeout=CONNECT_TIMEOUT)
@@ -1517,6 +1808,242 @@ class WorkerRunner(DistributedRunner):
         self.connected = True
 
 
+class RelayRunner(MasterClientRunner):
+    """
+    Runner used to scale distributed load tests out to a very large number of workers.
+
+    A RelayRunner sits between a :class:`MasterRunner` and a group of :class:`WorkerRunners <WorkerRunner>`,
+    which connect to the relay exactly like they would connect to a master. The relay merges the stats
+    reports of its workers and sends a single combined report to the master every WORKER_REPORT_INTERVAL.
+    All other messages (spawn, stop, heartbeats etc) are passed through, in both directions, so the master
+    still knows about and dispatches users to each individual worker.
+
+    The RelayRunner doesn't run any users itself.
+    """
+
+    def __init__(
+        self, environment: Environment, master_host: str, master_port: int, relay_bind_host: str, relay_bind_port: int
+    ) -> None:
+        """
+        :param environment: Environment instance
+        :param master_host: Host/IP to use for connection to the master
+        :param master_port: Port to use for connecting to the master
+        :param relay_bind_host: Host/interface to use for incoming worker connections
+        :param relay_bind_port: Port to use for incoming worker connections
+        """
+        super().__init__(environment)
+        self.client_id = socket.gethostname() + "_relay_" + uuid4().hex
+        self.master_host = master_host
+        self.master_port = master_port
+        self.relay_bind_host = relay_bind_host
+        self.relay_bind_port = relay_bind_port
+        self.last_heartbeat_timestamp: float | None = None
+        # connected workers (including those behind downstream relays) => the users they have reported
+        self.workers: dict[str, dict[str, int]] = {}
+        # workers that the master has told to quit
+        self.quitting_workers: set[str] = set()
+        # workers that use an arrival rate => their number of dropped and late iterations
+        self.relayed_iterations: dict[str, tuple[int, int]] = {}
+        # workers => their hub lag since the last report to the master
+        self.relayed_hub_lag: dict[str, ResponseTimeHistogram] = {}
+        try:
+            self.server = rpc.Server(
+                relay_bind_host,
+                relay_bind_port,
+                decode_in_thread=bool(getattr(environment.parsed_options, "rpc_decode_thread", False)),
+            )
+        except RPCError as e:
+            logger.error(f"The Locust relay failed to listen on port {relay_bind_port}: {e.args[0]}")
+            sys.exit(1)
+        self.client = rpc.Client(master_host, master_port, self.client_id)
+        self.register_with_master()
+        self.greenlet.spawn(self.worker_listener).link_exception(locust_exception_handler(self.environment))
+        self.greenlet.spawn(self.master_listener).link_exception(locust_exception_handler(self.environment))
+        self.greenlet.spawn(self.heartbeat_timeout_checker).link_exception(locust_exception_handler(self.environment))
+        self.greenlet.spawn(self.stats_reporter).link_exception(locust_exception_handler(self.environment))
+
+        # register listener that adds the users of each worker to the combined report sent to the master
+        def on_report_to_master(client_id: str, data: dict[str, Any]) -> None:
+            data["user_classes_count"] = self.user_classes_count
+            data["user_count"] = self.user_count
+            data["relayed_user_classes_count"] = dict(self.workers)
+            if self.relayed_iterations:
+                data["relayed_iterations"] = dict(self.relayed_iterations)
+            if self.relayed_hub_lag:
+                data["relayed_hub_lag"] = {
+                    worker_id: hub_lag.to_dict() for worker_id, hub_lag in self.relayed_hub_lag.items()
+                }
+                self.relayed_hub_lag = {}
+
+        self.environment.events.report_to_master.add_listener(on_report_to_master)
+
+        # listener that gathers info on how many users each worker has spawned
+        def on_worker_report(client_id: str, data: dict[str, Any]) -> None:
+            if "relayed_user_classes_count" in data:
+                # combined report from a downstream relay
+                self.workers.update(data["relayed_user_classes_count"])
+                self.relayed_iterations.update(data.get("relayed_iterations", {}))
+                for worker_id, hub_lag in data.get("relayed_hub_lag", {}).items():
+                    self.relayed_hub_lag.setdefault(worker_id, ResponseTimeHistogram()).extend(hub_lag)
+            elif client_id in self.workers:
+                self.workers[client_id] = data["user_classes_count"]
+                if "dropped_iterations" in data:
+                    self.relayed_iterations[client_id] = (data["dropped_iterations"], data["late_iterations"])
+                if "hub_lag" in data:
+                    self.relayed_hub_lag.setdefault(client_id, ResponseTimeHistogram()).extend(data["hub_lag"])
+
+        self.environment.events.worker_report.add_listener(on_worker_report)
+
+        # register listener that tells the master that our workers are gone
+        def on_quitting(environment: Environment, **kw) -> None:
+            self.quit()
+
+        self.environment.events.quitting.add_listener(on_quitting)
+
+    @property
+    def user_count(self) -> int:
+        return sum(sum(user_classes_count.values()) for user_classes_count in self.workers.values())
+
+    @property
+    def user_classes_count(self) -> dict[str, int]:
+        user_classes_count: dict[str, int] = defaultdict(int)
+        for worker_user_classes_count in self.workers.values():
+            for name, count in worker_user_classes_count.items():
+                user_classes_count[name] += count
+        return dict(user_classes_count)
+
+    def start(
+        self, user_count: int, spawn_rate: float, wait: bool = False, user_classes: list[type[User]] | None = None
+    ) -> None:
+        raise NotImplementedError("a relay can't start a test, its workers are controlled by the master")
+
+    def quit(self) -> None:
+        """
+        Send a final stats report and shut down the relay. Workers that are still connected are told to quit.
+        """
+        for worker_id in list(self.workers):
+            self.server.send_to_client(Message("quit", None, worker_id))
+            self.client.send(Message("quit", None, worker_id))
+        self.workers = {}
+        try:
+            self._send_stats()
+        except RPCError as e:
+            logger.error(f"Failed to send final stats report to master: {e}")
+        self.greenlet.kill(block=True)
+
+    def worker_listener(self) -> NoReturn:
+        while True:
+            try:
+                client_id, msg = self.server.recv_from_client()
+            except RPCReceiveError as e:
+                logger.error(f"Unrecognized message detected: {e}")
+                continue
+            except RPCError as e:
+                logger.error(f"RPCError when receiving from worker: {e}")
+                gevent.sleep(FALLBACK_INTERVAL)
+                continue
+            if msg.node_id != client_id:
+                # message from a worker behind a downstream relay
+                self.server.routes[msg.node_id] = client_id
+            self.handle_worker_message(msg)
+
+    def handle_worker_message(self, msg: Message) -> None:
+        quit_requested = False
+        match msg.type:
+            case "stats":
+                self.environment.events.worker_report.fire(client_id=msg.node_id, data=msg.data)
+                return
+            case "client_ready":
+                # the worker will announce the names of its stats entries again after (re)connecting
+                self.stats_report_codec.forget_worker(msg.node_id)
+                self.workers[msg.node_id] = {}
+                logger.info(f"{msg.node_id} connected to relay. {len(self.workers)} workers connected.")
+            case "spawning_complete":
+                self.workers[msg.node_id] = msg.data["user_classes_count"]
+            case "client_stopped":
+                self.workers[msg.node_id] = {}
+            case "quit":
+                self.workers.pop(msg.node_id, None)
+                self.relayed_iterations.pop(msg.node_id, None)
+                self.relayed_hub_lag.pop(msg.node_id, None)
+                self.server.routes.pop(msg.node_id, None)
+                quit_requested = msg.node_id in self.quitting_workers
+                self.quitting_workers.discard(msg.node_id)
+        try:
+            self.client.send(msg)
+        except RPCError as e:
+            logger.error(f"Failed to pass {msg.type} message from worker {msg.node_id} on to master: {e}")
+        if msg.type == "quit" and not self.workers:
+            if quit_requested:
+                logger.info("All workers have quit, shutting down relay")
+                self.quit()
+            else:
+                # the master may have gone away, wait for new workers instead of timing out
+                self.last_heartbeat_timestamp = None
+
+    def register_with_master(self) -> None:
+        """
+        Tell the master about the relay itself, so that it'll accept its combined stats reports. Until the master
+        has acknowledged this, full (not delta encoded) reports are sent.
+        """
+        self.stats_report_codec.delta_enabled = False
+        self.stats_report_codec.reset_announced_names()
+        self.client.send(Message("relay_ready", __version__, self.client_id))
+
+    def reset_connection(self) -> None:
+        logger.info("Reset connection to master")
+        try:
+            self.client.close()
+            self.client = rpc.Client(self.master_host, self.master_port, self.client_id)
+            self.register_with_master()
+        except RPCError as e:
+            logger.error(f"Temporary failure when resetting connection: {e}, will retry later.")
+
+    def master_listener(self) -> NoReturn:
+        while True:
+            try:
+                msg = self.client.recv()
+            except RPCError as e:
+                logger.error(f"RPCError found when receiving from master: {e}")
+            else:
+                self.handle_master_message(msg)
+
+    def handle_master_message(self, msg: Message) -> None:
+        match msg.type:
+            case "ack" if msg.node_id == self.client_id:
+                # the master has acknowledged the relay itself, use the report and message formats it supports
+                self.stats_report_codec.delta_enabled = msg.data.get("stats_delta") == StatsReportCodec.version
+                _configure_message_format(self.client, msg.data.get("compact_format"))
+                return
+            case "reconnect" if msg.node_id == self.client_id:
+                logger.warning("Received reconnect message from master. Resetting RPC connection.")
+                self.reset_connection()
+                return
+            case "heartbeat":
+                self.last_heartbeat_timestamp = time.time()
+            case "quit":
+                self.quitting_workers.add(msg.node_id)
+        try:
+            self.server.send_to_client(msg)
+        except RPCError as e:
+            logger.error(f"Failed to pass {msg.type} message on to worker {msg.node_id}: {e}")
+        if msg.type == "quit" and self.quitting_workers >= self.workers.keys():
+            # all workers have been told to quit. Normally we shut down when the last one has sent its
+            # final report, but don't wait forever for workers that have died
+            self.greenlet.add(gevent.spawn_later(CONNECT_TIMEOUT, self.quit))
+
+
+def _configure_message_format(client: rpc.Client, compact_format: dict[str, Any] | None) -> None:
+    """Use the compact message format (and compression) that the master announced in its ack message"""
+    compact = compact_format is not None and compact_format.get("version") == COMPACT_FORMAT_VERSION
+    compression = compact_format.get("compression") if compact and compact_format else None
+    if compression and compression not in COMPRESSORS:
+        logger.warning(f"Master asked for {compression} compression of messages, but it is not available on this node")
+        compression = None
+    client.compact = compact
+    client.compression = compression
+
+
 def _format_user_classes_count_for_log(user_classes_count: dict[str, int]) -> str:
     return "{} ({} total users)".format(  # noqa: UP032
         json.dumps(dict(sorted(user_classes_count.items(), key=itemgetter(0)))),
@@ -2,26 +2,36 @@ from __future__ import annotations
 
 import csv
 import hashlib
+import io
 import json
 import logging
+import operator
 import os
 import signal
 import sys
 import time
+import warnings
 from abc import abstractmethod
-from collections import OrderedDict, defaultdict, namedtuple
+from array import array
+from bisect import insort
+from collections.abc import Mapping, Sequence
+from contextvars import ContextVar
 from copy import copy
-from itertools import chain
-from typing import TYPE_CHECKING, Protocol, TypedDict, TypeVar, cast
+from datetime import datetime, timezone
+from functools import wraps
+from itertools import chain, islice
+from typing import TYPE_CHECKING, Generic, NamedTuple, Protocol, TextIO, TypedDict, TypeVar, cast
 
 import gevent
+from gevent.threadpool import ThreadPool
 
 from .exception import CatchResponseError
 from .util.date import format_utc_timestamp
 from .util.rounding import proper_round
+from .util.url import template_path
 
 if TYPE_CHECKING:
-    from collections.abc import Callable, Iterable
+    from collections.abc import Callable, Iterable, Iterator
     from types import FrameType
     from typing import Any
 
@@ -43,7 +53,7 @@ STATS_AUTORESIZE = True  # overwrite this if you dont want auto resize while run
 
 class CSVWriter(Protocol):
     @abstractmethod
-    def writerow(self, columns: Iterable[str | int | float]) -> None: ...
+    def writerow(self, columns: Iterable[str | int | float]) -> Any: ...
 
 
 class StatsBaseDict(TypedDict):
@@ -64,6 +74,16 @@ class StatsEntryDict(StatsBaseDict):
     response_times: dict[int, int]
     num_reqs_per_sec: dict[int, int]
     num_fail_per_sec: dict[int, int]
+    corrected_response_times: dict[int, int]
+    num_lagged_requests: int
+    # the requests and failures per second from before the last PER_SECOND_WINDOW seconds, downsampled into
+    # {start of bucket => count} for buckets of long_term_resolution seconds
+    num_reqs_per_sec_long_term: dict[int, int]
+    num_fail_per_sec_long_term: dict[int, int]
+    long_term_resolution: int
+
+
+_LONG_TERM_KEYS = ("num_reqs_per_sec_long_term", "num_fail_per_sec_long_term", "long_term_resolution")
 
 
 class StatsErrorDict(StatsBaseDict):
@@ -79,6 +99,9 @@ class StatsHolder(Protocol):
 
 
 S = TypeVar("S", bound=StatsHolder)
+K = TypeVar("K")
+F = TypeVar("F", bound="Callable[..., Any]")
+V = TypeVar("V")
 
 
 def resize_handler(signum: int, frame: FrameType | None):
@@ -113,13 +136,51 @@ response time percentile
 """
 CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW = 10
 
-CachedResponseTimes = namedtuple("CachedResponseTimes", ["response_times", "num_requests", "num_none_requests"])
+"""
+Number of seconds that the requests and failures per second of each stats entry are kept for, see PerSecondCounter.
+Must be more than the 12 seconds that StatsEntry.current_rps looks back
+"""
+PER_SECOND_WINDOW = 20
+"""Initial length (in seconds) of the buckets of the downsampled long-term requests and failures per second"""
+LONG_TERM_RESOLUTION = 10
+"""Maximum number of buckets of the long-term requests and failures per second of each stats entry"""
+LONG_TERM_BUCKETS = 360
+
+"""Number of points of the stats history (one every HISTORY_STATS_INTERVAL_SEC) that are kept at full resolution"""
+HISTORY_RECENT_POINTS = 720
+"""Initial number of history points that are rolled up into one once they are older than HISTORY_RECENT_POINTS"""
+HISTORY_ROLLUP_FACTOR = 12
+"""Maximum number of rolled up points of the stats history"""
+HISTORY_ROLLUP_POINTS = 720
+"""Default maximum number of history points sent to the charts of the web UI and the HTML report"""
+HISTORY_CHART_POINTS = 1000
 
 PERCENTILES_TO_REPORT = [0.50, 0.66, 0.75, 0.80, 0.90, 0.95, 0.98, 0.99, 0.999, 0.9999, 1.0]
 
 PERCENTILES_TO_STATISTICS = [0.95, 0.99]
 PERCENTILES_TO_CHART = [0.5, 0.95]
 
+"""Default maximum number of stats entries (see RequestStats.max_request_names)"""
+MAX_REQUEST_NAMES = 1000
+"""Maximum number of entries for URL templates that are created once RequestStats.max_request_names is reached"""
+MAX_TEMPLATE_ENTRIES = 100
+"""Name of the entry for requests that can't be grouped by URL template once RequestStats.max_request_names is reached"""
+OTHER_REQUEST_NAME = "Other (too many request names)"
+"""Maximum number of request names to remember the grouped entry of, instead of templating them again"""
+MAX_GROUPED_KEYS_CACHED = 10000
+"""Maximum number of sorted or filtered results of RequestStats.query_entries/query_errors to keep (for a second)"""
+MAX_QUERIES_CACHED = 100
+
+"""
+(schedule lag, expected interval) in seconds of the task iteration that the current user is running, used for
+coordinated omission correction. The schedule lag is how much later than intended the iteration started (when
+using an arrival rate), the expected interval is the time between iterations (when using a pacing wait_time).
+Set by TaskSet.wait, and read by the runner when a request is logged.
+"""
+current_iteration_schedule: ContextVar[tuple[float, float] | None] = ContextVar(
+    "current_iteration_schedule", default=None
+)
+
 
 def bucket_response_time(response_time: int | float) -> int:
     """Round response time to reduce unique histogram keys.
@@ -142,6 +203,620 @@ def bucket_response_time(response_time: int | float) -> int:
         return int(round(response_time, -3))
 
 
+_default_bucket_response_time = bucket_response_time
+
+"""
+The bucket values produced by the default bucket_response_time() for response times below 100 seconds:
+0, 1, ... 99, 100, 110, ... 990, 1000, 1100, ... 9900, 10_000, 11_000, ... 99_000
+"""
+HISTOGRAM_BUCKET_VALUES: tuple[int, ...] = (
+    tuple(range(0, 100))
+    + tuple(range(100, 1000, 10))
+    + tuple(range(1000, 10000, 100))
+    + tuple(range(10000, 100000, 1000))
+)
+_EMPTY_HISTOGRAM_COUNTS = array("q", bytes(8 * len(HISTOGRAM_BUCKET_VALUES)))
+
+
+def _histogram_index(value: int | float) -> int:
+    """
+    Return the position of a bucket value in HISTOGRAM_BUCKET_VALUES, or -1 if the
+    value isn't one of the preallocated buckets (and has to be stored in the overflow dict)
+    """
+    if not 0 <= value < 100000 or value != int(value):
+        return -1
+    value = int(value)
+    if value < 100:
+        return value
+    elif value < 1000:
+        return 90 + value // 10 if value % 10 == 0 else -1
+    elif value < 10000:
+        return 180 + value // 100 if value % 100 == 0 else -1
+    else:
+        return 270 + value // 1000 if value % 1000 == 0 else -1
+
+
+def _default_bucket_lower_bound(bucket: int) -> float:
+    """Return the smallest response time that the default bucket_response_time() rounds to the bucket"""
+    if bucket <= 100:
+        return bucket - 0.5
+    elif bucket <= 1000:
+        return bucket - 5
+    elif bucket <= 10000:
+        return bucket - 50
+    else:
+        return bucket - 500
+
+
+class ResponseTimeHistogram(Mapping):
+    """
+    A read only {response_time => count} mapping that holds the response time distribution
+    for a StatsEntry.
+
+    The counts for the default buckets (see bucket_response_time) are kept in a preallocated
+    array, so logging a response time is a direct index increment, merging two histograms is
+    a single pass over the arrays and percentiles are calculated without sorting any keys.
+    Response times of 100 seconds or more, as well as keys produced by a custom
+    bucket_response_time function, are stored in a (small) overflow dict.
+    """
+
+    __slots__ = ("_counts", "_overflow")
+
+    def __init__(self, counts: Mapping[int, int] | None = None) -> None:
+        self._counts = array("q", _EMPTY_HISTOGRAM_COUNTS)
+        self._overflow: dict[int, int] = {}
+        if counts:
+            for value, count in counts.items():
+                self.add(value, count)
+
+    def log(self, response_time: int | float) -> None:
+        """Increase the count of the bucket that the response time falls into"""
+        if bucket_response_time is _default_bucket_response_time and 0 <= response_time < 99500:
+            # inlined (and slightly faster) version of the default bucket_response_time() + _histogram_index()
+            if response_time < 100:
+                self._counts[round(response_time)] += 1
+            elif response_time < 1000:
+                self._counts[90 + round(response_time / 10)] += 1
+            elif response_time < 10000:
+                self._counts[180 + round(response_time / 100)] += 1
+            else:
+                self._counts[270 + round(response_time / 1000)] += 1
+        else:
+            self.add(bucket_response_time(response_time))
+
+    def log_series(self, first: int | float, step: float, count: int) -> None:
+        """
+        Log count response times that decrease by step, starting at first (e.g. those of the requests that should
+        have been sent while waiting for a slow response), by adding up the counts of each bucket instead of logging
+        them one by one. Assumes that bucket_response_time is monotonic.
+        """
+        logged = 0
+        while logged < count:
+            remaining = count - logged
+            value = first - logged * step
+            bucket = bucket_response_time(value)
+            # n is the number of response times in this bucket, i.e. the largest n for which the n:th one,
+            # value - (n - 1) * step, is still rounded to it
+            n = 1
+            if bucket_response_time is _default_bucket_response_time:
+                n = min(remaining, max(1, int((value - _default_bucket_lower_bound(bucket)) / step) + 1))
+                if n > 1 and bucket_response_time(first - (logged + n - 1) * step) != bucket:
+                    # the lower bound itself was rounded (half to even) to the bucket below
+                    n -= 1
+            if bucket_response_time(first - (logged + n - 1) * step) != bucket or (
+                n < remaining and bucket_response_time(first - (logged + n) * step) == bucket
+            ):
+                # custom bucketing (or a response time right on the boundary of a bucket)
+                low, high = 1, remaining
+                while low < high:
+                    mid = (low + high + 1) // 2
+                    if bucket_response_time(first - (logged + mid - 1) * step) == bucket:
+                        low = mid
+                    else:
+                        high = mid - 1
+                n = low
+            self.add(bucket, n)
+            logged += n
+
+    def add(self, value: int, count: int = 1) -> None:
+        """Increase the count of an (already bucketed) response time value"""
+        index = _histogram_index(value)
+        if index >= 0:
+            self._counts[index] += count
+        else:
+            new_count = self._overflow.get(value, 0) + count
+            if new_count:
+                self._overflow[value] = new_count
+            else:
+                del self._overflow[value]
+
+    def extend(self, other: Mapping[int, int]) -> None:
+        """Add the counts from another histogram (or {response_time => count} dict) to this one"""
+        self._merge(other, operator.add)
+
+    def subtract(self, other: Mapping[int, int]) -> None:
+        """Remove the counts of another histogram (or {response_time => count} dict) from this one"""
+        self._merge(other, operator.sub)
+
+    def _merge(self, other: Mapping[int, int], op: Callable[[int, int], int]) -> None:
+        overflow: Iterable[tuple[int, int]]
+        if isinstance(other, ResponseTimeHistogram):
+            self._counts = array("q", map(op, self._counts, other._counts))
+            overflow = other._overflow.items()
+        else:
+            overflow = other.items()
+        for value, count in overflow:
+            index = _histogram_index(value)
+            if index >= 0:
+                self._counts[index] = op(self._counts[index], count)
+            elif new_count := op(self._overflow.get(value, 0), count):
+                self._overflow[value] = new_count
+            else:
+                self._overflow.pop(value, None)
+
+    @property
+    def total(self) -> int:
+        """The sum of all counts"""
+        return sum(self._counts) + sum(self._overflow.values())
+
+    def percentile(self, num_requests: int, percent: float) -> int:
+        """See calculate_response_time_percentile()"""
+        num_of_request = int(num_requests * percent)
+        processed_count = 0
+        if self._overflow:
+            for value in sorted(self._overflow, reverse=True):
+                if value < 100000:
+                    break
+                processed_count += self._overflow[value]
+                if num_requests - processed_count <= num_of_request:
+                    return value
+            if any(value < 100000 for value in self._overflow):
+                # custom bucketing put keys among the preallocated buckets, fall back to sorting
+                return _calculate_response_time_percentile(dict(self.items()), num_requests, percent)
+        counts = self._counts
+        for index in range(len(counts) - 1, -1, -1):
+            count = counts[index]
+            if count:
+                processed_count += count
+                if num_requests - processed_count <= num_of_request:
+                    return HISTOGRAM_BUCKET_VALUES[index]
+        return 0
+
+    def _items(self) -> Iterator[tuple[int, int]]:
+        if self._overflow:
+            yield from sorted(
+                chain(
+                    ((HISTOGRAM_BUCKET_VALUES[i], c) for i, c in enumerate(self._counts) if c),
+                    self._overflow.items(),
+                )
+            )
+        else:
+            yield from ((HISTOGRAM_BUCKET_VALUES[i], c) for i, c in enumerate(self._counts) if c)
+
+    def __getitem__(self, value: int) -> int:
+        index = _histogram_index(value)
+        count = self._counts[index] if index >= 0 else self._overflow.get(value, 0)
+        if not count:
+            raise KeyError(value)
+        return count
+
+    def __contains__(self, value: object) -> bool:
+        try:
+            self[value]  # type: ignore[index]
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate over the response times that have a count, in ascending order"""
+        return (value for value, _ in self._items())
+
+    def __len__(self) -> int:
+        return len(self._counts) - self._counts.count(0) + len(self._overflow)
+
+    def __bool__(self) -> bool:
+        return bool(self._overflow) or any(self._counts)
+
+    def __copy__(self) -> ResponseTimeHistogram:
+        new = ResponseTimeHistogram.__new__(ResponseTimeHistogram)
+        new._counts = array("q", self._counts)
+        new._overflow = dict(self._overflow)
+        return new
+
+    copy = __copy__
+
+    def to_dict(self) -> dict[int, int]:
+        return dict(self._items())
+
+    def __repr__(self) -> str:
+        return f"ResponseTimeHistogram({self.to_dict()!r})"
+
+
+class ResponseTimesWindow:
+    """
+    Holds the response time distribution of (approximately) the last
+    CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW seconds, which is used to calculate the *current*
+    response time percentiles.
+
+    Response times are logged into a ring buffer with one delta histogram per second, and a running
+    sum of the completed seconds in the window is kept up to date as seconds expire, so a percentile
+    can be calculated straight from the window without diffing any snapshots.
+    """
+
+    def __init__(self, size: int | None = None) -> None:
+        self.size = size or CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW
+        self._slots: list[ResponseTimeHistogram | None] = [None] * self.size
+        self._completed = ResponseTimeHistogram()
+        """ The sum of the slots for the seconds in the window, except for the current second """
+        self._current_second: int | None = None
+
+    def _advance(self, t: int) -> None:
+        current = self._current_second
+        if current is None or t - current >= self.size:
+            if current is not None:
+                self._slots = [None] * self.size
+                self._completed = ResponseTimeHistogram()
+            self._current_second = t
+            return
+        if t <= current:
+            # clock went backwards (or data arrived late), keep it in the current second
+            return
+        if slot := self._slots[current % self.size]:
+            self._completed.extend(slot)
+        for second in range(current - self.size + 1, t - self.size + 1):
+            index = second % self.size
+            if slot := self._slots[index]:
+                self._completed.subtract(slot)
+            self._slots[index] = None
+        self._current_second = t
+
+    def _current_slot(self, t: int) -> ResponseTimeHistogram:
+        self._advance(t)
+        index = cast(int, self._current_second) % self.size
+        slot = self._slots[index]
+        if slot is None:
+            slot = self._slots[index] = ResponseTimeHistogram()
+        return slot
+
+    def log(self, t: int, response_time: int | float) -> None:
+        """Log a response time for the second t"""
+        self._current_slot(t).log(response_time)
+
+    def extend(self, t: int, response_times: Mapping[int, int]) -> None:
+        """Add a response time histogram (or {response_time => count} dict) for the second t"""
+        self._current_slot(t).extend(response_times)
+
+    def get_response_times(self, t: int) -> ResponseTimeHistogram:
+        """Return the response time distribution of the window that ends at the second t"""
+        self._advance(t)
+        response_times = copy(self._completed)
+        if slot := self._slots[cast(int, self._current_second) % self.size]:
+            response_times.extend(slot)
+        return response_times
+
+    def percentile(self, t: int, percent: float) -> int:
+        if self._current_second is None or t - self._current_second >= self.size:
+            # nothing has been logged in the window (which is common for entries that are no longer requested)
+            return 0
+        response_times = self.get_response_times(t)
+        return response_times.percentile(response_times.total, percent)
+
+
+class PerSecondCounter(Mapping[int, int]):
+    """
+    A {second => count} mapping of the counts of the last PER_SECOND_WINDOW seconds (which is what the *current*
+    request rates are calculated from), kept in a ring buffer.
+
+    The counts of older seconds are added to a downsampled series for the whole run instead, in buckets that
+    start out as LONG_TERM_RESOLUTION seconds and double in length whenever there are more than
+    LONG_TERM_BUCKETS of them, so that the memory used stays constant no matter how long the test runs.
+    to_dict() only has the seconds of the window, and long_term_buckets() the downsampled ones before it.
+    """
+
+    def __init__(
+        self,
+        counts: Mapping[int, int] | None = None,
+        long_term: Mapping[int, int] | None = None,
+        resolution: int = LONG_TERM_RESOLUTION,
+    ) -> None:
+        """
+        :param counts: {second => count}, e.g. from to_dict()
+        :param long_term: {start of bucket => count} for buckets of resolution seconds, e.g. from long_term_buckets()
+        """
+        self._seconds = [-1] * PER_SECOND_WINDOW
+        self._counts = [0] * PER_SECOND_WINDOW
+        self.resolution = LONG_TERM_RESOLUTION
+        """ Length (in seconds) of the buckets of the long-term series """
+        self._buckets: dict[int, int] = {}
+        if long_term:
+            self.add_long_term(long_term, resolution)
+        if counts:
+            for second, count in counts.items():
+                self.add(second, count)
+
+    def add(self, second: int, count: int = 1) -> None:
+        """Add to the count of a second"""
+        slot = second % PER_SECOND_WINDOW
+        stored = self._seconds[slot]
+        if stored == second:
+            self._counts[slot] += count
+        elif stored < second:
+            if stored >= 0:
+                self._add_to_buckets(stored, self._counts[slot])
+            self._seconds[slot] = second
+            self._counts[slot] = count
+        else:
+            # older than the window
+            self._add_to_buckets(second, count)
+
+    def add_long_term(self, buckets: Mapping[int, int], resolution: int) -> None:
+        """
+        Add the counts of seconds that are older than the window, as {start of bucket => count} for buckets of
+        resolution seconds (e.g. from the long_term_buckets() of another counter)
+        """
+        if resolution > self.resolution:
+            self._buckets = self._downsample(resolution)
+            self.resolution = resolution
+        for bucket, count in buckets.items():
+            self._add_to_buckets(bucket, count)
+
+    def _add_to_buckets(self, second: int, count: int) -> None:
+        bucket = second - second % self.resolution
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + count
+        if len(self._buckets) > LONG_TERM_BUCKETS:
+            self._buckets = self._downsample(self.resolution * 2)
+            self.resolution *= 2
+
+    def _downsample(self, resolution: int) -> dict[int, int]:
+        buckets: dict[int, int] = {}
+        for bucket, count in self._buckets.items():
+            bucket -= bucket % resolution
+            buckets[bucket] = buckets.get(bucket, 0) + count
+        return buckets
+
+    def __getitem__(self, second: int) -> int:
+        slot = second % PER_SECOND_WINDOW
+        if self._seconds[slot] == second:
+            return self._counts[slot]
+        raise KeyError(second)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(sorted(second for second in self._seconds if second >= 0))
+
+    def __len__(self) -> int:
+        return sum(1 for second in self._seconds if second >= 0)
+
+    def long_term(self) -> dict[int, int]:
+        """
+        The counts of the whole run, as {start of bucket => count}, where the buckets are resolution seconds long
+        """
+        buckets = dict(self._buckets)
+        for second, count in zip(self._seconds, self._counts):
+            if second >= 0:
+                bucket = second - second % self.resolution
+                buckets[bucket] = buckets.get(bucket, 0) + count
+        return dict(sorted(buckets.items()))
+
+    def long_term_buckets(self, resolution: int | None = None) -> dict[int, int]:
+        """
+        The counts of the seconds that are older than the window, as {start of bucket => count}, where the buckets
+        are resolution seconds long (which must be a multiple of the counter's own resolution, if it is given)
+        """
+        if resolution is None or resolution == self.resolution:
+            return dict(sorted(self._buckets.items()))
+        return dict(sorted(self._downsample(resolution).items()))
+
+    def to_dict(self) -> dict[int, int]:
+        """
+        The counts of the seconds in the window, as {second => count} (see long_term_buckets() for the older ones)
+        """
+        return {second: count for second, count in sorted(zip(self._seconds, self._counts)) if second >= 0}
+
+    def __repr__(self) -> str:
+        return f"PerSecondCounter({self.to_dict()!r})"
+
+
+class StatsHistory(Sequence[dict]):
+    """
+    The history of the total stats that is shown in the charts of the web UI and the HTML report, stored as a
+    preallocated array of numbers per series (e.g. current_rps or user_count).
+
+    The last HISTORY_RECENT_POINTS points are kept at full resolution, in a ring buffer. Older points are rolled
+    up into the min, average and max of HISTORY_ROLLUP_FACTOR points, and whenever there are more than
+    HISTORY_ROLLUP_POINTS rolled up points, pairs of them are merged, so the memory used stays constant no
+    matter how long the test runs.
+
+    Indexing and iterating gives the points in the format the charts use, with averages for the rolled up ones.
+    Use :meth:`points` to get them downsampled to fit a chart.
+    """
+
+    def __init__(self) -> None:
+        self.names: list[str] = []
+        """ Names of the series, taken from the first point that is appended """
+        self.points_per_rollup = HISTORY_ROLLUP_FACTOR
+        """ Number of points in each rolled up point (which doubles when pairs of them are merged) """
+        self._times = array("d", bytes(8 * HISTORY_RECENT_POINTS))
+        self._values: list[array[float]] = []
+        self._first = 0
+        self._length = 0
+        self._rollup_times = array("d", bytes(8 * HISTORY_ROLLUP_POINTS))
+        self._rollup_counts = array("l", bytes(array("l").itemsize * HISTORY_ROLLUP_POINTS))
+        self._rollup_min: list[array[float]] = []
+        self._rollup_sum: list[array[float]] = []
+        self._rollup_max: list[array[float]] = []
+        self._rollup_length = 0
+
+    def append(self, timestamp: float | Mapping, values: Mapping[str, float] | None = None) -> None:
+        """
+        Add a point. Values of series that aren't in the first point are ignored, and missing ones are 0.
+
+        A point in the format the charts use (which is what the history used to be a list of) is accepted too,
+        but that is deprecated.
+        """
+        if values is None:
+            warnings.warn(
+                "StatsHistory.append(point) is deprecated, use StatsHistory.append(timestamp, values) instead",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            point = cast(Mapping, timestamp)
+            timestamp = datetime.strptime(point["time"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+            values = {
+                name: value[1] if isinstance(value, (list, tuple)) else value
+                for name, value in point.items()
+                if name != "time"
+            }
+        timestamp = cast(float, timestamp)
+        if not self.names:
+            self.names = list(values)
+            self._values = [array("d", bytes(8 * HISTORY_RECENT_POINTS)) for _ in self.names]
+            self._rollup_min = [array("d", bytes(8 * HISTORY_ROLLUP_POINTS)) for _ in self.names]
+            self._rollup_sum = [array("d", bytes(8 * HISTORY_ROLLUP_POINTS)) for _ in self.names]
+            self._rollup_max = [array("d", bytes(8 * HISTORY_ROLLUP_POINTS)) for _ in self.names]
+        if self._length == HISTORY_RECENT_POINTS:
+            self._roll_up(self._first)
+            self._first = (self._first + 1) % HISTORY_RECENT_POINTS
+            self._length -= 1
+        slot = (self._first + self._length) % HISTORY_RECENT_POINTS
+        self._times[slot] = timestamp
+        for name, series in zip(self.names, self._values):
+            series[slot] = values.get(name, 0)
+        self._length += 1
+
+    def _roll_up(self, slot: int) -> None:
+        i = self._rollup_length - 1
+        if i < 0 or self._rollup_counts[i] >= self.points_per_rollup:
+            if self._rollup_length == HISTORY_ROLLUP_POINTS:
+                self._merge_rollups()
+            i = self._rollup_length
+            self._rollup_length += 1
+            self._rollup_times[i] = self._times[slot]
+            self._rollup_counts[i] = 0
+            for series, rollup_min, rollup_sum, rollup_max in self._columns():
+                rollup_min[i] = rollup_max[i] = series[slot]
+                rollup_sum[i] = 0.0
+        self._rollup_counts[i] += 1
+        for series, rollup_min, rollup_sum, rollup_max in self._columns():
+            value = series[slot]
+            rollup_min[i] = min(rollup_min[i], value)
+            rollup_sum[i] += value
+            rollup_max[i] = max(rollup_max[i], value)
+
+    def _merge_rollups(self) -> None:
+        """Merge pairs of rolled up points, to make room for more"""
+        self.points_per_rollup *= 2
+        for i in range(0, self._rollup_length, 2):
+            j = i // 2
+            last = min(i + 1, self._rollup_length - 1)
+            self._rollup_times[j] = self._rollup_times[i]
+            self._rollup_counts[j] = self._rollup_counts[i] + (self._rollup_counts[last] if last > i else 0)
+            for _, rollup_min, rollup_sum, rollup_max in self._columns():
+                rollup_min[j] = min(rollup_min[i], rollup_min[last])
+                rollup_sum[j] = rollup_sum[i] + (rollup_sum[last] if last > i else 0.0)
+                rollup_max[j] = max(rollup_max[i], rollup_max[last])
+        self._rollup_length = (self._rollup_length + 1) // 2
+
+    def _columns(self) -> Iterator[tuple[array[float], array[float], array[float], array[float]]]:
+        return zip(self._values, self._rollup_min, self._rollup_sum, self._rollup_max)
+
+    def _row(self, i: int) -> tuple[float, int, list[tuple[float, float, float]]]:
+        """The i:th point (0 <= i < len(self)), as (timestamp, number of points rolled up into it, [(min, sum, max)])"""
+        if i < self._rollup_length:
+            return (
+                self._rollup_times[i],
+                self._rollup_counts[i],
+                [
+                    (rollup_min[i], rollup_sum[i], rollup_max[i])
+                    for _, rollup_min, rollup_sum, rollup_max in self._columns()
+                ],
+            )
+        slot = (self._first + i - self._rollup_length) % HISTORY_RECENT_POINTS
+        return self._times[slot], 1, [(series[slot], series[slot], series[slot]) for series in self._values]
+
+    def _rows(self, max_points: int | None = None) -> list[tuple[float, int, list[tuple[float, float, float]]]]:
+        """
+        All points as (timestamp, number of points rolled up into it, [(min, sum, max) of each series]),
+        downsampled to at most max_points
+        """
+        rows = [self._row(i) for i in range(len(self))]
+        if max_points is None or len(rows) <= max_points:
+            return rows
+        group_size = -(-len(rows) // max_points)
+        downsampled = []
+        for start in range(0, len(rows), group_size):
+            group = rows[start : start + group_size]
+            downsampled.append(
+                (
+                    group[0][0],
+                    sum(row[1] for row in group),
+                    [
+                        (
+                            min(value[0] for value in values),
+                            sum(value[1] for value in values),
+                            max(value[2] for value in values),
+                        )
+                        for values in zip(*(row[2] for row in group))
+                    ],
+                )
+            )
+        return downsampled
+
+    @staticmethod
+    def _chart_point(row: tuple[float, int, list[tuple[float, float, float]]], names: list[str]) -> dict:
+        timestamp, count, values = row
+        formatted_timestamp = format_utc_timestamp(timestamp)
+        return {
+            **{name: [formatted_timestamp, value_sum / count] for name, (_, value_sum, _) in zip(names, values)},
+            "time": formatted_timestamp,
+        }
+
+    def points(self, max_points: int | None = None) -> list[dict]:
+        """
+        The points in the format the charts use ({"time": timestamp, series: [timestamp, value], ...}), where
+        the values of rolled up points are averages. If there are more than max_points points, consecutive ones
+        are merged to fit.
+        """
+        return [self._chart_point(row, self.names) for row in self._rows(max_points)]
+
+    def series(self, name: str, max_points: int | None = None) -> list[tuple[float, float, float, float]]:
+        """
+        The points of one series, as (timestamp, min, average, max). The three values are only different for
+        points that have been rolled up
+        """
+        index = self.names.index(name)
+        return [
+            (timestamp, values[index][0], values[index][1] / count, values[index][2])
+            for timestamp, count, values in self._rows(max_points)
+        ]
+
+    @property
+    def last_timestamp(self) -> float | None:
+        """Timestamp of the most recent point, or None if there are none"""
+        if self._length:
+            return self._times[(self._first + self._length - 1) % HISTORY_RECENT_POINTS]
+        return None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._chart_point(self._row(i), self.names) for i in range(*index.indices(len(self)))]
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("StatsHistory index out of range")
+        return self._chart_point(self._row(index), self.names)
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self._chart_point(self._row(i), self.names)
+
+    def __len__(self) -> int:
+        return self._rollup_length + self._length
+
+    def __repr__(self) -> str:
+        return f"StatsHistory({len(self)} points, {self.names!r})"
+
+
 class RequestStatsAdditionError(Exception):
     pass
 
@@ -158,16 +833,22 @@ def get_readable_percentiles(percentile_list: list[float]) -> list[str]:
     ]
 
 
-def calculate_response_time_percentile(response_times: dict[int, int], num_requests: int, percent: float) -> int:
+def calculate_response_time_percentile(response_times: Mapping[int, int], num_requests: int, percent: float) -> int:
     """
     Get the response time that a certain number of percent of the requests
     finished within. Arguments:
 
-    response_times: A StatsEntry.response_times dict
+    response_times: A StatsEntry.response_times histogram (or {response_time => count} dict)
     num_requests: Number of request made (could be derived from response_times,
                   but we save some CPU cycles by using the value which we already store)
     percent: The percentile we want to calculate. Specified in range: 0.0 - 1.0
     """
+    if isinstance(response_times, ResponseTimeHistogram):
+        return response_times.percentile(num_requests, percent)
+    return _calculate_response_time_percentile(response_times, num_requests, percent)
+
+
+def _calculate_response_time_percentile(response_times: Mapping[int, int], num_requests: int, percent: float) -> int:
     num_of_request = int(num_requests * percent)
 
     processed_count = 0
@@ -179,13 +860,9 @@ def calculate_response_time_percentile(response_times: dict[int, int], num_reque
     return 0
 
 
-def diff_response_time_dicts(latest: dict[int, int], old: dict[int, int]) -> dict[int, int]:
+def diff_response_time_dicts(latest: Mapping[int, int], old: Mapping[int, int]) -> dict[int, int]:
     """
-    Returns the delta between two {response_times:request_count} dicts.
-
-    Used together with the response_times cache to get the response times for the
-    last X seconds, which in turn is used to calculate the current response time
-    percentiles.
+    Returns the delta between two {response_times:request_count} dicts (or histograms).
     """
     new = {}
     for t in latest:
@@ -199,29 +876,78 @@ class EntriesDict(dict):
         self.request_stats = request_stats
 
     def __missing__(self, key):
+        max_request_names = self.request_stats.max_request_names
+        if max_request_names and len(self) >= max_request_names:
+            return self.request_stats._grouped_entry(*key)
         self[key] = StatsEntry(
             self.request_stats, key[0], key[1], use_response_times_cache=self.request_stats.use_response_times_cache
         )
         return self[key]
 
 
+class SortedIndex(Generic[K, V]):
+    """
+    The keys of a dict that is only ever added to (like RequestStats.entries and RequestStats.errors), sorted by
+    sort_key(value). Since dicts keep their insertion order, only the keys that were added since last time have to be
+    inserted when the index is used again. If the dict has been replaced (e.g. on reset) the index is rebuilt.
+    """
+
+    def __init__(self, sort_key: Callable[[V], Any]) -> None:
+        self._sort_key = sort_key
+        self._dict: dict[K, V] | None = None
+        self._keys: list[K] = []
+
+    def sorted_keys(self, d: dict[K, V]) -> list[K]:
+        if d is not self._dict or len(d) < len(self._keys):
+            self._dict = d
+            self._keys = sorted(d, key=lambda key: self._sort_key(d[key]))
+        elif len(d) > len(self._keys):
+            for key in list(islice(d, len(self._keys), None)):
+                insort(self._keys, key, key=lambda key: self._sort_key(d[key]))
+        return self._keys
+
+
 class RequestStats:
     """
     Class that holds the request statistics. Accessible in a User from self.environment.stats
     """
 
-    def __init__(self, use_response_times_cache=True) -> None:
+    def __init__(self, use_response_times_cache=True, max_request_names: int = MAX_REQUEST_NAMES) -> None:
         """
         :param use_response_times_cache: The value of use_response_times_cache will be set for each StatsEntry()
                                          when they are created. Settings it to False saves some memory and CPU
                                          cycles which we can do on Worker nodes where the response_times_cache
                                          is not needed.
+        :param max_request_names: See max_request_names
         """
         self.use_response_times_cache = use_response_times_cache
+        self.max_request_names = max_request_names
+        """
+        Maximum number of entries. Once it is reached, requests with new names are logged in an entry for their
+        URL template (see locust.util.url.template_path), or if that isn't possible in an "Other" entry, so that
+        a locustfile that forgets to group requests with dynamic URLs doesn't run out of memory. 0 means no limit.
+        """
+        self._grouped_keys: dict[tuple[str, str], tuple[str, str]] = {}
+        self._num_template_entries = 0
         self.entries: dict[tuple[str, str], StatsEntry] = EntriesDict(self)
         self.errors: dict[str, StatsError] = {}
         self.total = StatsEntry(self, "Aggregated", "", use_response_times_cache=self.use_response_times_cache)
-        self.history: list[dict] = []
+        self.history = StatsHistory()
+        self._entries_index: SortedIndex[tuple[str, str], StatsEntry] = SortedIndex(
+            lambda entry: (entry.name, entry.method)
+        )
+        self._errors_index: SortedIndex[str, StatsError] = SortedIndex(
+            lambda error: (error.name, error.method, StatsError.parse_error(error.error))
+        )
+        # {key => (num_requests, 95th percentile)}, for sorting by percentile without recalculating it for every entry
+        self._sort_percentiles: dict[tuple[str, str], tuple[int, int]] = {}
+        # {(dict id, sort, name_filter) => (dict, (second, number of entries/errors), result)}, see _query()
+        self._query_cache: dict[tuple, tuple[dict, tuple[int, int], list]] = {}
+        self.hub_lag = ResponseTimeHistogram()
+        """
+        A {lag => count} ResponseTimeHistogram of how late (in ms) the gevent hub woke up the hub lag monitor
+        (see locust.hub_lag.HubLagMonitor)
+        """
 
     @property
     def num_requests(self):
@@ -243,13 +969,39 @@ class RequestStats:
     def start_time(self):
         return self.total.start_time
 
-    def log_request(self, method: str, name: str, response_time: int, content_length: int) -> None:
-        self.total.log(response_time, content_length)
-        self.entries[(name, method)].log(response_time, content_length)
-
-    def log_error(self, method: str, name: str, error: Exception | str | None) -> None:
-        self.total.log_error(error)
-        self.entries[(name, method)].log_error(error)
+    def log_request(
+        self,
+        method: str,
+        name: str,
+        response_time: int,
+        content_length: int,
+        iteration_schedule: tuple[float, float] | None = None,
+        lagged: bool = False,
+        timestamp: float | None = None,
+    ) -> None:
+        """
+        :param iteration_schedule: If set, the response time is also logged corrected for coordinated omission,
+                                   (see current_iteration_schedule and StatsEntry.log_corrected_response_time)
+        :param lagged: If the gevent hub was lagging while the request was running, which means that the
+                       response time is probably inflated (see locust.hub_lag.HubLagMonitor)
+        :param timestamp: When the request was made, if it wasn't just now (e.g. when replaying a request log)
+        """
+        entry = self.entries[(name, method)]
+        self.total.log(response_time, content_length, timestamp)
+        entry.log(response_time, content_length, timestamp)
+        if lagged:
+            self.total.num_lagged_requests += 1
+            entry.num_lagged_requests += 1
+        if iteration_schedule is not None and response_time is not None:
+            self.total.log_corrected_response_time(response_time, *iteration_schedule)
+            entry.log_corrected_response_time(response_time, *iteration_schedule)
+
+    def log_error(self, method: str, name: str, error: Exception | str | None, timestamp: float | None = None) -> None:
+        self.total.log_error(error, timestamp)
+        stats_entry = self.entries[(name, method)]
+        stats_entry.log_error(error, timestamp)
+        # the request may have been counted in an entry with a different name (see max_request_names)
+        name = stats_entry.name
 
         # store error in errors dict
         key = StatsError.create_key(method, name, error)
@@ -257,7 +1009,21 @@ class RequestStats:
         if not entry:
             entry = StatsError(method, name, error)
             self.errors[key] = entry
-        entry.occurred()
+        entry.occurred(timestamp)
+
+    def log_hub_lag(self, lag: int | float) -> None:
+        """
+        Log a measurement (in ms) of how late the gevent hub woke up a sleeping greenlet
+        """
+        self.hub_lag.log(lag)
+
+    def get_hub_lag_percentile(self, percent: float) -> int:
+        """
+        Get the hub lag (in ms) that a certain number of percent of the measurements were within.
+
+        Percent specified in range: 0.0 - 1.0
+        """
+        return self.hub_lag.percentile(self.hub_lag.total, percent)
 
     def get(self, name: str, method: str) -> StatsEntry:
         """
@@ -265,6 +1031,123 @@ class RequestStats:
         """
         return self.entries[(name, method)]
 
+    def _grouped_entry(self, name: str, method: str) -> StatsEntry:
+        """
+        Get the entry for a new request name, when there are already max_request_names entries
+        """
+        key = self._grouped_keys.get((name, method))
+        if key is None:
+            template = template_path(name)
+            key = (template, method)
+            if key not in self.entries:
+                if template == name or self._num_template_entries >= MAX_TEMPLATE_ENTRIES:
+                    key = (OTHER_REQUEST_NAME, method)
+                else:
+                    self._num_template_entries += 1
+                if key not in self.entries:
+                    logger.warning(
+                        f"There are more than {self.max_request_names} distinct request names, so requests named "
+                        f"{name!r} (and other new names like it) are counted as {key[0]!r}. Use the name parameter "
+                        "to group requests to URLs with ids (or increase --max-request-names)."
+                    )
+                    self.entries[key] = StatsEntry(
+                        self, key[0], method, use_response_times_cache=self.use_response_times_cache
+                    )
+            if len(self._grouped_keys) >= MAX_GROUPED_KEYS_CACHED:
+                self._grouped_keys.clear()
+            self._grouped_keys[(name, method)] = key
+        return self.entries[key]
+
+    def query_entries(
+        self, offset: int = 0, limit: int | None = None, sort: str = "name", name_filter: str | None = None
+    ) -> tuple[int, list[StatsEntry]]:
+        """
+        Get a page of the entries, without having to go through all of them when sorting by name
+
+        Sorting by anything but the name, or filtering, has to go through all the entries, so the result of that is
+        cached and reused for other pages (and by other viewers) until the second is over, or an entry is added.
+
+        :param sort: "name" (ascending, then method), or "rps" (current), "p95" (response time) or "failures"
+                     (descending, then by name)
+        :param name_filter: Only include entries with names that contain this (case insensitive)
+        :return: The number of matching entries, and the page
+        """
+        sort_keys: dict[str, Callable[[StatsEntry], Any] | None] = {
+            "name": None,
+            "rps": lambda entry: entry.current_rps,
+            "p95": self._sort_percentile,
+            "failures": lambda entry: entry.num_failures,
+        }
+        if sort not in sort_keys:
+            raise ValueError(f"Can't sort entries by {sort!r} (use one of {', '.join(sort_keys)})")
+        return self._query(
+            self.entries,
+            self._entries_index.sorted_keys(self.entries),
+            offset,
+            limit,
+            sort,
+            sort_keys[sort],
+            name_filter,
+        )
+
+    def query_errors(
+        self, offset: int = 0, limit: int | None = None, sort: str = "name", name_filter: str | None = None
+    ) -> tuple[int, list[StatsError]]:
+        """
+        Get a page of the errors, like query_entries()
+
+        :param sort: "name" (ascending, then method and error), "failures" (number of occurrences, descending) or
+                     "insertion" (the order they first occurred in)
+        """
+        sort_keys: dict[str, Callable[[StatsError], Any] | None] = {
+            "name": None,
+            "failures": lambda error: error.occurrences,
+            "insertion": None,
+        }
+        if sort not in sort_keys:
+            raise ValueError(f"Can't sort errors by {sort!r} (use one of {', '.join(sort_keys)})")
+        keys = self.errors if sort == "insertion" else self._errors_index.sorted_keys(self.errors)
+        return self._query(self.errors, keys, offset, limit, sort, sort_keys[sort], name_filter)
+
+    def _query(
+        self,
+        d: dict[Any, S],
+        keys: Iterable,
+        offset: int,
+        limit: int | None,
+        sort: str,
+        sort_key: Callable[[S], Any] | None,
+        name_filter: str | None,
+    ) -> tuple[int, list[S]]:
+        """Get a page of the values of the entries or errors dict, in the order of keys, see query_entries()"""
+        end = None if limit is None else offset + limit
+        if sort_key is None and not name_filter:
+            return len(d), [d[key] for key in islice(keys, offset, end)]
+        cache_key = (id(d), sort, name_filter)
+        version = (int(time.time()), len(d))
+        cached = self._query_cache.get(cache_key)
+        if cached is None or cached[0] is not d or cached[1] != version:
+            values: Iterable[S] = (d[key] for key in keys)
+            if name_filter:
+                lowered_filter = name_filter.lower()
+                values = [value for value in values if lowered_filter in value.name.lower()]
+            # sorted() keeps the original (name) order for equal values, even when reversed
+            matching = sorted(values, key=sort_key, reverse=True) if sort_key is not None else list(values)
+            if len(self._query_cache) >= MAX_QUERIES_CACHED:
+                self._query_cache.clear()
+            # (the dict is kept, so that its id isn't reused while the result is cached)
+            cached = self._query_cache[cache_key] = (d, version, matching)
+        matching = cached[2]
+        return len(matching), matching[offset:end]
+
+    def _sort_percentile(self, entry: StatsEntry) -> int:
+        key = (entry.name, entry.method)
+        cached = self._sort_percentiles.get(key)
+        if cached is None or cached[0] != entry.num_requests:
+            cached = (entry.num_requests, entry.get_response_time_percentile(0.95) or 0)
+            self._sort_percentiles[key] = cached
+        return cached[1]
+
     def reset_all(self) -> None:
         """
         Go through all stats entries and reset them to zero
@@ -273,7 +1156,10 @@ class RequestStats:
         self.errors = {}
         for r in self.entries.values():
             r.reset()
-        self.history = []
+        self._sort_percentiles = {}
+        self._query_cache = {}
+        self.history = StatsHistory()
+        self.hub_lag = ResponseTimeHistogram()
 
     def clear_all(self) -> None:
         """
@@ -281,8 +1167,13 @@ class RequestStats:
         """
         self.total = StatsEntry(self, "Aggregated", "", use_response_times_cache=self.use_response_times_cache)
         self.entries = EntriesDict(self)
+        self._grouped_keys = {}
+        self._num_template_entries = 0
         self.errors = {}
-        self.history = []
+        self._sort_percentiles = {}
+        self._query_cache = {}
+        self.history = StatsHistory()
+        self.hub_lag = ResponseTimeHistogram()
 
     def serialize_stats(self) -> list[StatsEntryDict]:
         return [
@@ -293,6 +1184,29 @@ class RequestStats:
         return {k: e.serialize() for k, e in self.errors.items()}
 
 
+def _memoized_per_tick(func: F) -> F:
+    """
+    Decorator for StatsEntry methods that derive a metric (e.g. a percentile) from the entry, which caches the result
+    until the entry changes or the second is over. The web UI, the CSV writer, the console output and the history
+    all ask for the same metrics, so this way each one is calculated at most once per second.
+    """
+
+    @wraps(func)
+    def wrapper(self: StatsEntry, *args):
+        version = self._snapshot_key()
+        if version != self._snapshot_version:
+            self._snapshot = {}
+            self._snapshot_version = version
+        key = (func.__name__, *args)
+        try:
+            return self._snapshot[key]
+        except KeyError:
+            value = self._snapshot[key] = func(self, *args)
+            return value
+
+    return cast(F, wrapper)
+
+
 class StatsEntry:
     """
     Represents a single stats entry (name and method)
@@ -306,10 +1220,9 @@ class StatsEntry:
         """ Method (GET, POST, PUT, etc.) """
         self.use_response_times_cache = use_response_times_cache
         """
-        If set to True, the copy of the response_time dict will be stored in response_times_cache
-        every second, and kept for 20 seconds (by default, will be CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW + 10).
-        We can use this dict to calculate the *current*  median response time, as well as other response
-        time percentiles.
+        If set to True, the response times of the last CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW seconds
+        will also be kept in response_times_cache. We can use this to calculate the *current* median
+        response time, as well as other response time percentiles.
         """
         self.num_requests: int = 0
         """ The number of requests made """
@@ -323,13 +1236,16 @@ class StatsEntry:
         """ Minimum response time """
         self.max_response_time: int = 0
         """ Maximum response time """
-        self.num_reqs_per_sec: dict[int, int] = defaultdict(int)
-        """ A {second => request_count} dict that holds the number of requests made per second """
-        self.num_fail_per_sec: dict[int, int] = defaultdict(int)
-        """ A (second => failure_count) dict that hold the number of failures per second """
-        self.response_times: dict[int, int] = defaultdict(int)
+        self.num_reqs_per_sec = PerSecondCounter()
+        """
+        A {second => request_count} PerSecondCounter that holds the number of requests made per second (for the
+        last PER_SECOND_WINDOW seconds, and downsampled for the rest of the run)
         """
-        A {response_time => count} dict that holds the response time distribution of all
+        self.num_fail_per_sec = PerSecondCounter()
+        """ A (second => failure_count) PerSecondCounter that holds the number of failures per second """
+        self.response_times: ResponseTimeHistogram = ResponseTimeHistogram()
+        """
+        A {response_time => count} ResponseTimeHistogram that holds the response time distribution of all
         the requests.
 
         The keys (the response time in ms) are rounded to store 1, 2, ... 98, 99, 100, 110, 120, ... 980, 990, 1000,
@@ -337,17 +1253,27 @@ class StatsEntry:
 
         This dict is used to calculate the median and percentile response times.
         """
-        self.response_times_cache: OrderedDict[int, CachedResponseTimes] | None = None
+        self.response_times_cache: ResponseTimesWindow | None = None
+        """
+        If use_response_times_cache is set to True, this will be a ResponseTimesWindow that holds
+        the response time distribution of the last CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW seconds.
+        """
+        self.corrected_response_times: ResponseTimeHistogram = ResponseTimeHistogram()
         """
-        If use_response_times_cache is set to True, this will be a {timestamp => CachedResponseTimes()}
-        OrderedDict that holds a copy of the response_times dict for each of the last 20 seconds.
+        Same as response_times, but corrected for coordinated omission (only logged when running with
+        --correct-coordinated-omission, see log_corrected_response_time)
         """
+        self.num_lagged_requests: int = 0
+        """ Number of requests that were running while the gevent hub was lagging (see locust.hub_lag) """
         self.total_content_length: int = 0
         """ The sum of the content length of all the responses for this entry """
         self.start_time: float = 0.0
         """ Time of the first request for this entry """
         self.last_request_timestamp: float | None = None
         """ Time of the last request for this entry """
+        # metrics derived from the entry, for the state given by _snapshot_key() (see _memoized_per_tick)
+        self._snapshot: dict[tuple, Any] = {}
+        self._snapshot_version: tuple | None = None
         self.reset()
 
     def reset(self):
@@ -356,36 +1282,51 @@ class StatsEntry:
         self.num_none_requests = 0
         self.num_failures = 0
         self.total_response_time = 0
-        self.response_times = defaultdict(int)
+        self.response_times = ResponseTimeHistogram()
+        self.corrected_response_times = ResponseTimeHistogram()
+        self.num_lagged_requests = 0
         self.min_response_time = None
         self.max_response_time = 0
         self.last_request_timestamp = None
-        self.num_reqs_per_sec = defaultdict(int)
-        self.num_fail_per_sec = defaultdict(int)
+        self.num_reqs_per_sec = PerSecondCounter()
+        self.num_fail_per_sec = PerSecondCounter()
         self.total_content_length = 0
         if self.use_response_times_cache:
-            self.response_times_cache = OrderedDict()
-            self._cache_response_times(int(time.time()))
+            self.response_times_cache = ResponseTimesWindow()
 
-    def log(self, response_time: int, content_length: int) -> None:
-        # get the time
-        current_time = time.time()
-        t = int(current_time)
+    def _snapshot_key(self) -> tuple:
+        """
+        Everything (cheap to check) that the derived metrics depend on, down to the second: what has been logged in
+        the entry, when it and the whole test were started, when the last request of the test was made, and now
+        """
+        total = self.stats.total
+        return (
+            self.num_requests,
+            self.num_failures,
+            self.corrected_response_times.total,
+            self.start_time,
+            total.start_time,
+            int(total.last_request_timestamp or 0),
+            int(time.time()),
+        )
 
-        if self.use_response_times_cache and self.last_request_timestamp and t > int(self.last_request_timestamp):
-            # see if we shall make a copy of the response_times dict and store in the cache
-            self._cache_response_times(t - 1)
+    def log(self, response_time: int, content_length: int, timestamp: float | None = None) -> None:
+        # get the time
+        current_time = time.time() if timestamp is None else timestamp
 
         self.num_requests += 1
         self._log_time_of_request(current_time)
         self._log_response_time(response_time)
 
+        if self.response_times_cache is not None and response_time is not None:
+            self.response_times_cache.log(int(current_time), response_time)
+
         # increase total content-length
         self.total_content_length += content_length
 
     def _log_time_of_request(self, current_time: float) -> None:
         t = int(current_time)
-        self.num_reqs_per_sec[t] += 1
+        self.num_reqs_per_sec.add(t)
         self.last_request_timestamp = current_time
 
     def _log_response_time(self, response_time: int) -> None:
@@ -402,17 +1343,40 @@ class StatsEntry:
         self.max_response_time = max(self.max_response_time, response_time)
 
         # to avoid to much data that has to be transferred to the master node when
-        # running in distributed mode, we save the response time rounded in a dict
+        # running in distributed mode, we save the response time rounded in a histogram
         # so that 147 becomes 150, 3432 becomes 3400 and 58760 becomes 59000
-        rounded_response_time = bucket_response_time(response_time)
+        self.response_times.log(response_time)
 
-        # increase request count for the rounded key in response time dict
-        self.response_times[rounded_response_time] += 1
+    def log_corrected_response_time(
+        self, response_time: int | float, schedule_lag: float = 0.0, expected_interval: float = 0.0
+    ) -> None:
+        """
+        Log a response time corrected for coordinated omission: a user that is waiting for a slow response
+        doesn't send the requests it was supposed to send in the meantime, so without correction those
+        requests' (long) response times are never recorded.
+
+        :param schedule_lag: How much later (in seconds) than intended the task iteration started, which is
+                             added to the response time
+        :param expected_interval: The time (in seconds) between task iterations. For each interval that the
+                                  request took, the response time of a request that should have been sent
+                                  in the meantime is logged as well (like HdrHistogram's recordValueWithExpectedInterval)
+        """
+        corrected_response_time = response_time + schedule_lag * 1000
+        self.corrected_response_times.log(corrected_response_time)
+        if expected_interval > 0:
+            expected_interval_ms = expected_interval * 1000
+            # the missed requests' response times are corrected_response_time - k * expected_interval_ms
+            # for every k >= 1 that leaves at least one interval
+            missed = int(corrected_response_time // expected_interval_ms) - 1
+            if missed > 0:
+                self.corrected_response_times.log_series(
+                    corrected_response_time - expected_interval_ms, expected_interval_ms, missed
+                )
 
-    def log_error(self, error: Exception | str | None) -> None:
+    def log_error(self, error: Exception | str | None, timestamp: float | None = None) -> None:
         self.num_failures += 1
-        t = int(time.time())
-        self.num_fail_per_sec[t] += 1
+        t = int(time.time() if timestamp is None else timestamp)
+        self.num_fail_per_sec.add(t)
 
     @property
     def fail_ratio(self) -> float:
@@ -432,6 +1396,7 @@ class StatsEntry:
             return 0.0
 
     @property
+    @_memoized_per_tick
     def median_response_time(self) -> int:
         if not self.response_times:
             return 0
@@ -449,6 +1414,7 @@ class StatsEntry:
         return median
 
     @property
+    @_memoized_per_tick
     def current_rps(self) -> float:
         if self.stats.last_request_timestamp is None:
             return 0
@@ -460,6 +1426,7 @@ class StatsEntry:
         return avg(reqs)
 
     @property
+    @_memoized_per_tick
     def current_fail_per_sec(self):
         if self.stats.last_request_timestamp is None:
             return 0
@@ -471,6 +1438,7 @@ class StatsEntry:
         return avg(reqs)
 
     @property
+    @_memoized_per_tick
     def total_rps(self):
         if not self.stats.last_request_timestamp or not self.stats.start_time:
             return 0.0
@@ -480,6 +1448,7 @@ class StatsEntry:
             return 0.0
 
     @property
+    @_memoized_per_tick
     def total_fail_per_sec(self):
         if not self.stats.last_request_timestamp or not self.stats.start_time:
             return 0.0
@@ -500,47 +1469,113 @@ class StatsEntry:
         Extend the data from the current StatsEntry with the stats from another
         StatsEntry instance.
         """
-        # save the old last_request_timestamp, to see if we should store a new copy
-        # of the response times in the response times cache
-        old_last_request_timestamp = self.last_request_timestamp
-
-        if self.last_request_timestamp is not None and other.last_request_timestamp is not None:
-            self.last_request_timestamp = max(self.last_request_timestamp, other.last_request_timestamp)
-        elif other.last_request_timestamp is not None:
-            self.last_request_timestamp = other.last_request_timestamp
-        self.start_time = min(self.start_time, other.start_time)
-        self.num_requests += other.num_requests
-        self.num_none_requests += other.num_none_requests
-        self.num_failures += other.num_failures
-        self.total_response_time += other.total_response_time
-        self.max_response_time = max(self.max_response_time, other.max_response_time)
-        if self.min_response_time is not None and other.min_response_time is not None:
-            self.min_response_time = min(self.min_response_time, other.min_response_time)
-        elif other.min_response_time is not None:
+        self._extend(
+            other.start_time,
+            other.last_request_timestamp,
+            other.num_requests,
+            other.num_none_requests,
+            other.num_failures,
+            other.total_response_time,
+            other.max_response_time,
+            other.min_response_time,
+            other.total_content_length,
+            other.response_times,
+            other.num_reqs_per_sec,
+            other.num_fail_per_sec,
+            other.corrected_response_times,
+            other.num_lagged_requests,
+        )
+
+    def _extend(
+        self,
+        start_time: float,
+        last_request_timestamp: float | None,
+        num_requests: int,
+        num_none_requests: int,
+        num_failures: int,
+        total_response_time: int,
+        max_response_time: int,
+        min_response_time: int | None,
+        total_content_length: int,
+        response_times: Mapping[int, int],
+        num_reqs_per_sec: Mapping[int, int],
+        num_fail_per_sec: Mapping[int, int],
+        corrected_response_times: Mapping[int, int] | None = None,
+        num_lagged_requests: int = 0,
+        num_reqs_per_sec_long_term: Mapping[int, int] | None = None,
+        num_fail_per_sec_long_term: Mapping[int, int] | None = None,
+        long_term_resolution: int = LONG_TERM_RESOLUTION,
+    ) -> None:
+        """
+        Add stats to this entry. The arguments are in the same order as the rows of a
+        delta encoded worker report (see StatsReportCodec), so they can be applied directly.
+        """
+        if self.last_request_timestamp is not None and last_request_timestamp is not None:
+            self.last_request_timestamp = max(self.last_request_timestamp, last_request_timestamp)
+        elif last_request_timestamp is not None:
+            self.last_request_timestamp = last_request_timestamp
+        self.start_time = min(self.start_time, start_time)
+        self.num_requests += num_requests
+        self.num_none_requests += num_none_requests
+        self.num_failures += num_failures
+        self.total_response_time += total_response_time
+        self.max_response_time = max(self.max_response_time, max_response_time)
+        if self.min_response_time is not None and min_response_time is not None:
+            self.min_response_time = min(self.min_response_time, min_response_time)
+        elif min_response_time is not None:
             # this means self.min_response_time is None, so we can safely replace it
-            self.min_response_time = other.min_response_time
-        self.total_content_length += other.total_content_length
+            self.min_response_time = min_response_time
+        self.total_content_length += total_content_length
 
-        for key in other.response_times:
-            self.response_times[key] = self.response_times.get(key, 0) + other.response_times[key]
-        for key in other.num_reqs_per_sec:
-            self.num_reqs_per_sec[key] = self.num_reqs_per_sec.get(key, 0) + other.num_reqs_per_sec[key]
-        for key in other.num_fail_per_sec:
-            self.num_fail_per_sec[key] = self.num_fail_per_sec.get(key, 0) + other.num_fail_per_sec[key]
+        if isinstance(self.response_times, ResponseTimeHistogram):
+            self.response_times.extend(response_times)
+        else:
+            for key in response_times:
+                self.response_times[key] = self.response_times.get(key, 0) + response_times[key]
+        for counter, counts, long_term in (
+            (self.num_reqs_per_sec, num_reqs_per_sec, num_reqs_per_sec_long_term),
+            (self.num_fail_per_sec, num_fail_per_sec, num_fail_per_sec_long_term),
+        ):
+            if isinstance(counts, PerSecondCounter):
+                counter.add_long_term(counts.long_term_buckets(), counts.resolution)
+                counts = counts.to_dict()
+            elif long_term:
+                counter.add_long_term(long_term, long_term_resolution)
+            for second, count in counts.items():
+                counter.add(second, count)
+        if corrected_response_times:
+            self.corrected_response_times.extend(corrected_response_times)
+        self.num_lagged_requests += num_lagged_requests
 
-        if self.use_response_times_cache:
-            # If we've entered a new second, we'll cache the response times. Note that there
-            # might still be reports from other worker nodes - that contains requests for the same
-            # time periods - that hasn't been received/accounted for yet. This will cause the cache to
-            # lag behind a second or two, but since StatsEntry.current_response_time_percentile()
-            # (which is what the response times cache is used for) uses an approximation of the
-            # last 10 seconds anyway, it should be fine to ignore this.
-            last_time = int(self.last_request_timestamp) if self.last_request_timestamp else None
-            if last_time and last_time > (old_last_request_timestamp and int(old_last_request_timestamp) or 0):
-                self._cache_response_times(last_time)
+        if self.response_times_cache is not None:
+            # The response times are accounted to the second in which we received them. Reports from
+            # other worker nodes might contain requests for the same time periods, but since
+            # StatsEntry.current_response_time_percentile() (which is what the response times cache is used for)
+            # uses an approximation of the last 10 seconds anyway, it should be fine to ignore this.
+            self.response_times_cache.extend(int(time.time()), response_times)
 
     def serialize(self) -> StatsEntryDict:
-        return cast(StatsEntryDict, {key: getattr(self, key, None) for key in StatsEntryDict.__annotations__.keys()})
+        data = cast(StatsEntryDict, {key: getattr(self, key, None) for key in StatsEntryDict.__annotations__.keys()})
+        if isinstance(self.response_times, ResponseTimeHistogram):
+            data["response_times"] = self.response_times.to_dict()
+        data["corrected_response_times"] = self.corrected_response_times.to_dict()
+        data["num_reqs_per_sec"] = self.num_reqs_per_sec.to_dict()
+        data["num_fail_per_sec"] = self.num_fail_per_sec.to_dict()
+        (
+            data["num_reqs_per_sec_long_term"],
+            data["num_fail_per_sec_long_term"],
+            data["long_term_resolution"],
+        ) = self._long_term_counts()
+        return data
+
+    def _long_term_counts(self) -> tuple[dict[int, int], dict[int, int], int]:
+        """The long-term requests and failures per second, in buckets of the same length"""
+        resolution = max(self.num_reqs_per_sec.resolution, self.num_fail_per_sec.resolution)
+        return (
+            self.num_reqs_per_sec.long_term_buckets(resolution),
+            self.num_fail_per_sec.long_term_buckets(resolution),
+            resolution,
+        )
 
     @classmethod
     def unserialize(cls, data: StatsEntryDict, stats: RequestStats) -> StatsEntry:
@@ -548,9 +1583,18 @@ class StatsEntry:
         obj = cls(stats, data["name"], data["method"])
         valid_keys = StatsEntryDict.__annotations__.keys()
 
+        long_term_resolution = data.get("long_term_resolution") or LONG_TERM_RESOLUTION
         for key, value in data.items():
-            if key in ["name", "method"] or key not in valid_keys:
+            if key in ["name", "method", *_LONG_TERM_KEYS] or key not in valid_keys:
                 continue
+            if key in ("response_times", "corrected_response_times"):
+                value = ResponseTimeHistogram(cast(dict[int, int], value))
+            elif key in ("num_reqs_per_sec", "num_fail_per_sec"):
+                value = PerSecondCounter(
+                    cast(dict[int, int], value),
+                    cast(dict, data).get(f"{key}_long_term"),
+                    long_term_resolution,
+                )
 
             setattr(obj, key, value)
         return obj
@@ -563,6 +1607,39 @@ class StatsEntry:
         self.reset()
         return report
 
+    def get_stripped_delta_row(self) -> list:
+        """
+        Return the stats of this StatsEntry as a row for a delta encoded worker report
+        (in the same order as the arguments of _extend), and then clear the current stats.
+        """
+        row = [
+            self.start_time,
+            self.last_request_timestamp,
+            self.num_requests,
+            self.num_none_requests,
+            self.num_failures,
+            self.total_response_time,
+            self.max_response_time,
+            self.min_response_time,
+            self.total_content_length,
+            self.response_times.to_dict()
+            if isinstance(self.response_times, ResponseTimeHistogram)
+            else dict(self.response_times),
+            self.num_reqs_per_sec.to_dict(),
+            self.num_fail_per_sec.to_dict(),
+        ]
+        # the optional trailing columns are only sent when they're needed
+        long_term = self._long_term_counts()
+        has_long_term = bool(long_term[0] or long_term[1])
+        if self.corrected_response_times or self.num_lagged_requests or has_long_term:
+            row.append(self.corrected_response_times.to_dict())
+        if self.num_lagged_requests or has_long_term:
+            row.append(self.num_lagged_requests)
+        if has_long_term:
+            row.extend(long_term)
+        self.reset()
+        return row
+
     def to_string(self, current=True) -> str:
         """
         Return the stats as a string suitable for console output. If current is True, it'll show
@@ -597,6 +1674,7 @@ class StatsEntry:
     def __str__(self) -> str:
         return self.to_string(current=True)
 
+    @_memoized_per_tick
     def get_response_time_percentile(self, percent: float) -> int:
         """
         Get the response time that a certain number of percent of the requests
@@ -610,88 +1688,74 @@ class StatsEntry:
             self.response_times, self.num_requests - self.num_none_requests, percent
         )
 
-    def get_current_response_time_percentile(self, percent: float) -> int | None:
+    @_memoized_per_tick
+    def get_corrected_response_time_percentile(self, percent: float) -> int:
+        """
+        Same as get_response_time_percentile, but for the response times corrected for coordinated omission
+        """
+        return self.corrected_response_times.percentile(self.corrected_response_times.total, percent)
+
+    @_memoized_per_tick
+    def get_current_response_time_percentile(self, percent: float) -> int:
         """
         Calculate the *current* response time for a certain percentile. We use a sliding
-        window of (approximately) the last 10 seconds (specified by CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW)
+        window of the last 10 seconds (specified by CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW)
         when calculating this.
+
+        Returns 0 if there were no requests in the window (this used to return None).
         """
         if not self.use_response_times_cache:
             raise ValueError(
                 "StatsEntry.use_response_times_cache must be set to True to calculate the _current_ response time percentile"
             )
-        # First, we want to determine which of the cached response_times dicts we should
-        # use to get response_times for approximately 10 seconds ago.
-        t = int(time.time())
-        # Since we can't be sure that the cache contains an entry for every second.
-        # We'll construct a list of timestamps which we consider acceptable keys to be used
-        # when trying to fetch the cached response_times. We construct this list in such a way
-        # that it's ordered by preference by starting to add t-10, then t-11, t-9, t-12, t-8,
-        # and so on
-        acceptable_timestamps: list[int] = []
-        acceptable_timestamps.append(t - CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW)
-        for i in range(1, 9):
-            acceptable_timestamps.append(t - CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW - i)
-            acceptable_timestamps.append(t - CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW + i)
-
-        cached: CachedResponseTimes | None = None
-        if self.response_times_cache is not None:
-            for ts in acceptable_timestamps:
-                if ts in self.response_times_cache:
-                    cached = self.response_times_cache[ts]
-                    break
+        return cast(ResponseTimesWindow, self.response_times_cache).percentile(int(time.time()), percent)
 
-        if cached:
-            # If we found an acceptable cached response times, we'll calculate a new response
-            # times dict of the last 10 seconds (approximately) by diffing it with the current
-            # total response times. Then we'll use that to calculate a response time percentile
-            # for that timeframe
-            return calculate_response_time_percentile(
-                diff_response_time_dicts(self.response_times, cached.response_times),
-                (self.num_requests - self.num_none_requests) - (cached.num_requests - cached.num_none_requests),
-                percent,
+    def get_current_response_times(self) -> ResponseTimeHistogram:
+        """
+        Return a copy of the response time distribution that the *current* response time percentiles are
+        calculated from (e.g. to calculate them outside of the gevent loop)
+        """
+        if not self.use_response_times_cache:
+            raise ValueError(
+                "StatsEntry.use_response_times_cache must be set to True to get the _current_ response times"
             )
-        # if time was not in response times cache window
-        return None
+        return cast(ResponseTimesWindow, self.response_times_cache).get_response_times(int(time.time()))
 
-    def percentile(self) -> str:
+    def percentile(self, corrected: bool = False, percentiles: list[float] | None = None) -> str:
+        """
+        :param corrected: Use the response times corrected for coordinated omission
+        :param percentiles: The percentiles to include, if not PERCENTILES_TO_REPORT
+        """
         if not self.num_requests:
             raise ValueError("Can't calculate percentile on url with no successful requests")
 
-        tpl = f"%-{str(STATS_TYPE_WIDTH)}s %-{str(STATS_NAME_WIDTH)}s %8d {' '.join(['%6d'] * len(PERCENTILES_TO_REPORT))}"
+        if percentiles is None:
+            percentiles = PERCENTILES_TO_REPORT
+        tpl = f"%-{str(STATS_TYPE_WIDTH)}s %-{str(STATS_NAME_WIDTH)}s %8d {' '.join(['%6d'] * len(percentiles))}"
+        get_percentile = self.get_corrected_response_time_percentile if corrected else self.get_response_time_percentile
 
         return tpl % (
-            (self.method or "", self.name)
-            + tuple(self.get_response_time_percentile(p) for p in PERCENTILES_TO_REPORT)
-            + (self.num_requests,)
+            (self.method or "", self.name) + tuple(get_percentile(p) for p in percentiles) + (self.num_requests,)
         )
 
-    def _cache_response_times(self, t: int) -> None:
-        if self.response_times_cache is None:
-            self.response_times_cache = OrderedDict()
-
-        self.response_times_cache[t] = CachedResponseTimes(
-            response_times=copy(self.response_times),
-            num_requests=self.num_requests,
-            num_none_requests=self.num_none_requests,
-        )
-
-        # We'll use a cache size of CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW + 10 since - in the extreme case -
-        # we might still use response times (from the cache) for t-CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW-10
-        # to calculate the current response time percentile, if we're missing cached values for the subsequent
-        # 20 seconds
-        cache_size = CURRENT_RESPONSE_TIME_PERCENTILE_WINDOW + 10
-
-        if len(self.response_times_cache) > cache_size:
-            # only keep the latest 20 response_times dicts
-            for _ in range(len(self.response_times_cache) - cache_size):
-                self.response_times_cache.popitem(last=False)
-
     def to_dict(self, escape_string_values=False) -> dict[str, int | float | str]:
+        return dict(self._to_dict())
+
+    @_memoized_per_tick
+    def _to_dict(self) -> dict[str, int | float | str]:
         response_time_percentiles = {
             f"response_time_percentile_{percentile}": self.get_response_time_percentile(percentile)
             for percentile in PERCENTILES_TO_STATISTICS
         }
+        if self.corrected_response_times:
+            response_time_percentiles.update(
+                {
+                    f"corrected_response_time_percentile_{percentile}": self.get_corrected_response_time_percentile(
+                        percentile
+                    )
+                    for percentile in PERCENTILES_TO_STATISTICS
+                }
+            )
 
         return {
             "method": self.method,
@@ -708,6 +1772,7 @@ class StatsEntry:
             "total_fail_per_sec": self.total_fail_per_sec,
             **response_time_percentiles,
             "avg_content_length": self.avg_content_length,
+            "num_lagged_requests": self.num_lagged_requests,
         }
 
 
@@ -750,9 +1815,9 @@ class StatsError:
         key = f"{method}.{name}.{StatsError.parse_error(error)!r}"
         return hashlib.sha256(key.encode("utf-8")).hexdigest()
 
-    def occurred(self) -> None:
+    def occurred(self, timestamp: float | None = None) -> None:
         self.occurrences += 1
-        now = time.time()
+        now = time.time() if timestamp is None else timestamp
         if self.first_seen is None:
             self.first_seen = now
         self.last_seen = now
@@ -812,36 +1877,130 @@ def avg(values: list[float | int]) -> float:
     return sum(values, 0.0) / max(len(values), 1)
 
 
-def median_from_dict(total: int, count: dict[int, int]) -> int:
+def median_from_dict(total: int, count: Mapping[int, int]) -> int:
     """
     total is the number of requests made
-    count is a dict {response_time: count}
+    count is a ResponseTimeHistogram or a dict {response_time: count}
     """
     pos = (total - 1) / 2
-    for k in sorted(count.keys()):
-        if pos < count[k]:
+    items = count._items() if isinstance(count, ResponseTimeHistogram) else sorted(count.items())
+    for k, c in items:
+        if pos < c:
             return k
-        pos -= count[k]
+        pos -= c
 
     return k
 
 
-def setup_distributed_stats_event_listeners(events: Events, stats: RequestStats) -> None:
+class StatsReportCodec:
+    """
+    Encodes (on workers) and applies (on the master) delta encoded stats reports.
+
+    Instead of a list of serialized StatsEntry dicts, the worker sends a row of positional
+    values for each entry that has changed since the last report, and refers to the entry by a
+    compact integer id. The (name, method) for an id is only sent the first time the id is used
+    after the worker has (re)connected. The master applies the rows directly to its own entries,
+    without creating temporary StatsEntry objects.
+
+    The master announces that it supports delta encoded reports in its "ack" message, so workers
+    keep sending the old "stats" format to masters that don't.
+    """
+
+    version = 3
+
+    def __init__(self, stats: RequestStats) -> None:
+        self.stats = stats
+        self.delta_enabled = False
+        """ Set on workers, when the master has announced that it supports delta encoded reports """
+        self._entry_ids: dict[tuple[str, str], int] = {}
+        self._announced_ids: set[int] = set()
+        self._worker_entry_keys: dict[str, dict[int, tuple[str, str]]] = {}
+
+    def reset_announced_names(self) -> None:
+        """
+        Called on workers when (re)connecting to the master, which will then forget about the
+        entry ids of this worker, so that the names are sent again
+        """
+        self._announced_ids = set()
+
+    def forget_worker(self, client_id: str) -> None:
+        """Called on the master when a worker (re)connects"""
+        self._worker_entry_keys.pop(client_id, None)
+
+    def has_unknown_entries(self, client_id: str, delta: dict[str, Any]) -> bool:
+        """
+        Called on the master, to find out if a worker refers to entry ids that it hasn't announced to
+        this master (e.g. because the master was restarted), in which case the worker needs to reconnect
+        """
+        entry_keys = self._worker_entry_keys.get(client_id, {})
+        return any(row[0] not in entry_keys and row[0] not in delta["names"] for row in delta["entries"])
+
+    def encode(self, data: dict[str, Any]) -> None:
+        names: dict[int, list[str]] = {}
+        rows = []
+        for key, entry in self.stats.entries.items():
+            if entry.num_requests == 0 and entry.num_failures == 0:
+                continue
+            entry_id = self._entry_ids.get(key)
+            if entry_id is None:
+                entry_id = self._entry_ids[key] = len(self._entry_ids)
+            if entry_id not in self._announced_ids:
+                names[entry_id] = [entry.name, entry.method]
+                self._announced_ids.add(entry_id)
+            rows.append([entry_id, *entry.get_stripped_delta_row()])
+        data["stats_delta"] = {
+            "version": self.version,
+            "names": names,
+            "entries": rows,
+            "total": self.stats.total.get_stripped_delta_row(),
+        }
+
+    def apply(self, client_id: str, delta: dict[str, Any]) -> None:
+        entry_keys = self._worker_entry_keys.setdefault(client_id, {})
+        for entry_id, (name, method) in delta["names"].items():
+            entry_keys[entry_id] = (name, method)
+        entries = self.stats.entries
+        for row in delta["entries"]:
+            key = entry_keys.get(row[0])
+            if key is None:
+                logger.warning(f"Discarded stats for unknown entry id {row[0]} from worker {client_id}")
+                continue
+            entries[key]._extend(*row[1:])
+        self.stats.total._extend(*delta["total"])
+
+
+def setup_distributed_stats_event_listeners(events: Events, stats: RequestStats) -> StatsReportCodec:
+    codec = StatsReportCodec(stats)
+
     def on_report_to_master(client_id: str, data: dict[str, Any]) -> None:
-        data["stats"] = stats.serialize_stats()
-        data["stats_total"] = stats.total.get_stripped_report()
+        # make sure requests that are buffered for batch listeners are included in the report
+        events.request.flush()
+        if codec.delta_enabled:
+            codec.encode(data)
+        else:
+            data["stats"] = stats.serialize_stats()
+            data["stats_total"] = stats.total.get_stripped_report()
         data["errors"] = stats.serialize_errors()
         stats.errors = {}
+        data["hub_lag"] = stats.hub_lag.to_dict()
+        stats.hub_lag = ResponseTimeHistogram()
 
     def on_worker_report(client_id: str, data: dict[str, Any]) -> None:
-        for stats_data in data["stats"]:
-            entry = StatsEntry.unserialize(stats_data, stats)
-            request_key = (entry.name, entry.method)
-            if request_key not in stats.entries:
-                stats.entries[request_key] = StatsEntry(stats, entry.name, entry.method, use_response_times_cache=True)
-            stats.entries[request_key].extend(entry)
+        if "stats_delta" in data:
+            codec.apply(client_id, data["stats_delta"])
+        else:
+            for stats_data in data["stats"]:
+                entry = StatsEntry.unserialize(stats_data, stats)
+                stats.entries[(entry.name, entry.method)].extend(entry)
+            stats.total.extend(StatsEntry.unserialize(data["stats_total"], stats))
 
         for error_key, error in data["errors"].items():
+            # the worker keys errors by its own entry names, but the master groups request names on its own (see
+            # max_request_names), so use the name of the entry the master counted the failures in
+            name = stats.entries[(error["name"], error["method"])].name
+            if name != error["name"]:
+                error = {**error, "name": name}
+                error_key = StatsError.create_key(error["method"], name, error["error"])
             if error_key not in stats.errors:
                 stats.errors[error_key] = StatsError.unserialize(error)
             else:
@@ -856,10 +2015,12 @@ def setup_distributed_stats_event_listeners(events: Events, stats: RequestStats)
                         incoming_last if existing.last_seen is None else max(existing.last_seen, incoming_last)
                     )
 
-        stats.total.extend(StatsEntry.unserialize(data["stats_total"], stats))
+        # workers that are too old to monitor their hub lag don't send it
+        stats.hub_lag.extend(data.get("hub_lag", {}))
 
     events.report_to_master.add_listener(on_report_to_master)
     events.worker_report.add_listener(on_worker_report)
+    return codec
 
 
 def print_stats(stats: RequestStats, current=True) -> None:
@@ -901,30 +2062,41 @@ def print_percentile_stats(stats: RequestStats) -> None:
     for line in get_percentile_stats_summary(stats):
         console_logger.info(line)
     console_logger.info("")
+    if stats.total.corrected_response_times:
+        for line in get_percentile_stats_summary(stats, corrected=True):
+            console_logger.info(line)
+        console_logger.info("")
 
 
-def get_percentile_stats_summary(stats: RequestStats) -> list[str]:
+def get_percentile_stats_summary(
+    stats: RequestStats, corrected: bool = False, percentiles: list[float] | None = None
+) -> list[str]:
     """
     Percentile stats summary will be returned as list of string
+
+    :param corrected: Summarize the response times corrected for coordinated omission
+    :param percentiles: The percentiles to include, if not PERCENTILES_TO_REPORT
     """
-    summary = ["Response time percentiles (approximated)"]
-    headers = ("Type", "Name") + tuple(get_readable_percentiles(PERCENTILES_TO_REPORT)) + ("# reqs",)
+    if percentiles is None:
+        percentiles = PERCENTILES_TO_REPORT
+    if corrected:
+        summary = ["Response time percentiles, corrected for coordinated omission (approximated)"]
+    else:
+        summary = ["Response time percentiles (approximated)"]
+    headers = ("Type", "Name") + tuple(get_readable_percentiles(percentiles)) + ("# reqs",)
     summary.append(
-        (f"%-{str(STATS_TYPE_WIDTH)}s %-{str(STATS_NAME_WIDTH)}s %8s {' '.join(['%6s'] * len(PERCENTILES_TO_REPORT))}")
-        % headers
+        (f"%-{str(STATS_TYPE_WIDTH)}s %-{str(STATS_NAME_WIDTH)}s %8s {' '.join(['%6s'] * len(percentiles))}") % headers
     )
-    separator = (
-        f"{'-' * STATS_TYPE_WIDTH}|{'-' * STATS_NAME_WIDTH}|{'-' * 8}|{('-' * 6 + '|') * len(PERCENTILES_TO_REPORT)}"
-    )[:-1]
+    separator = f"{'-' * STATS_TYPE_WIDTH}|{'-' * STATS_NAME_WIDTH}|{'-' * 8}|{('-' * 6 + '|') * len(percentiles)}"[:-1]
     summary.append(separator)
     for key in sorted(stats.entries.keys()):
         r = stats.entries[key]
-        if r.response_times:
-            summary.append(r.percentile())
+        if r.corrected_response_times if corrected else r.response_times:
+            summary.append(r.percentile(corrected, percentiles))
     summary.append(separator)
 
-    if stats.total.response_times:
-        summary.append(stats.total.percentile())
+    if stats.total.corrected_response_times if corrected else stats.total.response_times:
+        summary.append(stats.total.percentile(corrected, percentiles))
     return summary
 
 
@@ -961,26 +2133,22 @@ def sort_stats(stats: dict[Any, S]) -> list[S]:
     return [stats[key] for key in sorted(stats.keys())]
 
 
-def update_stats_history(runner: Runner, timestamp: str | None = None) -> None:
+def update_stats_history(runner: Runner, timestamp: float | None = None) -> None:
     stats = runner.stats
-    timestamp = timestamp or format_utc_timestamp(time.time())
-    current_response_time_percentiles = {
-        f"response_time_percentile_{percentile}": [
-            timestamp,
-            stats.total.get_current_response_time_percentile(percentile) or 0,
-        ]
-        for percentile in PERCENTILES_TO_CHART
-    }
-
-    r = {
-        **current_response_time_percentiles,
-        "current_rps": [timestamp, stats.total.current_rps or 0],
-        "current_fail_per_sec": [timestamp, stats.total.current_fail_per_sec or 0],
-        "total_avg_response_time": [timestamp, proper_round(stats.total.avg_response_time, digits=2)],
-        "user_count": [timestamp, runner.user_count or 0],
-        "time": timestamp,
-    }
-    stats.history.append(r)
+    stats.history.append(
+        timestamp or time.time(),
+        {
+            **{
+                f"response_time_percentile_{percentile}": stats.total.get_current_response_time_percentile(percentile)
+                or 0
+                for percentile in PERCENTILES_TO_CHART
+            },
+            "current_rps": stats.total.current_rps or 0,
+            "current_fail_per_sec": stats.total.current_fail_per_sec or 0,
+            "total_avg_response_time": proper_round(stats.total.avg_response_time, digits=2),
+            "user_count": runner.user_count or 0,
+        },
+    )
 
 
 def stats_history(runner: Runner) -> None:
@@ -1020,6 +2188,12 @@ class StatsCSV:
             "Requests/s",
             "Failures/s",
         ] + get_readable_percentiles(self.percentiles_to_report)
+        if environment.correct_coordinated_omission:
+            self.requests_csv_columns += [
+                f"Corrected {percentile}" for percentile in get_readable_percentiles(self.percentiles_to_report)
+            ]
+        if environment.monitor_hub_lag:
+            self.requests_csv_columns.append("Lagged Request Count")
 
         self.failures_columns = [
             "Method",
@@ -1037,11 +2211,15 @@ class StatsCSV:
             "Nodes",
         ]
 
-    def _percentile_fields(self, stats_entry: StatsEntry, use_current: bool = False) -> list[str] | list[int]:
+    def _percentile_fields(
+        self, stats_entry: StatsEntry, use_current: bool = False, corrected: bool = False
+    ) -> list[str] | list[int]:
         if not stats_entry.num_requests:
             return self.percentiles_na
+        elif corrected:
+            return [int(stats_entry.get_corrected_response_time_percentile(x)) for x in self.percentiles_to_report]
         elif use_current:
-            return [int(stats_entry.get_current_response_time_percentile(x) or 0) for x in self.percentiles_to_report]
+            return [stats_entry.get_current_response_time_percentile(x) for x in self.percentiles_to_report]
         else:
             return [int(stats_entry.get_response_time_percentile(x) or 0) for x in self.percentiles_to_report]
 
@@ -1070,6 +2248,10 @@ class StatsCSV:
                         stats_entry.total_fail_per_sec,
                     ],
                     self._percentile_fields(stats_entry),
+                    self._percentile_fields(stats_entry, corrected=True)
+                    if self.environment.correct_coordinated_omission
+                    else [],
+                    [stats_entry.num_lagged_requests] if self.environment.monitor_hub_lag else [],
                 )
             )
 
@@ -1102,6 +2284,19 @@ class StatsCSV:
             csv_writer.writerow([exc["count"], exc["msg"], exc["traceback"], ", ".join(exc["nodes"])])
 
 
+class _CSVSnapshot(NamedTuple):
+    timestamp: int
+    user_count: int
+    hub_lag: tuple[int, int] | None
+    # (key, version, copy of the entry if it has changed, total rps, total fail/s, current stats for the history),
+    # where the current stats are (rps, fail/s, the current response times if writing the full history)
+    entries: list[tuple]
+    failures_version: tuple
+    failures: list[tuple] | None
+    exceptions_version: tuple | None
+    exceptions: list[tuple] | None
+
+
 class StatsCSVFileWriter(StatsCSV):
     """Write statistics to CSV files"""
 
@@ -1130,6 +2325,18 @@ class StatsCSVFileWriter(StatsCSV):
         self.exceptions_csv_writer = csv.writer(self.exceptions_csv_filehandle)
         self.exceptions_csv_data_start: int = 0
 
+        self.requests_csv_data_start: int = 0
+        self._pool: ThreadPool | None = None
+        self._pending_write: Any = None
+        # what was last written, to only format and write what has changed since (see stats_writer)
+        self._entry_versions: dict[tuple[str, str], tuple] = {}
+        self._formatted_entries: dict[tuple[str, str], tuple[str, str, str, str, str]] = {}
+        self._failures_version: tuple | None = None
+        self._exceptions_version: tuple | None = None
+        self._written_content: dict[str, str] = {}
+        self._format_buffer = io.StringIO()
+        self._format_writer = csv.writer(self._format_buffer)
+
         self.stats_history_csv_columns = [
             "Timestamp",
             "User Count",
@@ -1146,16 +2353,25 @@ class StatsCSVFileWriter(StatsCSV):
             "Total Max Response Time",
             "Total Average Content Size",
         ]
+        if environment.monitor_hub_lag:
+            self.stats_history_csv_columns += ["Hub Lag 99%", "Hub Lag Max"]
 
     def __call__(self) -> None:
         self.stats_writer()
 
     def stats_writer(self) -> None:
-        """Writes all the csv files for the locust run."""
+        """
+        Writes all the csv files for the locust run.
+
+        Every CSV_STATS_INTERVAL_SEC the stats are snapshotted (copying only the entries that have changed),
+        and a separate thread formats and writes the rows, so neither blocks the gevent loop for long. The
+        fields of unchanged entries are reused from last time, and the stats, failures and exceptions files
+        are only rewritten when their content has changed. History rows are only ever appended.
+        """
 
         # Write header row for all files and save position for non-append files
         self.requests_csv_writer.writerow(self.requests_csv_columns)
-        requests_csv_data_start = self.requests_csv_filehandle.tell()
+        self.requests_csv_data_start = self.requests_csv_filehandle.tell()
 
         self.stats_history_csv_writer.writerow(self.stats_history_csv_columns)
 
@@ -1170,84 +2386,254 @@ class StatsCSVFileWriter(StatsCSV):
         try:
             while True:
                 now = time.time()
-
-                self.requests_csv_filehandle.seek(requests_csv_data_start)
-                self._requests_data_rows(self.requests_csv_writer)
-                self.requests_csv_filehandle.truncate()
-
-                self._stats_history_data_rows(self.stats_history_csv_writer, now)
-
-                self.failures_csv_filehandle.seek(self.failures_csv_data_start)
-                self._failures_data_rows(self.failures_csv_writer)
-                self.failures_csv_filehandle.truncate()
-
-                self.exceptions_csv_filehandle.seek(self.exceptions_csv_data_start)
-                self._exceptions_data_rows(self.exceptions_csv_writer)
-                self.exceptions_csv_filehandle.truncate()
-
-                if now - last_flush_time > CSV_STATS_FLUSH_INTERVAL_SEC:
-                    self.requests_flush()
-                    self.stats_history_flush()
-                    self.failures_flush()
-                    self.exceptions_flush()
+                flush = now - last_flush_time > CSV_STATS_FLUSH_INTERVAL_SEC
+                if flush:
                     last_flush_time = now
+                self._write_in_thread(self._take_snapshot(now), flush)
 
                 gevent.sleep(CSV_STATS_INTERVAL_SEC)
         except KeyboardInterrupt as e:
             logger.debug(e, exc_info=True)
 
-    def _stats_history_data_rows(self, csv_writer: CSVWriter, now: float) -> None:
+    def _take_snapshot(self, now: float) -> _CSVSnapshot:
         """
-        Write CSV rows with the *current* stats. By default only includes the
-        Aggregated stats entry, but if self.full_history is set to True, a row for each entry will
-        will be included.
-
-        Note that this method differs from the other methods as it appends time-stamped data to the file, whereas the other methods overwrites the data.
+        Collect what the writer thread needs, on the gevent loop (the stats must not be read from other threads)
         """
-
         stats = self.environment.stats
-        timestamp = int(now)
-        stats_entries: list[StatsEntry] = []
-        if self.full_history:
-            stats_entries = sort_stats(stats.entries)
+        runner = self.environment.runner
+        entries = []
+        for stats_entry in chain(sort_stats(stats.entries), [stats.total]):
+            key = (stats_entry.name, stats_entry.method)
+            version = (
+                stats_entry.start_time,
+                stats_entry.num_requests,
+                stats_entry.num_failures,
+                stats_entry.num_lagged_requests,
+            )
+            changed_entry = None
+            if self._entry_versions.get(key) != version:
+                # the thread only reads the response times, apart from plain numbers
+                changed_entry = copy(stats_entry)
+                changed_entry.response_times = copy(stats_entry.response_times)
+                changed_entry.corrected_response_times = copy(stats_entry.corrected_response_times)
+                # and must not share the cache of calculated percentiles with the live entry
+                changed_entry._snapshot = {}
+                changed_entry._snapshot_version = None
+            current = None
+            if self.full_history or stats_entry is stats.total:
+                # the current percentiles are calculated by the thread as well
+                current = (
+                    stats_entry.current_rps,
+                    stats_entry.current_fail_per_sec,
+                    stats_entry.get_current_response_times()
+                    if self.full_history and stats_entry.num_requests
+                    else None,
+                )
+            entries.append(
+                (key, version, changed_entry, stats_entry.total_rps, stats_entry.total_fail_per_sec, current)
+            )
 
-        for stats_entry in chain(stats_entries, [stats.total]):
-            csv_writer.writerow(
+        failures = None
+        failures_version = (id(stats.errors), len(stats.errors), sum(e.occurrences for e in stats.errors.values()))
+        if failures_version != self._failures_version:
+            failures = [
+                (e.method, e.name, e.error, e.occurrences, e.first_seen, e.last_seen) for e in sort_stats(stats.errors)
+            ]
+        exceptions = None
+        exceptions_version = None
+        if runner is not None:
+            exceptions_version = (
+                id(runner.exceptions),
+                len(runner.exceptions),
+                sum(exc["count"] for exc in runner.exceptions.values()),
+            )
+            if exceptions_version != self._exceptions_version:
+                exceptions = [
+                    (exc["count"], exc["msg"], exc["traceback"], ", ".join(exc["nodes"]))
+                    for exc in runner.exceptions.values()
+                ]
+        return _CSVSnapshot(
+            int(now),
+            runner.user_count if runner is not None else 0,
+            # the hub lag is measured for the whole runner, not per entry
+            (stats.get_hub_lag_percentile(0.99), stats.get_hub_lag_percentile(1.0))
+            if self.environment.monitor_hub_lag
+            else None,
+            entries,
+            failures_version,
+            failures,
+            exceptions_version,
+            exceptions,
+        )
+
+    def _write_in_thread(self, snapshot: _CSVSnapshot, flush: bool) -> None:
+        if self._pool is None:
+            self._pool = ThreadPool(1)
+        self._pending_write = self._pool.spawn(self._write_snapshot, snapshot, flush)
+        self._wait_for_writes()
+
+    def _wait_for_writes(self) -> None:
+        """Wait (without blocking the gevent loop) for the writer thread to finish what it is doing"""
+        if self._pending_write is not None:
+            pending_write = self._pending_write
+            pending_write.get()
+            if self._pending_write is pending_write:
+                self._pending_write = None
+
+    def _format_fields(self, fields: Iterable) -> str:
+        """Format fields as (part of) a CSV row, without line terminator. Only called from the writer thread"""
+        self._format_buffer.seek(0)
+        self._format_buffer.truncate()
+        self._format_writer.writerow(fields)
+        return self._format_buffer.getvalue()[:-2]
+
+    def _format_entry(self, stats_entry: StatsEntry) -> tuple[str, str, str, str, str]:
+        """
+        Format the fields of an entry that only change when requests are logged in it: (type and name,
+        stats row before the rates, stats row after the rates, percentiles, totals for the history)
+        """
+        percentiles = self._percentile_fields(stats_entry)
+        return (
+            self._format_fields((stats_entry.method or "", stats_entry.name)),
+            self._format_fields(
+                (
+                    stats_entry.method,
+                    stats_entry.name,
+                    stats_entry.num_requests,
+                    stats_entry.num_failures,
+                    stats_entry.median_response_time,
+                    stats_entry.avg_response_time,
+                    stats_entry.min_response_time or 0,
+                    stats_entry.max_response_time,
+                    stats_entry.avg_content_length,
+                )
+            ),
+            self._format_fields(
                 chain(
-                    (
-                        timestamp,
-                        self.environment.runner.user_count if self.environment.runner is not None else 0,
-                        stats_entry.method or "",
-                        stats_entry.name,
-                        f"{stats_entry.current_rps:2f}",
-                        f"{stats_entry.current_fail_per_sec:2f}",
-                    ),
-                    self._percentile_fields(stats_entry, use_current=self.full_history),
-                    (
-                        stats_entry.num_requests,
-                        stats_entry.num_failures,
-                        stats_entry.median_response_time,
-                        stats_entry.avg_response_time,
-                        stats_entry.min_response_time or 0,
-                        stats_entry.max_response_time,
-                        stats_entry.avg_content_length,
-                    ),
+                    percentiles,
+                    self._percentile_fields(stats_entry, corrected=True)
+                    if self.environment.correct_coordinated_omission
+                    else [],
+                    [stats_entry.num_lagged_requests] if self.environment.monitor_hub_lag else [],
+                )
+            ),
+            ",".join(map(str, percentiles)),
+            self._format_fields(
+                (
+                    stats_entry.num_requests,
+                    stats_entry.num_failures,
+                    stats_entry.median_response_time,
+                    stats_entry.avg_response_time,
+                    stats_entry.min_response_time or 0,
+                    stats_entry.max_response_time,
+                    stats_entry.avg_content_length,
                 )
+            ),
+        )
+
+    def _current_percentile_fields(self, response_times: ResponseTimeHistogram | None) -> list[str] | list[int]:
+        """Calculate the current percentiles from a snapshot of the current response times (None if no requests)"""
+        if response_times is None:
+            return self.percentiles_na
+        return [response_times.percentile(response_times.total, x) for x in self.percentiles_to_report]
+
+    def _write_snapshot(self, snapshot: _CSVSnapshot, flush: bool) -> None:
+        """Body of the writer thread"""
+        formatted_entries = {}
+        entry_versions = {}
+        requests_rows = []
+        history_rows = []
+        history_row_start = f"{snapshot.timestamp},{snapshot.user_count},"
+        hub_lag = f",{snapshot.hub_lag[0]},{snapshot.hub_lag[1]}\r\n" if snapshot.hub_lag is not None else "\r\n"
+        for key, version, changed_entry, total_rps, total_fail_per_sec, current in snapshot.entries:
+            if changed_entry is not None:
+                formatted = self._format_entry(changed_entry)
+            else:
+                formatted = self._formatted_entries[key]
+            formatted_entries[key] = formatted
+            entry_versions[key] = version
+            name, before_rates, after_rates, percentiles, history_totals = formatted
+            requests_rows.append(f"{before_rates},{total_rps},{total_fail_per_sec},{after_rates}\r\n")
+            if current is not None:
+                current_rps, current_fail_per_sec, current_response_times = current
+                if self.full_history:
+                    percentiles = ",".join(map(str, self._current_percentile_fields(current_response_times)))
+                history_rows.append(
+                    f"{history_row_start}{name},{current_rps:2f},{current_fail_per_sec:2f},{percentiles},"
+                    f"{history_totals}{hub_lag}"
+                )
+        self._formatted_entries = formatted_entries
+        self._entry_versions = entry_versions
+
+        self.stats_history_csv_filehandle.write("".join(history_rows))
+        self._rewrite(self.requests_csv_filehandle, self.requests_csv_data_start, requests_rows)
+
+        if snapshot.failures is not None:
+            self._rewrite(
+                self.failures_csv_filehandle,
+                self.failures_csv_data_start,
+                [
+                    self._format_fields(
+                        (
+                            method,
+                            name,
+                            StatsError.parse_error(error),
+                            occurrences,
+                            format_utc_timestamp(first_seen) if first_seen is not None else "",
+                            format_utc_timestamp(last_seen) if last_seen is not None else "",
+                        )
+                    )
+                    + "\r\n"
+                    for method, name, error, occurrences, first_seen, last_seen in snapshot.failures
+                ],
             )
+            self._failures_version = snapshot.failures_version
+        if snapshot.exceptions is not None:
+            self._rewrite(
+                self.exceptions_csv_filehandle,
+                self.exceptions_csv_data_start,
+                [self._format_fields(exception) + "\r\n" for exception in snapshot.exceptions],
+            )
+            self._exceptions_version = snapshot.exceptions_version
+
+        if flush:
+            self.requests_csv_filehandle.flush()
+            self.stats_history_csv_filehandle.flush()
+            self.failures_csv_filehandle.flush()
+            self.exceptions_csv_filehandle.flush()
+
+    def _rewrite(self, filehandle: TextIO, data_start: int, rows: list[str]) -> None:
+        """Replace the data rows of a file, unless they are the same as last time"""
+        content = "".join(rows)
+        if self._written_content.get(filehandle.name) == content:
+            return
+        filehandle.seek(data_start)
+        filehandle.write(content)
+        filehandle.truncate()
+        self._written_content[filehandle.name] = content
 
     def requests_flush(self) -> None:
+        self._wait_for_writes()
         self.requests_csv_filehandle.flush()
 
     def stats_history_flush(self) -> None:
+        self._wait_for_writes()
         self.stats_history_csv_filehandle.flush()
 
     def failures_flush(self) -> None:
+        self._wait_for_writes()
         self.failures_csv_filehandle.flush()
 
     def exceptions_flush(self) -> None:
+        self._wait_for_writes()
         self.exceptions_csv_filehandle.flush()
 
     def close_files(self) -> None:
+        # the stats_writer greenlet may have been killed while the writer thread was still writing
+        self._wait_for_writes()
+        if self._pool is not None:
+            self._pool.kill()
+            self._pool = None
         self.requests_csv_filehandle.close()
         self.stats_history_csv_filehandle.close()
         self.failures_csv_filehandle.close()
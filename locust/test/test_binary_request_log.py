@@ -0,0 +1,137 @@
+"""Tests for locust.contrib.binary_request_log."""
+
+from locust.contrib import binary_request_log
+from locust.contrib.binary_request_log import BinaryRequestLogger, aggregate, iter_requests, main, read_strings
+from locust.env import Environment
+from locust.exception import CatchResponseError
+from locust.stats import PERCENTILES_TO_REPORT, RequestStats
+
+import csv
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+from unittest.mock import MagicMock
+
+from .test_csv_request_logger import _fire
+
+
+class TestBinaryRequestLog(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmpdir.name, "requests.bin")
+        self.env = Environment(events=None, catch_exceptions=False)
+        self.log = BinaryRequestLogger(self.path)
+        self.log.register(self.env)
+
+    def tearDown(self):
+        self.log.close()
+        self._tmpdir.cleanup()
+
+    def test_requests_are_read_back(self):
+        resp = MagicMock()
+        resp.status_code = 200
+        _fire(self.env, response=resp)
+        _fire(self.env, request_type="POST", name="/other", response_time=None, start_time=1_700_000_001.5)
+        _fire(self.env, exception=CatchResponseError("boom"), response_length=0)
+        self.log.close()
+
+        requests = list(iter_requests(self.path))
+        assert len(requests) == 3
+        assert requests[0] == (1_700_000_000.0, "GET", "/test", 123.45, 512, 200, None)
+        assert requests[1].request_type == "POST"
+        assert requests[1].name == "/other"
+        assert requests[1].response_time is None
+        assert requests[1].timestamp == 1_700_000_001.5
+        assert requests[2].error == "CatchResponseError('boom')"
+        assert requests[2].status_code == 0
+        # each distinct string is only stored once
+        assert read_strings(self.path) == ["", "/test", "GET", "/other", "POST", "CatchResponseError('boom')"]
+        assert os.path.getsize(self.path) == binary_request_log.HEADER.size + 3 * binary_request_log.RECORD.size
+
+    def test_readable_before_close(self):
+        _fire(self.env)
+        _fire(self.env)
+        assert len(list(iter_requests(self.path))) == 2
+
+    def test_file_grows(self):
+        self.log.close()
+        self.env = Environment(events=None, catch_exceptions=False)
+        with mock.patch.object(binary_request_log, "GROW_BY_RECORDS", 4):
+            self.log.register(self.env)
+            for i in range(10):
+                _fire(self.env, name=f"/route/{i}")
+        self.log.close()
+        assert [request.name for request in iter_requests(self.path)] == [f"/route/{i}" for i in range(10)]
+
+    def test_aggregate_matches_live_stats(self):
+        expected = RequestStats()
+        for i in range(100):
+            exception = Exception("Error %d" % (i % 3)) if i % 10 == 0 else None
+            name = "/a" if i % 2 else "/b"
+            _fire(self.env, name=name, response_time=i * 10, exception=exception, start_time=1_700_000_000.0 + i / 10)
+            expected.log_request("GET", name, i * 10, 512)
+            if exception:
+                expected.log_error("GET", name, exception)
+        self.log.close()
+
+        stats = aggregate(self.path)
+        assert stats.total.num_requests == 100
+        assert stats.total.num_failures == 10
+        assert dict(stats.total.response_times.items()) == dict(expected.total.response_times.items())
+        for key, entry in expected.entries.items():
+            assert stats.entries[key].num_failures == entry.num_failures
+            assert stats.entries[key].get_response_time_percentile(0.95) == entry.get_response_time_percentile(0.95)
+        assert stats.errors.keys() == expected.errors.keys()
+        # request rates are calculated from the logged timestamps
+        assert stats.total.start_time == 1_700_000_000.0
+        assert stats.total.num_reqs_per_sec[1_700_000_005] == 10
+        assert round(stats.total.total_rps) == 10
+
+    def test_aggregate_time_window(self):
+        for i in range(10):
+            _fire(self.env, response_time=i, start_time=1_700_000_000.0 + i)
+        self.log.close()
+
+        stats = aggregate(self.path, start=1_700_000_002.0, end=1_700_000_005.0)
+        assert stats.total.num_requests == 3
+        assert stats.total.min_response_time == 2
+        assert stats.total.max_response_time == 4
+
+    def test_not_a_request_log(self):
+        with open(self.path + ".txt", "w") as f:
+            f.write("timestamp,request_type\n")
+        with open(self.path + ".txt.strings", "w"):
+            pass
+        with self.assertRaises(ValueError):
+            list(iter_requests(self.path + ".txt"))
+
+    def test_cli(self):
+        for i in range(10):
+            _fire(self.env, name="/cli", response_time=i * 100, start_time=1_700_000_000.0 + i)
+        self.log.close()
+
+        out = io.StringIO()
+        percentiles_to_report = list(PERCENTILES_TO_REPORT)
+        with redirect_stdout(out):
+            assert main([self.path, "--start", "5", "--percentiles", "0.5,0.9"]) == 0
+        assert binary_request_log.stats_module.PERCENTILES_TO_REPORT == percentiles_to_report
+        output = out.getvalue()
+        assert "GET      /cli" in output
+        assert "50%" in output
+        assert "90%" in output
+        assert "99%" not in output
+        assert "     5 " in output  # number of requests after the first 5 seconds
+
+        csv_path = os.path.join(self._tmpdir.name, "requests.csv")
+        assert main([self.path, "--csv", csv_path]) == 0
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 10
+        assert rows[3]["response_time_ms"] == "300.0"
+
+
+if __name__ == "__main__":
+    unittest.main()
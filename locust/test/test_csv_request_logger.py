@@ -4,10 +4,13 @@ from locust.contrib.csv_request_logger import CSV_COLUMNS, CsvRequestLogger, _st
 from locust.env import Environment
 
 import csv
+import gzip
 import os
 import tempfile
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+
+import gevent
 
 
 def _make_environment() -> Environment:
@@ -184,6 +187,106 @@ class TestCsvRequestLogger(unittest.TestCase):
         rows = self._read_csv()
         assert len(rows) == 0
 
+    def test_queued_requests_are_written_on_close(self):
+        log = CsvRequestLogger(self.csv_path, queued=True)
+        log.register(self.env)
+        for i in range(100):
+            _fire(self.env, name=f"/route/{i}", exception=Exception("boom") if i == 5 else None)
+        log.close()
+
+        rows = self._read_csv()
+        assert [row["name"] for row in rows] == [f"/route/{i}" for i in range(100)]
+        assert rows[5]["exception"] == "boom"
+        assert rows[0]["response_time_ms"] == "123.45"
+        assert log.dropped == 0
+
+    def test_queued_overflow_drop(self):
+        log = CsvRequestLogger(self.csv_path, queued=True, queue_size=10, overflow="drop")
+        log.register(self.env)
+        # the writer thread doesn't get to run in between, as the gevent loop isn't blocked
+        for _ in range(25):
+            _fire(self.env)
+        log.close()
+
+        assert log.dropped == 15
+        assert len(self._read_csv()) == 10
+
+    def test_queued_overflow_sample(self):
+        log = CsvRequestLogger(self.csv_path, queued=True, queue_size=10, overflow="sample", sample_rate=0)
+        log.register(self.env)
+        for _ in range(25):
+            _fire(self.env)
+        log.close()
+
+        assert log.dropped == 20
+        assert len(self._read_csv()) == 5
+
+    def test_queued_overflow_block(self):
+        log = CsvRequestLogger(self.csv_path, queued=True, queue_size=10)
+        log.register(self.env)
+        for _ in range(25):
+            _fire(self.env)
+        log.close()
+
+        assert log.dropped == 0
+        assert len(self._read_csv()) == 25
+
+    def test_queued_overflow_block_many_users(self):
+        log = CsvRequestLogger(self.csv_path, queued=True, queue_size=10)
+        log.register(self.env)
+        with gevent.Timeout(5):
+            users = [gevent.spawn(lambda: [_fire(self.env) for _ in range(20)]) for _ in range(5)]
+            gevent.joinall(users, raise_error=True)
+        log.close()
+
+        assert log.dropped == 0
+        assert len(self._read_csv()) == 100
+
+    def test_queued_overflow_block_when_writer_fails(self):
+        log = CsvRequestLogger(self.csv_path, queued=True, queue_size=10)
+        log.register(self.env)
+        with patch.object(CsvRequestLogger, "_format_row", side_effect=ValueError("disk full")):
+            # users that wait for room in the queue are released when the writer thread stops
+            with gevent.Timeout(5):
+                for _ in range(1000):
+                    _fire(self.env)
+            # and requests are not queued any more, as nothing would take them off the queue
+            assert len(log._queue) <= log.queue_size
+            assert log.dropped > 0
+            log.close()
+
+        assert len(self._read_csv()) == 0
+
+    def test_invalid_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            CsvRequestLogger(self.csv_path, overflow="ignore")  # type: ignore[arg-type]
+
+    def test_rotate_bytes(self):
+        log = CsvRequestLogger(self.csv_path, rotate_bytes=200)
+        log.register(self.env)
+        for i in range(10):
+            _fire(self.env, name=f"/route/{i}")
+        log.close()
+
+        assert log.filepaths[:2] == [self.csv_path, os.path.join(self._tmpdir.name, "requests.1.csv")]
+        names = []
+        for path in log.filepaths:
+            assert os.path.getsize(path) < 300
+            with open(path, newline="", encoding="utf-8") as f:
+                names += [row["name"] for row in csv.DictReader(f)]
+        assert names == [f"/route/{i}" for i in range(10)]
+
+    def test_compress(self):
+        log = CsvRequestLogger(self.csv_path, queued=True, compress=True)
+        log.register(self.env)
+        _fire(self.env, name="/compressed")
+        log.close()
+
+        assert log.filepaths == [self.csv_path + ".gz"]
+        with gzip.open(self.csv_path + ".gz", "rt", newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert [row["name"] for row in rows] == ["/compressed"]
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -8,6 +8,7 @@ from locust.exception import (
     ResponseError,
     StopUser,
 )
+from locust.user.task import get_task_weights
 
 import gevent
 from gevent import sleep
@@ -34,11 +35,74 @@ class TestTaskSet(LocustTestCase):
 
         l = MyTasks(self.locust)
 
-        t1_count = len([t for t in l.tasks if t == t1])
-        t2_count = len([t for t in l.tasks if t == t2])
+        self.assertEqual([t1, t2], l.tasks)
+        self.assertEqual({t1: 5, t2: 2}, get_task_weights(l))
 
-        self.assertEqual(t1_count, 5)
-        self.assertEqual(t2_count, 2)
+    def test_large_task_weights(self):
+        class MyTasks(TaskSet):
+            @task(999_000)
+            def t1(self):
+                pass
+
+            @task(1_000)
+            def t2(self):
+                pass
+
+        l = MyTasks(self.locust)
+        self.assertEqual([MyTasks.t1, MyTasks.t2], l.tasks)
+        picked = [l.get_next_task() for _ in range(10_000)]
+        self.assertTrue(0 < picked.count(MyTasks.t2) < 50, picked.count(MyTasks.t2))
+
+    def test_tasks_set_to_list_with_duplicates(self):
+        t1 = lambda l: None
+        t2 = lambda l: None
+
+        class MyTasks(TaskSet):
+            pass
+
+        MyTasks.tasks = [t1, t1, t1, t2]
+        self.assertEqual({t1: 3, t2: 1}, get_task_weights(MyTasks))
+        l = MyTasks(self.locust)
+        self.assertEqual({t1, t2}, {l.get_next_task() for _ in range(100)})
+        MyTasks.tasks = [t2]
+        self.assertEqual({t2}, {l.get_next_task() for _ in range(10)})
+
+    def test_tasks_changed_in_place(self):
+        t1 = lambda l: None
+        t2 = lambda l: None
+
+        class MyTasks(TaskSet):
+            pass
+
+        MyTasks.tasks = [t1]
+        l = MyTasks(self.locust)
+        self.assertEqual({t1}, {l.get_next_task() for _ in range(10)})
+        MyTasks.tasks = [t2]
+        self.assertEqual({t2}, {l.get_next_task() for _ in range(10)})
+        MyTasks.tasks.append(t1)
+        MyTasks.task_weights = {t1: 0}
+        self.assertEqual({t2}, {l.get_next_task() for _ in range(10)})
+        MyTasks.task_weights = {t1: 1}
+        self.assertEqual({t1, t2}, {l.get_next_task() for _ in range(100)})
+        MyTasks.tasks.remove(t2)
+        self.assertEqual({t1}, {l.get_next_task() for _ in range(10)})
+
+    def test_tasks_per_instance(self):
+        t1 = lambda l: None
+        t2 = lambda l: None
+
+        class MyTasks(TaskSet):
+            tasks = [t1]
+
+        l1 = MyTasks(self.locust)
+        l2 = MyTasks(self.locust)
+        l2.tasks = [t2]
+        for _ in range(10):
+            self.assertEqual(t1, l1.get_next_task())
+            self.assertEqual(t2, l2.get_next_task())
+        # each of them keeps its own table, instead of rebuilding the class' one on every pick
+        self.assertIs(MyTasks.__dict__["_task_picker"][0], MyTasks.tasks)
+        self.assertIs(vars(l2)["_task_picker"][0], l2.tasks)
 
     def test_tasks_missing_gives_user_friendly_exception(self):
         class MyTasks(TaskSet):
@@ -82,15 +146,7 @@ class TestTaskSet(LocustTestCase):
 
         l = MyTasks(self.locust)
 
-        t1_count = len([t for t in l.tasks if t == t1])
-        t2_count = len([t for t in l.tasks if t == t2])
-        t3_count = len([t for t in l.tasks if t.__name__ == MyTasks.t3.__name__])
-        t4_count = len([t for t in l.tasks if t.__name__ == MyTasks.t4.__name__])
-
-        self.assertEqual(t1_count, 5)
-        self.assertEqual(t2_count, 2)
-        self.assertEqual(t3_count, 3)
-        self.assertEqual(t4_count, 13)
+        self.assertEqual({t1: 5, t2: 2, MyTasks.t3: 3, MyTasks.t4: 13}, get_task_weights(l))
 
     def test_tasks_on_locust(self):
         class MyUser(User):
@@ -103,8 +159,7 @@ class TestTaskSet(LocustTestCase):
                 pass
 
         l = MyUser(self.environment)
-        self.assertEqual(2, len([t for t in l.tasks if t.__name__ == MyUser.t1.__name__]))
-        self.assertEqual(3, len([t for t in l.tasks if t.__name__ == MyUser.t2.__name__]))
+        self.assertEqual({MyUser.t1: 2, MyUser.t2: 3}, get_task_weights(l))
 
     def test_tasks_on_abstract_locust(self):
         class AbstractUser(User):
@@ -120,8 +175,7 @@ class TestTaskSet(LocustTestCase):
                 pass
 
         l = MyUser(self.environment)
-        self.assertEqual(2, len([t for t in l.tasks if t.__name__ == MyUser.t1.__name__]))
-        self.assertEqual(3, len([t for t in l.tasks if t.__name__ == MyUser.t2.__name__]))
+        self.assertEqual({MyUser.t1: 2, MyUser.t2: 3}, get_task_weights(l))
 
     def test_taskset_on_abstract_locust(self):
         v = [0]
@@ -327,7 +381,8 @@ class TestTaskSet(LocustTestCase):
                 pass
 
         taskset = MyTaskSet3(self.locust)
-        self.assertEqual(len(taskset.tasks), 3)
+        self.assertEqual(len(taskset.tasks), 1)
+        self.assertEqual({MyTaskSet3.t1: 3}, get_task_weights(taskset))
 
     def test_wait_function(self):
         class MyTaskSet(TaskSet):
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+from locust.main import create_master_ipc_path
+from locust.rpc import zmqrpc
+
 import json
 import os
 import platform
+import shutil
 import socket
 import subprocess
 import sys
@@ -15,6 +19,7 @@ from unittest import TestCase
 import gevent
 import psutil
 import requests
+import zmq
 from pyquery import PyQuery as pq
 
 from .mock_locustfile import MOCK_LOCUSTFILE_CONTENT, mock_locustfile
@@ -1737,3 +1742,31 @@ class TelemetryTests(ProcessIntegrationTest):
                 tp.expect("GET /hello", stream="stdout")
                 tp.expect("GET /custom-name", stream="stdout")
                 tp.not_expect_any("GET /world", stream="stdout")
+
+
+@unittest.skipIf(IS_WINDOWS or not zmq.has("ipc"), "ipc transport is not available")
+class MasterIpcPathTests(TestCase):
+    def test_ipc_path_in_private_directory(self):
+        ipc_path = create_master_ipc_path()
+        self.assertIsNotNone(ipc_path)
+        try:
+            ipc_dir = os.path.dirname(ipc_path)
+            self.assertEqual(0o700, os.stat(ipc_dir).st_mode & 0o777)
+            self.assertEqual([], os.listdir(ipc_dir))
+            # the master must be able to bind there after the probe
+            server = zmqrpc.Server("127.0.0.1", 0, ipc_path=ipc_path)
+            server.close(linger=0)
+        finally:
+            shutil.rmtree(os.path.dirname(ipc_path), ignore_errors=True)
+
+    def test_falls_back_to_tcp_when_ipc_bind_fails(self):
+        with TemporaryDirectory() as tmpdir:
+            # unix socket paths are limited to about 100 characters
+            with patch_env("TMPDIR", os.path.join(tmpdir, "x" * 200)):
+                os.makedirs(os.environ["TMPDIR"])
+                tempfile.tempdir = None
+                try:
+                    self.assertIsNone(create_master_ipc_path())
+                    self.assertEqual([], os.listdir(os.environ["TMPDIR"]))
+                finally:
+                    tempfile.tempdir = None
@@ -6,6 +6,7 @@ from locust.user.markov_taskset import (
     MarkovTaskTagError,
     NoMarkovTasksError,
     NonMarkovTaskTransitionError,
+    to_weighted_list,
     transition,
     transitions,
 )
@@ -87,7 +88,7 @@ class TestMarkovTaskSet(LocustTestCase):
             @transitions({"t1": 2, "t3": 1})
             def t2(self):
                 log.append(2)
-                if len(log) >= 10:
+                if len(log) >= 3000:
                     self.interrupt(reschedule=False)
 
             @transition("t1")
@@ -101,6 +102,15 @@ class TestMarkovTaskSet(LocustTestCase):
         self.assertIn(1, log)
         self.assertIn(2, log)
         self.assertIn(3, log)
+        # t2 moves on to t1 twice as often as to t3 (with well over 1000 samples, this is way beyond 5 sigma)
+        after_t2 = [log[i + 1] for i in range(len(log) - 1) if log[i] == 2]
+        self.assertGreater(len(after_t2), 1000)
+        self.assertAlmostEqual(1 / 3, after_t2.count(3) / len(after_t2), delta=0.1)
+        self.assertEqual(len(after_t2), after_t2.count(1) + after_t2.count(3))
+
+    def test_to_weighted_list_is_deprecated(self):
+        with self.assertWarns(DeprecationWarning):
+            self.assertEqual(["t1", "t1", "t2"], to_weighted_list({"t1": 2, "t2": 1, "t3": 0}))
 
     def test_transitions_list_format(self):
         """Test using the transitions decorator with a list format"""
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import locust
-from locust import LoadTestShape, __version__, constant, runners
+from locust import LoadTestShape, __version__, constant, constant_pacing, runners
 from locust.argument_parser import get_parser
 from locust.dispatch import UsersDispatcher
 from locust.env import Environment
@@ -9,6 +9,7 @@ from locust.exception import RPCError, RPCReceiveError, StopUser
 from locust.log import LogReader
 from locust.main import create_environment
 from locust.rpc import Message
+from locust.rpc.protocol import COMPACT_FORMAT_VERSION
 from locust.runners import (
     STATE_INIT,
     STATE_MISSING,
@@ -20,7 +21,7 @@ from locust.runners import (
     WorkerNode,
     WorkerRunner,
 )
-from locust.stats import RequestStats
+from locust.stats import RequestStats, StatsReportCodec
 from locust.user import TaskSet, User, task
 
 import json
@@ -217,6 +218,333 @@ class TestLocustRunner(LocustRunnerTestCase):
         self.assertTrue(g2.dead)
         self.assertTrue(triggered[0])
 
+    def test_stop_users_per_class(self):
+        class User1(User):
+            wait_time = constant(1)
+
+            @task
+            def t(self):
+                pass
+
+        class User2(User):
+            wait_time = constant(1)
+
+            @task
+            def t(self):
+                if self.environment.stop_user2:
+                    raise StopUser()
+
+        environment = Environment(user_classes=[User1, User2])
+        environment.stop_user2 = False
+        runner = environment.create_local_runner()
+        users1 = runner.spawn_users({"User1": 3, "User2": 2})[:3]
+        sleep(0)
+        self.assertEqual({"User1": 3, "User2": 2}, runner.user_classes_count)
+
+        # the oldest users of a class are stopped first
+        runner.stop_users({"User1": 2})
+        self.assertTrue(users1[0].greenlet.dead)
+        self.assertTrue(users1[1].greenlet.dead)
+        self.assertFalse(users1[2].greenlet.dead)
+        self.assertEqual({"User1": 1, "User2": 2}, runner.user_classes_count)
+
+        # users that stop by themselves are no longer counted either
+        environment.stop_user2 = True
+        sleep(1.1)
+        self.assertEqual({"User1": 1, "User2": 0}, runner.user_classes_count)
+        self.assertEqual(1, runner.user_count)
+        runner.quit()
+
+    def test_spawn_users_in_batches(self):
+        class MyUser(User):
+            wait_time = constant(10)
+            started = 0
+
+            @task
+            def t(self):
+                MyUser.started += 1
+
+        environment = Environment(user_classes=[MyUser])
+        runner = environment.create_local_runner()
+        with mock.patch("locust.runners.SPAWN_BATCH_SIZE", new=5):
+            # spawning yields between batches, so users that have already been spawned get to run
+            users = runner.spawn_users({"MyUser": 12})
+        self.assertEqual(12, len(users))
+        self.assertEqual(10, MyUser.started)
+        sleep(0)
+        self.assertEqual(12, MyUser.started)
+        runner.quit()
+
+    def test_arrival_rate(self):
+        class MyUser(User):
+            wait_time = constant(100)  # ignored when there is an arrival rate
+            task_duration = 0.0
+            iterations = 0
+
+            @task
+            def t(self):
+                MyUser.iterations += 1
+                gevent.sleep(MyUser.task_duration)
+
+        environment = Environment(user_classes=[MyUser])
+        runner = environment.create_local_runner()
+        runner.set_arrival_rate(20)
+        runner.start(5, 5, wait=False)
+        runner.spawning_greenlet.join()
+        sleep(1)
+        self.assertTrue(18 <= MyUser.iterations <= 22, MyUser.iterations)
+        self.assertEqual(0, runner.dropped_iterations)
+        self.assertEqual(0, runner.late_iterations)
+
+        # 5 users can only run 10 iterations per second that take 0.5s each
+        MyUser.task_duration = 0.5
+        sleep(2)
+        self.assertTrue(15 <= runner.dropped_iterations <= 25, runner.dropped_iterations)
+
+        # no iterations are dropped while the test is stopped
+        runner.stop()
+        dropped_iterations = runner.dropped_iterations
+        sleep(0.2)
+        self.assertEqual(dropped_iterations, runner.dropped_iterations)
+        runner.quit()
+
+    def test_correct_coordinated_omission_with_pacing(self):
+        class MyUser(User):
+            wait_time = constant_pacing(0.1)
+
+            @task
+            def t(self):
+                self.environment.events.request.fire(
+                    request_type="GET", name="/", response_time=250, response_length=0, context={}, exception=None
+                )
+                raise StopUser()
+
+        environment = Environment(user_classes=[MyUser])
+        environment.correct_coordinated_omission = True
+        runner = environment.create_local_runner()
+        runner.start(1, 1, wait=False)
+        runner.spawning_greenlet.join()
+        sleep(0.3)
+        runner.quit()
+        entry = runner.stats.get("/", "GET")
+        self.assertEqual(1, entry.num_requests)
+        # the two requests that should have been sent while waiting for the slow one are accounted for
+        self.assertEqual({250: 1, 150: 1}, entry.corrected_response_times)
+
+    def test_requests_during_hub_lag_are_counted(self):
+        class MyUser(User):
+            wait_time = constant(0.1)
+
+            @task
+            def t(self):
+                start = time.perf_counter()
+                # blocks the whole hub, like CPU heavy task code would (time.sleep is monkey patched)
+                while time.perf_counter() - start < 0.05:
+                    pass
+                self.environment.events.request.fire(
+                    request_type="GET",
+                    name="/blocked",
+                    response_time=(time.perf_counter() - start) * 1000,
+                    response_length=0,
+                    context={},
+                    exception=None,
+                )
+                sleep(0.1)
+                self.environment.events.request.fire(
+                    request_type="GET", name="/fast", response_time=1, response_length=0, context={}, exception=None
+                )
+
+        environment = Environment(user_classes=[MyUser])
+        runner = environment.create_local_runner()
+        runner.start(1, 1, wait=False)
+        runner.spawning_greenlet.join()
+        sleep(0.5)
+        runner.quit()
+        blocked = runner.stats.get("/blocked", "GET")
+        self.assertGreater(blocked.num_requests, 0)
+        self.assertEqual(blocked.num_requests, blocked.num_lagged_requests)
+        self.assertEqual(0, runner.stats.get("/fast", "GET").num_lagged_requests)
+        self.assertEqual(blocked.num_requests, runner.stats.total.num_lagged_requests)
+        self.assertGreaterEqual(runner.stats.get_hub_lag_percentile(1.0), 40)
+
+    def test_no_hub_lag_monitor(self):
+        environment = Environment(parsed_options=get_parser().parse_args(["--no-hub-lag-monitor"]))
+        runner = environment.create_local_runner()
+        self.assertIsNone(runner.hub_lag_monitor)
+        self.assertIsNone(runner.hub_lag_monitor_greenlet)
+        runner._on_request("GET", "/", 100, 0)
+        self.assertEqual(0, runner.stats.total.num_lagged_requests)
+        self.assertEqual({}, runner.stats.hub_lag)
+        runner.quit()
+
+    def test_event_listener_timing(self):
+        environment = Environment()
+
+        def on_request(**kwargs):
+            time.sleep(0.01)
+
+        def broken_listener(**kwargs):
+            raise Exception("oops")
+
+        environment.events.request.add_listener(on_request)
+        environment.events.request.add_listener(broken_listener)
+        environment.events.request.fire(request_type="GET", name="/", response_time=1, response_length=0)
+        self.assertEqual([], environment.events.get_listener_timings())
+
+        environment.events.enable_listener_timing()
+        for _ in range(3):
+            environment.events.request.fire(request_type="GET", name="/", response_time=1, response_length=0)
+        timings = environment.events.get_listener_timings()
+        self.assertEqual(2, len(timings))
+        slowest = timings[0]
+        self.assertEqual("request", slowest["event"])
+        self.assertEqual(
+            f"{__name__}.TestLocustRunner.test_event_listener_timing.<locals>.on_request", slowest["listener"]
+        )
+        self.assertEqual(3, slowest["calls"])
+        self.assertGreaterEqual(slowest["total_time"], 30)
+        self.assertGreaterEqual(slowest["max_time"], 10)
+        self.assertAlmostEqual(slowest["total_time"] / 3, slowest["avg_time"])
+        # a listener that raises is timed too
+        self.assertEqual(3, timings[1]["calls"])
+
+        environment.events.reset_listener_timings()
+        self.assertEqual([], environment.events.get_listener_timings())
+        self.assertTrue(environment.events.listener_timing_enabled)
+
+    def test_batch_listener(self):
+        environment = Environment()
+        request = environment.events.request
+        request.batch_size = 3
+        request.batch_interval = 0.05
+        calls = []
+        batches = []
+        request.add_listener(lambda **kwargs: calls.append(kwargs["name"]))
+        request.add_batch_listener(lambda requests: batches.append([r["name"] for r in requests]))
+
+        for name in "abcd":
+            request.fire(request_type="GET", name=name, response_time=1, response_length=0)
+        self.assertEqual(["a", "b", "c", "d"], calls)
+        # flushed when the batch size is reached
+        self.assertEqual([["a", "b", "c"]], batches)
+        # and when the batch interval has passed
+        sleep(0.1)
+        self.assertEqual([["a", "b", "c"], ["d"]], batches)
+        request.fire(request_type="GET", name="e", response_time=1, response_length=0)
+        request.flush()
+        self.assertEqual(["e"], batches[-1])
+        request.flush()
+        self.assertEqual(3, len(batches))
+
+    def test_batch_listener_only_gets_request_fields(self):
+        environment = Environment()
+        request = environment.events.request
+        batches = []
+        request.add_batch_listener(batches.append)
+        request.fire(
+            request_type="GET",
+            name="/",
+            response_time=1,
+            response_length=0,
+            response=object(),
+            context={"user": "a"},
+            exception=None,
+            start_time=1234.5,
+        )
+        request.fire(request_type="GET", name="/", response_time=1, response_length=0, context={}, exception=None)
+        request.flush()
+        self.assertEqual(
+            [
+                [
+                    {
+                        "request_type": "GET",
+                        "name": "/",
+                        "response_time": 1,
+                        "response_length": 0,
+                        "exception": None,
+                        "start_time": 1234.5,
+                    },
+                    {
+                        "request_type": "GET",
+                        "name": "/",
+                        "response_time": 1,
+                        "response_length": 0,
+                        "exception": None,
+                        "start_time": None,
+                    },
+                ]
+            ],
+            batches,
+        )
+
+    def test_batched_requests_are_logged_at_their_start_time(self):
+        environment = Environment()
+        runner = environment.create_local_runner()
+        start_time = time.time() - 5
+        runner._on_requests(
+            [
+                {
+                    "request_type": "GET",
+                    "name": "/",
+                    "response_time": 1,
+                    "response_length": 0,
+                    "exception": "oops",
+                    "start_time": start_time,
+                }
+            ]
+        )
+        entry = runner.stats.get("/", "GET")
+        self.assertEqual(1, entry.num_reqs_per_sec[int(start_time)])
+        self.assertEqual(1, entry.num_fail_per_sec[int(start_time)])
+        self.assertEqual(start_time, entry.last_request_timestamp)
+        runner.quit()
+
+    def test_batch_request_events(self):
+        class MyUser(User):
+            wait_time = constant(0)
+
+            @task
+            def t(self):
+                self.environment.events.request.fire(
+                    request_type="GET",
+                    name="/",
+                    response_time=1,
+                    response_length=10,
+                    context={},
+                    exception=None,
+                    start_time=time.time(),
+                )
+                self.environment.events.request.fire(
+                    request_type="GET", name="/", response_time=1, response_length=0, context={}, exception="oops"
+                )
+                sleep(0.01)
+
+        environment = Environment(user_classes=[MyUser])
+        environment.events.request.batch_interval = 10
+        runner = environment.create_local_runner()
+        runner.batch_request_events()
+        runner.start(1, 1, wait=False)
+        runner.spawning_greenlet.join()
+        sleep(0.1)
+        # nothing has been flushed yet
+        self.assertEqual(0, runner.stats.total.num_requests)
+        runner.stop()
+        entry = runner.stats.get("/", "GET")
+        self.assertGreater(entry.num_requests, 2)
+        self.assertEqual(entry.num_requests / 2, entry.num_failures)
+        self.assertEqual(entry.num_requests * 5, entry.total_content_length)
+        self.assertEqual(entry.num_failures, sum(error.occurrences for error in runner.stats.errors.values()))
+        runner.quit()
+
+    def test_batch_request_events_with_coordinated_omission_correction(self):
+        environment = Environment()
+        environment.correct_coordinated_omission = True
+        runner = environment.create_local_runner()
+        runner.batch_request_events()
+        self.assertFalse(runner.request_events_batched)
+        environment.events.request.fire(request_type="GET", name="/", response_time=1, response_length=0)
+        self.assertEqual(1, runner.stats.total.num_requests)
+
     def test_start_event(self):
         class MyUser(User):
             wait_time = constant(2)
@@ -989,6 +1317,118 @@ class TestMasterWorkerRunners(LocustTestCase):
             "For some reason the master node's stats has not come in",
         )
 
+    def test_distributed_integration_run_via_relay(self):
+        """
+        Full integration test that starts a MasterRunner, a RelayRunner and three WorkerRunner instances
+        connected to the relay, and makes sure that the master dispatches users to the individual workers
+        and gets their stats via the relay
+        """
+
+        class TestUser(User):
+            wait_time = constant(0.1)
+
+            @task
+            def incr_stats(self):
+                self.environment.events.request.fire(
+                    request_type="GET",
+                    name="/",
+                    response_time=1337,
+                    response_length=666,
+                    exception=None,
+                    context={},
+                )
+
+        with mock.patch("locust.runners.WORKER_REPORT_INTERVAL", new=0.3):
+            master_env = Environment(user_classes=[TestUser])
+            worker_reports = []
+            master_env.events.worker_report.add_listener(lambda client_id, data: worker_reports.append(client_id))
+            master = master_env.create_master_runner("*", 0)
+            relay_env = Environment(user_classes=[TestUser])
+            relay = relay_env.create_relay_runner("127.0.0.1", master.server.port, "*", 0)
+            workers = []
+            for i in range(3):
+                worker_env = Environment(user_classes=[TestUser])
+                worker: WorkerRunner = worker_env.create_worker_runner("127.0.0.1", relay.server.port)
+                workers.append(worker)
+
+            sleep(0.1)
+            self.assertEqual({worker.client_id for worker in workers}, set(master.clients.keys()))
+            self.assertEqual(set(master.clients.keys()), set(relay.workers.keys()))
+            master.start(6, spawn_rate=1000)
+            sleep(0.1)
+            for worker in workers:
+                self.assertEqual(2, worker.user_count)
+            sleep(1)
+            self.assertEqual(6, relay.user_count)
+            self.assertEqual(6, master.user_count)
+            self.assertEqual({relay.client_id}, set(worker_reports))
+            master.quit()
+
+            for worker in workers:
+                self.assertEqual(0, worker.user_count)
+                # this is what happens when the worker process shuts down
+                worker.environment.events.quitting.fire(environment=worker.environment)
+            sleep(0.1)
+            # the relay shuts down once all of its workers have quit
+            self.assertEqual(0, len(relay.greenlet))
+
+        self.assertGreater(master_env.runner.stats.total.num_requests, 20)
+        self.assertEqual(
+            master_env.runner.stats.total.num_requests, master_env.runner.stats.get("/", "GET").num_requests
+        )
+
+    def test_distributed_relay_reconnects_to_restarted_master(self):
+        """
+        A master that is restarted behind a relay doesn't know the entry ids that the relay announced
+        to the previous master, so it has to make the relay register and announce its entry names again
+        """
+
+        class TestUser(User):
+            wait_time = constant(0.1)
+
+            @task
+            def noop(self):
+                pass
+
+        def log_request(env):
+            env.events.request.fire(
+                request_type="GET",
+                name="/",
+                response_time=1337,
+                response_length=666,
+                exception=None,
+                context={},
+            )
+
+        with mock.patch("locust.runners.WORKER_REPORT_INTERVAL", new=0.3):
+            master_env = Environment(user_classes=[TestUser])
+            master = master_env.create_master_runner("*", 0)
+            port = master.server.port
+            relay = Environment(user_classes=[TestUser]).create_relay_runner("127.0.0.1", port, "*", 0)
+            worker_env = Environment(user_classes=[TestUser])
+            worker_env.create_worker_runner("127.0.0.1", relay.server.port)
+            sleep(0.1)
+            log_request(worker_env)
+            sleep(0.8)
+            self.assertEqual(1, master.stats.get("/", "GET").num_requests)
+
+            # the master process dies and a new one is started on the same port
+            master.greenlet.kill(block=True)
+            master.server.close(linger=0)
+            new_master_env = Environment(user_classes=[TestUser])
+            new_master = new_master_env.create_master_runner("*", port)
+            sleep(0.1)
+            # the first report refers to an entry id that the new master doesn't know
+            log_request(worker_env)
+            sleep(0.8)
+            log_request(worker_env)
+            sleep(0.8)
+            # the relay has reconnected and announced its entries again, so the second request is counted
+            self.assertEqual(1, new_master.stats.get("/", "GET").num_requests)
+
+            relay.quit()
+            new_master.quit()
+
     def test_distributed_rebalanced_integration_run(self):
         """
         Full integration test that starts both a MasterRunner and three WorkerRunner instances
@@ -2362,6 +2802,53 @@ class TestMasterRunner(LocustRunnerTestCase):
             self.assertEqual(0, s2.median_response_time)
             self.assertEqual(0, s2.avg_response_time)
 
+    def test_worker_delta_stats_report(self):
+        with mock.patch("locust.rpc.rpc.Server", mocked_rpc()) as server:
+            master = self.get_runner()
+            server.mocked_send(Message("client_ready", __version__, "fake_client"))
+            ack = server.get_messages("ack")[-1].data
+            self.assertEqual(StatsReportCodec.version, ack["stats_delta"])
+            self.assertEqual({"version": COMPACT_FORMAT_VERSION, "compression": None}, ack["compact_format"])
+
+            worker_stats = RequestStats(use_response_times_cache=False)
+            codec = StatsReportCodec(worker_stats)
+            codec.delta_enabled = True
+
+            def send_report():
+                data = {"user_count": 1, "user_classes_count": {}, "errors": {}}
+                codec.encode(data)
+                server.mocked_send(Message("stats", data, "fake_client"))
+                return data
+
+            worker_stats.log_request("GET", "/a", 100, 10)
+            worker_stats.log_request("GET", "/a", 800, 10)
+            worker_stats.log_request("POST", "/b", 300, 20)
+            data = send_report()
+            self.assertNotIn("stats", data)
+            self.assertEqual({0: ["/a", "GET"], 1: ["/b", "POST"]}, data["stats_delta"]["names"])
+
+            # only changed entries are sent, and names are only sent once
+            worker_stats.log_request("GET", "/a", 700, 10)
+            data = send_report()
+            self.assertEqual({}, data["stats_delta"]["names"])
+            self.assertEqual(1, len(data["stats_delta"]["entries"]))
+
+            a = master.stats.get("/a", "GET")
+            self.assertEqual(3, a.num_requests)
+            self.assertEqual(30, a.total_content_length)
+            self.assertEqual(700, a.median_response_time)
+            self.assertEqual(1, master.stats.get("/b", "POST").num_requests)
+            self.assertEqual(4, master.stats.total.num_requests)
+            self.assertEqual(800, master.stats.total.max_response_time)
+
+            # after reconnecting, the master has forgotten the ids, so names are announced again
+            codec.reset_announced_names()
+            server.mocked_send(Message("client_ready", __version__, "fake_client"))
+            worker_stats.log_request("GET", "/a", 10, 10)
+            data = send_report()
+            self.assertEqual({0: ["/a", "GET"]}, data["stats_delta"]["names"])
+            self.assertEqual(4, a.num_requests)
+
     def test_master_marks_downed_workers_as_missing(self):
         with mock.patch("locust.rpc.rpc.Server", mocked_rpc()) as server:
             master = self.get_runner()
@@ -2916,6 +3403,125 @@ class TestMasterRunner(LocustRunnerTestCase):
             num_users = sum(sum(msg.data["user_classes_count"].values()) for msg in server.get_messages("spawn"))
             self.assertEqual(7, num_users)
 
+    def test_arrival_rate_is_split_between_workers(self):
+        class TestUser(User):
+            @task
+            def my_task(self):
+                pass
+
+        with mock.patch("locust.rpc.rpc.Server", mocked_rpc()) as server:
+            master = self.get_runner(user_classes=[TestUser])
+            for i in range(4):
+                server.mocked_send(Message("client_ready", __version__, "fake_client%i" % i))
+
+            master.set_arrival_rate(100)
+            self.assertEqual([25.0] * 4, [msg.data["rate"] for msg in server.get_messages("arrival_rate")])
+            master.start(8, 8)
+            self.assertEqual([25.0] * 4, [msg.data["arrival_rate"] for msg in server.get_messages("spawn")])
+
+            for i in range(2):
+                server.mocked_send(
+                    Message(
+                        "stats",
+                        {
+                            "stats": [],
+                            "stats_total": RequestStats().total.serialize(),
+                            "errors": {},
+                            "user_classes_count": {"TestUser": 2},
+                            "user_count": 2,
+                            "dropped_iterations": 3,
+                            "late_iterations": 1,
+                        },
+                        "fake_client%i" % i,
+                    )
+                )
+            self.assertEqual(6, master.dropped_iterations)
+            self.assertEqual(2, master.late_iterations)
+
+    def test_worker_listener_timings(self):
+        class TestUser(User):
+            @task
+            def my_task(self):
+                pass
+
+        with mock.patch("locust.rpc.rpc.Server", mocked_rpc()) as server:
+            master = self.get_runner(user_classes=[TestUser])
+            for i in range(2):
+                server.mocked_send(Message("client_ready", __version__, "fake_client%i" % i))
+                server.mocked_send(
+                    Message(
+                        "stats",
+                        {
+                            "stats": [],
+                            "stats_total": RequestStats().total.serialize(),
+                            "errors": {},
+                            "user_classes_count": {"TestUser": 0},
+                            "user_count": 0,
+                            "listener_timings": [
+                                {
+                                    "event": "request",
+                                    "listener": "locustfile.on_request",
+                                    "calls": 10,
+                                    "total_time": 5.0,
+                                    "avg_time": 0.5,
+                                    "max_time": 2.0 + i,
+                                }
+                            ],
+                        },
+                        "fake_client%i" % i,
+                    )
+                )
+            self.assertEqual(
+                [
+                    {
+                        "event": "request",
+                        "listener": "locustfile.on_request",
+                        "calls": 20,
+                        "total_time": 10.0,
+                        "avg_time": 0.5,
+                        "max_time": 3.0,
+                    }
+                ],
+                # the master times its own listeners too, once a worker has reported listener timings
+                [t for t in master.environment.events.get_listener_timings() if t["event"] == "request"],
+            )
+
+    def test_worker_hub_lag(self):
+        class TestUser(User):
+            @task
+            def my_task(self):
+                pass
+
+        with mock.patch("locust.rpc.rpc.Server", mocked_rpc()) as server:
+            master = self.get_runner(user_classes=[TestUser])
+            server.mocked_send(Message("client_ready", __version__, "fake_client0"))
+            server.mocked_send(Message("client_ready", __version__, "fake_client1"))
+            for i, hub_lag in enumerate([{1: 98, 200: 2}, {1: 100}]):
+                server.mocked_send(
+                    Message(
+                        "stats",
+                        {
+                            "stats": [],
+                            "stats_total": RequestStats().total.serialize(),
+                            "errors": {},
+                            "user_classes_count": {"TestUser": 0},
+                            "user_count": 0,
+                            "hub_lag": hub_lag,
+                        },
+                        "fake_client%i" % i,
+                    )
+                )
+            self.assertEqual(200, master.clients["fake_client0"].hub_lag.percentile(100, 0.99))
+            self.assertEqual(1, master.clients["fake_client1"].hub_lag.percentile(100, 0.99))
+            self.assertEqual({1: 198, 200: 2}, master.stats.hub_lag)
+
+            # the hub lag of each worker is reset along with the stats, and when a new test is started
+            master.environment.events.reset_stats.fire()
+            self.assertEqual({}, master.clients["fake_client0"].hub_lag)
+            master.clients["fake_client1"].hub_lag.log(200)
+            master.start(1, spawn_rate=1)
+            self.assertEqual({}, master.clients["fake_client1"].hub_lag)
+
     def test_spawn_fewer_locusts_than_workers(self):
         class TestUser(User):
             @task
@@ -3524,6 +4130,83 @@ class TestWorkerRunner(LocustTestCase):
             # check that locust user did not get to finish
             self.assertEqual(1, MyTestUser._test_state)
 
+    def test_worker_arrival_rate(self):
+        class MyTestUser(User):
+            wait_time = constant(100)
+            iterations = 0
+
+            @task
+            def the_task(self):
+                MyTestUser.iterations += 1
+
+        with mock.patch("locust.rpc.rpc.Client", mocked_rpc()) as client:
+            environment = Environment()
+            worker = self.get_runner(environment=environment, user_classes=[MyTestUser], client=client)
+            client.mocked_send(
+                Message(
+                    "spawn",
+                    {
+                        "timestamp": 1605538584,
+                        "user_classes_count": {"MyTestUser": 2},
+                        "host": "",
+                        "stop_timeout": None,
+                        "parsed_options": {},
+                        "arrival_rate": 10,
+                    },
+                    "dummy_client_id",
+                )
+            )
+            worker.spawning_greenlet.join()
+            self.assertEqual(10, environment.arrival_rate_scheduler.rate)
+            client.mocked_send(Message("arrival_rate", {"rate": 20}, "dummy_client_id"))
+            self.assertEqual(20, environment.arrival_rate_scheduler.rate)
+            gevent.sleep(0.5)
+            self.assertTrue(8 <= MyTestUser.iterations <= 12, MyTestUser.iterations)
+
+            data: dict = {}
+            environment.events.report_to_master.fire(client_id=worker.client_id, data=data)
+            self.assertEqual(0, data["dropped_iterations"])
+            self.assertEqual(0, data["late_iterations"])
+            worker.quit()
+
+    def test_worker_reports_listener_timings(self):
+        class MyTestUser(User):
+            @task
+            def the_task(self):
+                self.environment.events.request.fire(
+                    request_type="GET", name="/", response_time=1, response_length=0, context={}, exception=None
+                )
+                raise StopUser()
+
+        with mock.patch("locust.rpc.rpc.Client", mocked_rpc()) as client:
+            environment = Environment()
+            worker = self.get_runner(environment=environment, user_classes=[MyTestUser], client=client)
+            self.assertFalse(environment.events.listener_timing_enabled)
+            client.mocked_send(
+                Message(
+                    "spawn",
+                    {
+                        "timestamp": 1605538584,
+                        "user_classes_count": {"MyTestUser": 1},
+                        "host": "",
+                        "stop_timeout": None,
+                        "parsed_options": {"event_listener_timing": True},
+                    },
+                    "dummy_client_id",
+                )
+            )
+            worker.spawning_greenlet.join()
+            gevent.sleep(0.1)
+
+            data: dict = {}
+            environment.events.report_to_master.fire(client_id=worker.client_id, data=data)
+            self.assertIn("request", {timing["event"] for timing in data["listener_timings"]})
+            # only the timings since the last report are sent
+            data = {}
+            environment.events.report_to_master.fire(client_id=worker.client_id, data=data)
+            self.assertNotIn("request", {timing["event"] for timing in data["listener_timings"]})
+            worker.quit()
+
     def test_spawn_message_with_older_timestamp_is_rejected(self):
         class MyUser(User):
             wait_time = constant(1)
@@ -4113,6 +4796,35 @@ class TestWorkerRunner(LocustTestCase):
                         )
                     self.assertEqual(2, len(client.outbox))
 
+    def test_worker_sends_delta_stats_only_if_master_supports_it(self):
+        with mock.patch("locust.rpc.rpc.Client", mocked_rpc()) as client:
+            worker = self.get_runner(environment=Environment(), client=client)
+            worker.stats.log_request("GET", "/", 100, 10)
+            worker._send_stats()
+            self.assertIn("stats", client.get_messages("stats")[-1].data)
+            self.assertFalse(worker.client.compact)
+
+        with mock.patch("locust.rpc.rpc.Client", mocked_rpc()) as client:
+            client.mocked_send(
+                Message(
+                    "ack",
+                    {
+                        "index": 0,
+                        "stats_delta": StatsReportCodec.version,
+                        "compact_format": {"version": COMPACT_FORMAT_VERSION, "compression": "zlib"},
+                    },
+                    "dummy",
+                )
+            )
+            worker = self.get_runner(environment=Environment(), client=client, auto_connect=False)
+            self.assertTrue(worker.client.compact)
+            self.assertEqual("zlib", worker.client.compression)
+            worker.stats.log_request("GET", "/", 100, 10)
+            worker._send_stats()
+            data = client.get_messages("stats")[-1].data
+            self.assertNotIn("stats", data)
+            self.assertEqual({0: ["/", "GET"]}, data["stats_delta"]["names"])
+
     def test_send_logs(self):
         class MyUser(User):
             wait_time = constant(1)
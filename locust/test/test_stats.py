@@ -6,11 +6,14 @@ from locust.stats import (
     PERCENTILES_TO_REPORT,
     STATS_NAME_WIDTH,
     STATS_TYPE_WIDTH,
-    CachedResponseTimes,
+    PerSecondCounter,
     RequestStats,
+    ResponseTimeHistogram,
+    ResponseTimesWindow,
     StatsCSVFileWriter,
     StatsEntry,
     StatsError,
+    StatsHistory,
     bucket_response_time,
     diff_response_time_dicts,
     setup_distributed_stats_event_listeners,
@@ -26,6 +29,7 @@ import os
 import re
 import time
 import unittest
+from copy import copy
 from io import StringIO
 from unittest import mock
 
@@ -411,6 +415,186 @@ class TestRequestStats(unittest.TestCase):
         self.assertEqual(merged.first_seen, 90.0)
         self.assertEqual(merged.last_seen, 120.0)
 
+    def test_report_to_master_includes_batched_requests(self):
+        worker_stats = RequestStats()
+        env = Environment()
+        setup_distributed_stats_event_listeners(env.events, worker_stats)
+        env.events.request.add_batch_listener(
+            lambda requests: [worker_stats.log_request(r["request_type"], r["name"], 100, 0) for r in requests]
+        )
+        env.events.request.fire(request_type="GET", name="/", response_time=100, response_length=0)
+        self.assertEqual(0, worker_stats.total.num_requests)
+
+        data = {}
+        env.events.report_to_master.fire(client_id="a", data=data)
+        self.assertEqual(1, data["stats_total"]["num_requests"])
+
+    def test_max_request_names(self):
+        stats = RequestStats(max_request_names=5)
+        for i in range(5):
+            stats.log_request("GET", f"/static/{i}", 10, 0)
+        with self.assertLogs("locust.stats", "WARNING") as logs:
+            for i in range(100):
+                stats.log_request("GET", f"/item/{i}", 10, 0)
+                stats.log_request("GET", f"/other/name{i}", 10, 0)
+            stats.log_error("GET", "/item/1000", Exception("fail"))
+        self.assertEqual(7, len(stats.entries))
+        self.assertEqual(100, stats.get("/item/{number}", "GET").num_requests)
+        self.assertEqual(1, stats.get("/item/{number}", "GET").num_failures)
+        self.assertEqual(100, stats.get(locust.stats.OTHER_REQUEST_NAME, "GET").num_requests)
+        self.assertEqual(100, stats.get("/item/12345", "GET").num_requests)
+        # errors are grouped the same way
+        self.assertEqual(["/item/{number}"], [error.name for error in stats.errors.values()])
+        # one warning per new entry, that includes the name that caused it
+        self.assertEqual(2, len(logs.output))
+        self.assertIn("'/item/0'", logs.output[0])
+        self.assertIn("'/item/{number}'", logs.output[0])
+        self.assertIn("'/other/name0'", logs.output[1])
+
+        stats.clear_all()
+        stats.log_request("GET", "/item/1", 10, 0)
+        self.assertEqual([("/item/1", "GET")], list(stats.entries))
+
+    def test_max_request_names_template_limit(self):
+        stats = RequestStats(max_request_names=1)
+        stats.log_request("GET", "/first", 10, 0)
+        with self.assertLogs("locust.stats", "WARNING"):
+            for i in range(locust.stats.MAX_TEMPLATE_ENTRIES + 10):
+                stats.log_request("GET", f"/path{i}/1", 10, 0)
+        self.assertEqual(locust.stats.MAX_TEMPLATE_ENTRIES + 2, len(stats.entries))
+        self.assertEqual(10, stats.get(locust.stats.OTHER_REQUEST_NAME, "GET").num_requests)
+
+    def test_no_max_request_names(self):
+        stats = RequestStats(max_request_names=0)
+        for i in range(2000):
+            stats.log_request("GET", f"/item/{i}", 10, 0)
+        self.assertEqual(2000, len(stats.entries))
+
+    def test_max_request_names_on_master(self):
+        worker_stats = RequestStats()
+        for i in range(10):
+            worker_stats.log_request("GET", f"/item/{i}", 10, 0)
+        master_stats = RequestStats(max_request_names=5)
+        worker_events = locust.event.Events()
+        setup_distributed_stats_event_listeners(worker_events, worker_stats)
+        data = {}
+        worker_events.report_to_master.fire(client_id="a", data=data)
+        master_events = locust.event.Events()
+        setup_distributed_stats_event_listeners(master_events, master_stats)
+        with self.assertLogs("locust.stats", "WARNING"):
+            master_events.worker_report.fire(client_id="a", data=data)
+        self.assertEqual(6, len(master_stats.entries))
+        self.assertEqual(5, master_stats.get("/item/{number}", "GET").num_requests)
+        self.assertEqual(10, master_stats.total.num_requests)
+
+    def test_max_request_names_on_master_errors(self):
+        master_stats = RequestStats(max_request_names=5)
+        master_events = locust.event.Events()
+        setup_distributed_stats_event_listeners(master_events, master_stats)
+        with self.assertLogs("locust.stats", "WARNING"):
+            for client_id in ["a", "b"]:
+                worker_stats = RequestStats()
+                for i in range(10):
+                    worker_stats.log_request("GET", f"/item/{i}", 10, 0)
+                    worker_stats.log_error("GET", f"/item/{i}", Exception("fail"))
+                worker_events = locust.event.Events()
+                setup_distributed_stats_event_listeners(worker_events, worker_stats)
+                data = {}
+                worker_events.report_to_master.fire(client_id=client_id, data=data)
+                master_events.worker_report.fire(client_id=client_id, data=data)
+
+        # errors are listed under the same names as the entries the master counted them in
+        self.assertEqual(
+            {(error.name, error.occurrences) for error in master_stats.errors.values()},
+            {(f"/item/{i}", 2) for i in range(5)} | {("/item/{number}", 10)},
+        )
+        entry_names = {entry.name for entry in master_stats.entries.values()}
+        self.assertTrue(all(error.name in entry_names for error in master_stats.errors.values()))
+        grouped = master_stats.errors[StatsError.create_key("GET", "/item/{number}", Exception("fail"))]
+        self.assertEqual(10, grouped.occurrences)
+        self.assertEqual(10, master_stats.get("/item/{number}", "GET").num_failures)
+
+    def test_query_entries(self):
+        stats = RequestStats()
+        for name, response_time, failures in [("/c", 300, 0), ("/a", 100, 2), ("/b", 200, 1), ("/api/d", 10, 0)]:
+            stats.log_request("GET", name, response_time, 0)
+            for _ in range(failures):
+                stats.log_error("GET", name, Exception("fail"))
+        stats.log_request("POST", "/a", 50, 0)
+
+        def names(result):
+            return result[0], [(entry.method, entry.name) for entry in result[1]]
+
+        self.assertEqual(
+            (5, [("GET", "/a"), ("POST", "/a"), ("GET", "/api/d"), ("GET", "/b"), ("GET", "/c")]),
+            names(stats.query_entries()),
+        )
+        self.assertEqual((5, [("GET", "/api/d"), ("GET", "/b")]), names(stats.query_entries(2, 2)))
+        self.assertEqual((5, [("GET", "/c"), ("GET", "/b")]), names(stats.query_entries(0, 2, sort="p95")))
+        self.assertEqual(
+            (5, [("GET", "/a"), ("GET", "/b"), ("POST", "/a")]), names(stats.query_entries(0, 3, sort="failures"))
+        )
+        self.assertEqual((3, [("POST", "/a"), ("GET", "/api/d")]), names(stats.query_entries(1, name_filter="/A")))
+        self.assertRaises(ValueError, stats.query_entries, sort="median")
+
+        # new entries are added to the index
+        stats.log_request("GET", "/0", 400, 0)
+        self.assertEqual((6, [("GET", "/0"), ("GET", "/a")]), names(stats.query_entries(0, 2)))
+        self.assertEqual((6, [("GET", "/0"), ("GET", "/c")]), names(stats.query_entries(0, 2, sort="p95")))
+        stats.clear_all()
+        self.assertEqual((0, []), stats.query_entries())
+
+    def test_query_entries_cached_per_second(self):
+        stats = RequestStats()
+        stats.log_request("GET", "/a", 100, 0)
+        stats.log_request("GET", "/b", 100, 0)
+
+        def names(result):
+            return [entry.name for entry in result[1]]
+
+        with mock.patch.object(locust.stats.time, "time", return_value=1_700_000_000.5):
+            self.assertEqual(["/a", "/b"], names(stats.query_entries(sort="failures")))
+            stats.log_error("GET", "/b", Exception("fail"))
+            # the sorted entries are reused until the second is over
+            self.assertEqual(["/a", "/b"], names(stats.query_entries(sort="failures")))
+            self.assertEqual(["/b"], names(stats.query_entries(1, sort="failures")))
+            # or an entry is added
+            stats.log_request("GET", "/c", 100, 0)
+            self.assertEqual(["/b", "/a", "/c"], names(stats.query_entries(sort="failures")))
+            stats.log_error("GET", "/c", Exception("fail"))
+            stats.log_error("GET", "/c", Exception("fail"))
+        self.assertEqual(["/c", "/b", "/a"], names(stats.query_entries(sort="failures")))
+
+    def test_query_errors(self):
+        stats = RequestStats()
+        stats.log_error("GET", "/b", Exception("fail"))
+        stats.log_error("GET", "/a", Exception("fail"))
+        stats.log_error("GET", "/a", Exception("other"))
+        stats.log_error("GET", "/a", Exception("other"))
+        stats.log_error("GET", "/a", Exception("fail"))
+        stats.log_error("GET", "/a", Exception("other"))
+
+        def errors(result):
+            return result[0], [(error.name, StatsError.parse_error(error.error)) for error in result[1]]
+
+        self.assertEqual(
+            (3, [("/a", "Exception('fail')"), ("/a", "Exception('other')"), ("/b", "Exception('fail')")]),
+            errors(stats.query_errors()),
+        )
+        self.assertEqual((3, [("/a", "Exception('other')")]), errors(stats.query_errors(0, 1, sort="failures")))
+        self.assertEqual((1, [("/b", "Exception('fail')")]), errors(stats.query_errors(name_filter="b")))
+        self.assertEqual(
+            (3, [("/b", "Exception('fail')"), ("/a", "Exception('fail')"), ("/a", "Exception('other')")]),
+            errors(stats.query_errors(sort="insertion")),
+        )
+        self.assertEqual(
+            (2, [("/a", "Exception('other')")]), errors(stats.query_errors(1, sort="insertion", name_filter="a"))
+        )
+        # errors are cleared on workers every time they are reported
+        stats.errors = {}
+        stats.log_error("GET", "/c", Exception("fail"))
+        self.assertEqual((1, [("/c", "Exception('fail')")]), errors(stats.query_errors()))
+
     def test_serialize_through_message(self):
         """
         Serialize a RequestStats instance, then serialize it through a Message,
@@ -597,6 +781,31 @@ class TestCsvStats(LocustTestCase):
         self.assertTrue(saw100, "Never saw 95th percentile increase to 100")
         self.assertTrue(saw10, "Never saw 95th percentile decrease to 10")
 
+    def test_csv_stats_writer_full_history_snapshot(self):
+        stats_writer = StatsCSVFileWriter(
+            self.environment, PERCENTILES_TO_REPORT, self.STATS_BASE_NAME, full_history=True
+        )
+        for i in range(10):
+            self.runner.stats.log_request("GET", "/", 100, content_length=666)
+        live_entry = self.runner.stats.get("/", "GET")
+        live_entry.get_response_time_percentile(0.5)
+
+        with mock.patch.object(StatsEntry, "get_current_response_time_percentile") as get_percentile:
+            snapshot = stats_writer._take_snapshot(time.time())
+        # the current percentiles are left for the writer thread
+        get_percentile.assert_not_called()
+        _, _, changed_entry, _, _, current = snapshot.entries[0]
+        self.assertEqual(10, current[2].total)
+        # and the copy does not share the cached percentiles of the live entry
+        self.assertIsNot(live_entry._snapshot, changed_entry._snapshot)
+
+        stats_writer._write_snapshot(snapshot, flush=True)
+        stats_writer.close_files()
+        with open(self.STATS_HISTORY_FILENAME) as f:
+            rows = list(csv.DictReader(f, fieldnames=stats_writer.stats_history_csv_columns))
+        self.assertEqual(["/", "Aggregated"], [row["Name"] for row in rows])
+        self.assertEqual("100", rows[0]["95%"])
+
     def test_csv_stats_on_master_from_aggregated_stats(self):
         # Failing test for: https://github.com/locustio/locust/issues/1315
         with mock.patch("locust.rpc.rpc.Server", mocked_rpc()) as server:
@@ -702,6 +911,94 @@ class TestCsvStats(LocustTestCase):
                 csv_request_name = rows[0].get("Name")
                 self.assertEqual(request_name_str, csv_request_name)
 
+    @mock.patch("locust.stats.CSV_STATS_INTERVAL_SEC", new=_TEST_CSV_STATS_INTERVAL_SEC)
+    def test_csv_stats_corrected_for_coordinated_omission(self):
+        self.environment.correct_coordinated_omission = True
+        self.runner.stats.log_request("GET", "/", 100, 0, iteration_schedule=(0.5, 0.0))
+        _write_csv_files(self.environment, self.STATS_BASE_NAME)
+
+        with open(self.STATS_FILENAME) as f:
+            reader = csv.DictReader(f)
+            rows = [r for r in reader]
+
+        self.assertEqual("100", rows[0]["50%"])
+        self.assertEqual("600", rows[0]["Corrected 50%"])
+        self.assertEqual("600", rows[1]["Corrected 100%"])
+
+    def test_csv_stats_hub_lag(self):
+        self.runner.stats.log_request("GET", "/", 100, 0, lagged=True)
+        # the runner's own hub lag monitor is logging (mostly zero) lag at the same time
+        for _ in range(10):
+            self.runner.stats.log_hub_lag(50)
+        _write_csv_files(self.environment, self.STATS_BASE_NAME, full_history=True)
+
+        with open(self.STATS_FILENAME) as f:
+            rows = [r for r in csv.DictReader(f)]
+        self.assertEqual("1", rows[0]["Lagged Request Count"])
+        self.assertEqual("1", rows[1]["Lagged Request Count"])
+
+        with open(self.STATS_HISTORY_FILENAME) as f:
+            rows = [r for r in csv.DictReader(f)]
+        self.assertEqual("50", rows[-1]["Hub Lag 99%"])
+        self.assertEqual("50", rows[-1]["Hub Lag Max"])
+
+    def test_csv_stats_without_hub_lag_monitor(self):
+        self.environment.monitor_hub_lag = False
+        self.runner.stats.log_request("GET", "/", 100, 0)
+        _write_csv_files(self.environment, self.STATS_BASE_NAME, full_history=True)
+
+        with open(self.STATS_FILENAME) as f:
+            reader = csv.DictReader(f)
+            rows = [r for r in reader]
+        self.assertNotIn("Lagged Request Count", reader.fieldnames)
+        self.assertEqual("Failures/s", reader.fieldnames[-1 - len(PERCENTILES_TO_REPORT)])
+        self.assertEqual("100", rows[0]["100%"])
+
+        with open(self.STATS_HISTORY_FILENAME) as f:
+            reader = csv.DictReader(f)
+            rows = [r for r in reader]
+        self.assertEqual("Total Average Content Size", reader.fieldnames[-1])
+        self.assertEqual(len(reader.fieldnames), len(rows[-1]))
+        self.assertNotIn(None, rows[-1])
+
+    @mock.patch("locust.stats.CSV_STATS_INTERVAL_SEC", new=0.05)
+    def test_csv_stats_writer_only_formats_changed_entries(self):
+        for i in range(10):
+            self.runner.stats.log_request("GET", f"/{i}", 100, 0)
+        self.runner.stats.log_error("GET", "/0", Exception("fail"))
+        stats_writer = StatsCSVFileWriter(self.environment, PERCENTILES_TO_REPORT, self.STATS_BASE_NAME)
+        with (
+            mock.patch.object(stats_writer, "_format_entry", wraps=stats_writer._format_entry) as format_entry,
+            mock.patch.object(stats_writer, "_rewrite", wraps=stats_writer._rewrite) as rewrite,
+        ):
+            greenlet = gevent.spawn(stats_writer)
+            gevent.sleep(0.12)
+            # all entries and the total, the first time only
+            self.assertEqual(11, format_entry.call_count)
+
+            self.runner.stats.log_request("GET", "/5", 300, 0)
+            gevent.sleep(0.12)
+            gevent.kill(greenlet)
+            stats_writer.close_files()
+        self.assertEqual(13, format_entry.call_count)
+        self.assertEqual(
+            [("/5", "GET"), ("Aggregated", "")],
+            [(entry.name, entry.method) for entry in (call.args[0] for call in format_entry.call_args_list[11:])],
+        )
+        # failures and exceptions haven't changed since the first time, so they were only written once
+        rewritten_files = [call.args[0] for call in rewrite.call_args_list]
+        self.assertEqual(1, rewritten_files.count(stats_writer.failures_csv_filehandle))
+        self.assertEqual(1, rewritten_files.count(stats_writer.exceptions_csv_filehandle))
+
+        with open(self.STATS_FILENAME) as f:
+            rows = {r["Name"]: r for r in csv.DictReader(f)}
+        self.assertEqual("2", rows["/5"]["Request Count"])
+        self.assertEqual("300", rows["/5"]["Max Response Time"])
+        self.assertEqual("1", rows["/4"]["Request Count"])
+        self.assertEqual("11", rows["Aggregated"]["Request Count"])
+        with open(self.STATS_FAILURES_FILENAME) as f:
+            self.assertEqual(1, len(list(csv.DictReader(f))))
+
     def test_stats_history(self):
         env1 = Environment(events=locust.events, catch_exceptions=False)
         runner1 = env1.create_master_runner("127.0.0.1", 5558)
@@ -726,20 +1023,10 @@ class TestStatsEntryResponseTimesCache(unittest.TestCase):
 
     def test_response_times_cached(self):
         s = StatsEntry(self.stats, "/", "GET", use_response_times_cache=True)
-        self.assertEqual(1, len(s.response_times_cache))
+        self.assertIsInstance(s.response_times_cache, ResponseTimesWindow)
         s.log(11, 1337)
-        self.assertEqual(1, len(s.response_times_cache))
-        s.last_request_timestamp -= 1
         s.log(666, 1337)
-        self.assertEqual(2, len(s.response_times_cache))
-        self.assertEqual(
-            CachedResponseTimes(
-                response_times={11: 1},
-                num_requests=1,
-                num_none_requests=0,
-            ),
-            s.response_times_cache[int(s.last_request_timestamp) - 1],
-        )
+        self.assertEqual({11: 1, 670: 1}, s.response_times_cache.get_response_times(int(time.time())))
 
     def test_response_times_not_cached_if_not_enabled(self):
         s = StatsEntry(self.stats, "/", "GET")
@@ -749,56 +1036,62 @@ class TestStatsEntryResponseTimesCache(unittest.TestCase):
         s.log(666, 1337)
         self.assertEqual(None, s.response_times_cache)
 
-    def test_latest_total_response_times_pruned(self):
-        """
-        Check that RequestStats.latest_total_response_times are pruned when exceeding 20 entries
-        """
-        s = StatsEntry(self.stats, "/", "GET", use_response_times_cache=True)
-        t = int(time.time())
-        for i in reversed(range(2, 30)):
-            s.response_times_cache[t - i] = CachedResponseTimes(response_times={}, num_requests=0, num_none_requests=0)
-        self.assertEqual(29, len(s.response_times_cache))
-        s.log(17, 1337)
-        s.last_request_timestamp -= 1
-        s.log(1, 1)
-        self.assertEqual(20, len(s.response_times_cache))
-        self.assertEqual(
-            CachedResponseTimes(response_times={17: 1}, num_requests=1, num_none_requests=0),
-            s.response_times_cache.popitem(last=True)[1],
-        )
+    def test_response_times_window_expires_old_seconds(self):
+        window = ResponseTimesWindow(size=10)
+        window.log(100, 17)
+        window.log(101, 1)
+        window.log(101, 2)
+        window.log(105, 3)
+        self.assertEqual({1: 1, 2: 1, 3: 1, 17: 1}, window.get_response_times(105))
+        self.assertEqual({1: 1, 2: 1, 3: 1, 17: 1}, window.get_response_times(109))
+        self.assertEqual({1: 1, 2: 1, 3: 1}, window.get_response_times(110))
+        self.assertEqual({3: 1}, window.get_response_times(111))
+        window.log(111, 4)
+        self.assertEqual({3: 1, 4: 1}, window.get_response_times(114))
+        self.assertEqual({}, window.get_response_times(130))
+        window.log(130, 5)
+        self.assertEqual({5: 1}, window.get_response_times(130))
+
+    def test_response_times_window_memory_is_fixed(self):
+        window = ResponseTimesWindow(size=10)
+        for t in range(1000):
+            window.log(t, t % 50)
+        self.assertEqual(10, len(window._slots))
+        self.assertEqual(10, window.get_response_times(999).total)
 
     def test_get_current_response_time_percentile(self):
         s = StatsEntry(self.stats, "/", "GET", use_response_times_cache=True)
         t = int(time.time())
-        s.response_times_cache[t - 10] = CachedResponseTimes(
-            response_times={i: 1 for i in range(100)}, num_requests=200, num_none_requests=0
-        )
-        s.response_times_cache[t - 10].response_times[1] = 201
-
-        s.response_times = {i: 2 for i in range(100)}
-        s.response_times[1] = 202
-        s.num_requests = 300
+        # these requests are outside of the window
+        s.response_times_cache.extend(t - 20, {1: 200})
+        s.response_times_cache.extend(t - 2, {i: 1 for i in range(50)})
+        s.response_times_cache.extend(t - 1, {i: 1 for i in range(50, 100)})
 
         self.assertEqual(95, s.get_current_response_time_percentile(0.95))
 
     def test_get_current_response_time_percentile_with_none_response_times(self):
         s = StatsEntry(self.stats, "/", "GET", use_response_times_cache=True)
-        t = int(time.time())
-        s.response_times_cache[t - 10] = CachedResponseTimes(
-            response_times={i: 1 for i in range(100)}, num_requests=200, num_none_requests=100
-        )
-
-        s.response_times = {i: 2 for i in range(100)}
-        s.num_requests = 400
-        s.num_none_requests = 200
+        for i in range(100):
+            s.log(i, 0)
+            s.log(None, 0)
 
         self.assertEqual(95, s.get_current_response_time_percentile(0.95))
 
+    def test_get_current_response_time_percentile_without_requests(self):
+        s = StatsEntry(self.stats, "/", "GET", use_response_times_cache=True)
+        self.assertEqual(0, s.get_current_response_time_percentile(0.95))
+
     def test_get_current_response_time_percentile_outside_cache_window(self):
         s = StatsEntry(self.stats, "/", "GET", use_response_times_cache=True)
-        # an empty response times cache, current time will not be in this cache
-        s.response_times_cache = {}
-        self.assertEqual(None, s.get_current_response_time_percentile(0.95))
+        t = int(time.time())
+        # all requests are older than the window
+        s.response_times_cache.extend(t - 20, {i: 1 for i in range(100)})
+        self.assertEqual(0, s.get_current_response_time_percentile(0.95))
+
+    def test_get_current_response_time_percentile_not_enabled(self):
+        s = StatsEntry(self.stats, "/", "GET")
+        with self.assertRaises(ValueError):
+            s.get_current_response_time_percentile(0.95)
 
     def test_diff_response_times_dicts(self):
         self.assertEqual(
@@ -854,6 +1147,33 @@ class TestStatsEntry(unittest.TestCase):
         super().setUp(*args, **kwargs)
         self.stats = RequestStats()
 
+    def test_derived_metrics_are_memoized(self):
+        s = StatsEntry(self.stats, "/", "GET", use_response_times_cache=True)
+        self.stats.total = s
+        with mock.patch("locust.stats.time.time", return_value=1_700_000_000.5) as mocked_time:
+            for response_time in range(100):
+                s.log(response_time, 0)
+            with mock.patch(
+                "locust.stats.calculate_response_time_percentile", wraps=locust.stats.calculate_response_time_percentile
+            ) as percentile:
+                first = s.to_dict()
+                self.assertEqual(first, s.to_dict())
+                self.assertEqual(first["median_response_time"], s.median_response_time)
+                s.get_response_time_percentile(0.95)
+                # the percentiles in to_dict, only once
+                self.assertEqual(len(locust.stats.PERCENTILES_TO_STATISTICS), percentile.call_count)
+
+                s.log(1000, 0)
+                self.assertEqual(101, s.to_dict()["num_requests"])
+                self.assertEqual(2 * len(locust.stats.PERCENTILES_TO_STATISTICS), percentile.call_count)
+
+                mocked_time.return_value += 1
+                s.to_dict()
+                self.assertEqual(3 * len(locust.stats.PERCENTILES_TO_STATISTICS), percentile.call_count)
+        # callers get their own copy
+        first["num_requests"] = 0
+        self.assertEqual(101, s.to_dict()["num_requests"])
+
     def test_fail_ratio_with_no_failures(self):
         REQUEST_COUNT = 10
         FAILURE_COUNT = 0
@@ -899,6 +1219,84 @@ class TestStatsEntry(unittest.TestCase):
         self.assertEqual(output_fields["failure_count"], FAILURE_COUNT)
         self.assertAlmostEqual(output_fields["failure_percentage"], EXPECTED_FAIL_RATIO * 100)
 
+    def test_log_corrected_response_time_adds_schedule_lag(self):
+        s = StatsEntry(self.stats, "/", "GET")
+        s.log_corrected_response_time(100, schedule_lag=0.25)
+        self.assertEqual({350: 1}, s.corrected_response_times)
+        self.assertEqual(350, s.get_corrected_response_time_percentile(0.5))
+
+    def test_log_corrected_response_time_backfills_missed_iterations(self):
+        s = StatsEntry(self.stats, "/", "GET")
+        # a 1000ms response with an iteration every 300ms hides requests that would have taken (at least) 700 and 400ms
+        s.log_corrected_response_time(1000, expected_interval=0.3)
+        self.assertEqual({1000: 1, 700: 1, 400: 1}, s.corrected_response_times)
+        s.log_corrected_response_time(100, expected_interval=0.3)
+        self.assertEqual(4, s.corrected_response_times.total)
+
+    def test_log_corrected_response_time_backfills_long_stall(self):
+        def backfilled_one_by_one(response_time, interval):
+            histogram = ResponseTimeHistogram()
+            histogram.log(response_time)
+            for k in range(int(response_time // interval) - 1):
+                histogram.log(response_time - interval - k * interval)
+            return histogram
+
+        # a 60 second stall with an expected interval of 10ms means 5999 missed requests
+        s = StatsEntry(self.stats, "/", "GET")
+        s.log_corrected_response_time(60000, expected_interval=0.01)
+        self.assertEqual(6000, s.corrected_response_times.total)
+        self.assertEqual(backfilled_one_by_one(60000, 10), s.corrected_response_times)
+        for response_time, interval in [(123456, 7), (99999, 0.3), (1005, 2.5), (550, 100), (101, 1)]:
+            s = StatsEntry(self.stats, "/", "GET")
+            s.log_corrected_response_time(response_time, expected_interval=interval / 1000)
+            self.assertEqual(backfilled_one_by_one(response_time, interval), s.corrected_response_times)
+
+        with mock.patch("locust.stats.bucket_response_time", new=lambda response_time: int(response_time) // 7 * 7):
+            s = StatsEntry(self.stats, "/", "GET")
+            s.log_corrected_response_time(5000, expected_interval=0.003)
+            self.assertEqual(backfilled_one_by_one(5000, 3), s.corrected_response_times)
+
+    def test_corrected_response_times_are_serialized(self):
+        self.stats.log_request("GET", "/", 100, 0, iteration_schedule=(1.0, 0.0))
+        self.stats.log_request("GET", "/", 100, 0)
+        entry = self.stats.get("/", "GET")
+        self.assertEqual(2, entry.num_requests)
+        self.assertEqual({1100: 1}, entry.corrected_response_times)
+        self.assertEqual({1100: 1}, self.stats.total.corrected_response_times)
+        self.assertEqual(1100, entry.to_dict()["corrected_response_time_percentile_0.95"])
+
+        unserialized = StatsEntry.unserialize(entry.serialize(), self.stats)
+        self.assertEqual({1100: 1}, unserialized.corrected_response_times)
+        merged = StatsEntry(self.stats, "/", "GET")
+        merged.extend(unserialized)
+        merged._extend(*entry.get_stripped_delta_row())
+        self.assertEqual({1100: 2}, merged.corrected_response_times)
+        self.assertEqual({}, entry.corrected_response_times)
+
+    def test_uncorrected_stats_have_no_corrected_percentiles(self):
+        self.stats.log_request("GET", "/", 100, 0)
+        entry = self.stats.get("/", "GET")
+        self.assertNotIn("corrected_response_time_percentile_0.95", entry.to_dict())
+        self.assertEqual(12, len(entry.get_stripped_delta_row()))
+
+    def test_lagged_requests_are_merged(self):
+        self.stats.log_request("GET", "/", 100, 0, lagged=True)
+        self.stats.log_request("GET", "/", 100, 0)
+        entry = self.stats.get("/", "GET")
+        self.assertEqual(1, entry.num_lagged_requests)
+        self.assertEqual(1, self.stats.total.num_lagged_requests)
+        self.assertEqual(1, entry.to_dict()["num_lagged_requests"])
+
+        merged = StatsEntry(self.stats, "/", "GET")
+        merged.extend(StatsEntry.unserialize(entry.serialize(), self.stats))
+        self.assertEqual(1, merged.num_lagged_requests)
+        row = entry.get_stripped_delta_row()
+        # the (empty) corrected response times are sent to keep the lagged count in its position
+        self.assertEqual(14, len(row))
+        merged._extend(*row)
+        self.assertEqual(2, merged.num_lagged_requests)
+        self.assertEqual({}, merged.corrected_response_times)
+
 
 class TestRequestStatsWithWebserver(WebserverTestCase):
     def setUp(self):
@@ -1041,3 +1439,231 @@ class TestBucketResponseTime(unittest.TestCase):
             self.assertNotIn(150, s.response_times)
         finally:
             locust.stats.bucket_response_time = original
+
+
+class TestPerSecondCounter(unittest.TestCase):
+    def test_window(self):
+        counter = PerSecondCounter()
+        for second in range(1000, 1030):
+            counter.add(second, second - 999)
+        counter.add(1029)
+        # only the last PER_SECOND_WINDOW seconds are kept per second
+        self.assertEqual(list(range(1010, 1030)), list(counter))
+        self.assertEqual(31, counter[1029])
+        self.assertEqual(0, counter.get(1009, 0))
+        self.assertRaises(KeyError, lambda: counter[1030])
+
+    def test_long_term(self):
+        counter = PerSecondCounter()
+        for second in range(1000, 1030):
+            counter.add(second, 1)
+        # a late report for a second that has already left the window
+        counter.add(1002, 5)
+        self.assertEqual({1000: 15, 1010: 10, 1020: 10}, counter.long_term())
+        # the seconds that have left the window are kept apart from the ones in it
+        self.assertEqual({second: 1 for second in range(1010, 1030)}, counter.to_dict())
+        self.assertEqual({1000: 15}, counter.long_term_buckets())
+        self.assertEqual({1000: 15}, counter.long_term_buckets(20))
+        rebuilt = PerSecondCounter(counter.to_dict(), counter.long_term_buckets(), counter.resolution)
+        self.assertEqual(counter.to_dict(), rebuilt.to_dict())
+        self.assertEqual(counter.long_term(), rebuilt.long_term())
+
+    def test_add_long_term(self):
+        counter = PerSecondCounter()
+        counter.add_long_term({1000: 5, 1010: 5}, 10)
+        # buckets that are longer than the counter's make it downsample its own
+        counter.add_long_term({1020: 7}, 20)
+        self.assertEqual(20, counter.resolution)
+        self.assertEqual({1000: 10, 1020: 7}, counter.long_term_buckets())
+        self.assertEqual({}, counter.to_dict())
+
+    def test_size_is_bounded(self):
+        counter = PerSecondCounter()
+        # a day
+        for second in range(0, 86400, 3):
+            counter.add(second, 3)
+        long_term = counter.long_term()
+        self.assertLessEqual(len(long_term), locust.stats.LONG_TERM_BUCKETS)
+        self.assertLessEqual(len(counter.to_dict()), locust.stats.PER_SECOND_WINDOW)
+        self.assertEqual(86400, sum(long_term.values()))
+        self.assertEqual(counter.resolution, min(b - a for a, b in zip(long_term, list(long_term)[1:])))
+
+    def test_current_rps_after_long_run(self):
+        stats = RequestStats()
+        entry = stats.get("/", "GET")
+        for second in range(1_700_000_000, 1_700_010_000):
+            for _ in range(5):
+                stats.log_request("GET", "/", 10, 0, timestamp=second + 0.5)
+        stats.total.start_time = 1_700_000_000
+        self.assertEqual(5, entry.current_rps)
+        self.assertLessEqual(len(stats.total.serialize()["num_reqs_per_sec"]), 400)
+
+    def test_long_term_counts_are_serialized_separately(self):
+        stats = RequestStats()
+        entry = stats.get("/", "GET")
+        for second in range(1000, 1100):
+            for _ in range(10):
+                stats.log_request("GET", "/", 10, 0, timestamp=second + 0.5)
+        data = entry.serialize()
+        # only actual seconds are in num_reqs_per_sec
+        self.assertEqual({second: 10 for second in range(1080, 1100)}, data["num_reqs_per_sec"])
+        self.assertEqual({second: 100 for second in range(1000, 1080, 10)}, data["num_reqs_per_sec_long_term"])
+        self.assertEqual({}, data["num_fail_per_sec_long_term"])
+        self.assertEqual(10, data["long_term_resolution"])
+
+        master_stats = RequestStats()
+        master_entry = master_stats.get("/", "GET")
+        master_entry.extend(StatsEntry.unserialize(data, stats))
+        master_entry._extend(*entry.get_stripped_delta_row())
+        self.assertEqual({second: 20 for second in range(1080, 1100)}, master_entry.num_reqs_per_sec.to_dict())
+        self.assertEqual(
+            {second: 200 for second in range(1000, 1080, 10)}, master_entry.num_reqs_per_sec.long_term_buckets()
+        )
+
+
+class TestStatsHistory(unittest.TestCase):
+    def test_points(self):
+        history = StatsHistory()
+        history.append(1_700_000_000, {"current_rps": 10, "user_count": 5})
+        history.append(1_700_000_005, {"current_rps": 12.5, "user_count": 10})
+        self.assertEqual(2, len(history))
+        self.assertEqual(
+            {
+                "current_rps": ["2023-11-14T22:13:25Z", 12.5],
+                "user_count": ["2023-11-14T22:13:25Z", 10],
+                "time": "2023-11-14T22:13:25Z",
+            },
+            history[-1],
+        )
+        self.assertEqual(1_700_000_005, history.last_timestamp)
+        self.assertEqual([(1_700_000_000, 5, 5, 5), (1_700_000_005, 10, 10, 10)], history.series("user_count"))
+        self.assertEqual([["2023-11-14T22:13:20Z", 11.25]], [p["current_rps"] for p in history.points(1)])
+
+    @mock.patch("locust.stats.HISTORY_RECENT_POINTS", new=10)
+    @mock.patch("locust.stats.HISTORY_ROLLUP_FACTOR", new=4)
+    def test_indexing(self):
+        history = StatsHistory()
+        for i in range(18):
+            history.append(i * 5, {"user_count": i})
+        points = history.points()
+        self.assertEqual(points, list(history))
+        self.assertEqual(points, [history[i] for i in range(len(history))])
+        self.assertEqual(points[-3], history[-3])
+        self.assertEqual(points[1:4], history[1:4])
+        self.assertEqual(points[::-2], history[::-2])
+        with self.assertRaises(IndexError):
+            history[len(history)]
+        with self.assertRaises(IndexError):
+            history[-len(history) - 1]
+
+    def test_append_point(self):
+        history = StatsHistory()
+        with self.assertWarns(DeprecationWarning):
+            history.append(
+                {
+                    "current_rps": ["2023-11-14T22:13:20Z", 10],
+                    "user_count": ["2023-11-14T22:13:20Z", 5],
+                    "time": "2023-11-14T22:13:20Z",
+                }
+            )
+        self.assertEqual(1_700_000_000, history.last_timestamp)
+        self.assertEqual(
+            {
+                "current_rps": ["2023-11-14T22:13:20Z", 10],
+                "user_count": ["2023-11-14T22:13:20Z", 5],
+                "time": "2023-11-14T22:13:20Z",
+            },
+            history[0],
+        )
+
+    @mock.patch("locust.stats.HISTORY_RECENT_POINTS", new=10)
+    @mock.patch("locust.stats.HISTORY_ROLLUP_FACTOR", new=4)
+    @mock.patch("locust.stats.HISTORY_ROLLUP_POINTS", new=6)
+    def test_roll_up(self):
+        history = StatsHistory()
+        for i in range(18):
+            history.append(i * 5, {"user_count": i})
+        # the first 8 points are rolled up into two, and the last 10 are kept as they are
+        self.assertEqual(12, len(history))
+        self.assertEqual([(0, 0, 1.5, 3), (20, 4, 5.5, 7)], history.series("user_count")[:2])
+        self.assertEqual([(i * 5, i, i, i) for i in range(8, 18)], history.series("user_count")[2:])
+
+        for i in range(18, 40):
+            history.append(i * 5, {"user_count": i})
+        # 30 rolled up points didn't fit, so they were merged into points of 8
+        self.assertEqual(8, history.points_per_rollup)
+        self.assertEqual(
+            [(0, 0, 3.5, 7), (40, 8, 11.5, 15), (80, 16, 19.5, 23), (120, 24, 26.5, 29)],
+            history.series("user_count")[:4],
+        )
+        self.assertEqual([(i * 5, i, i, i) for i in range(30, 40)], history.series("user_count")[4:])
+
+    def test_size_is_bounded(self):
+        history = StatsHistory()
+        # a week, at one point every 5 seconds
+        for i in range(0, 7 * 86400, 5):
+            history.append(i, {"current_rps": 100, "user_count": i})
+        self.assertLessEqual(len(history), locust.stats.HISTORY_RECENT_POINTS + locust.stats.HISTORY_ROLLUP_POINTS)
+        # the start of the test is still there, rolled up
+        self.assertEqual((0, 0), history.series("user_count")[0][:2])
+        points = history.points(300)
+        self.assertLessEqual(len(points), 300)
+        self.assertEqual({100}, {point["current_rps"][1] for point in points})
+        self.assertEqual(7 * 86400 - 5, history.last_timestamp)
+
+
+class TestResponseTimeHistogram(unittest.TestCase):
+    def test_log_matches_bucket_response_time(self):
+        histogram = ResponseTimeHistogram()
+        expected: dict[int, int] = {}
+        for response_time in [0, 1.4, 45, 99.9, 147, 999, 3432, 9999, 58760, 99499, 99500, 123456, 1234.5]:
+            histogram.log(response_time)
+            key = bucket_response_time(response_time)
+            expected[key] = expected.get(key, 0) + 1
+        self.assertEqual(expected, histogram.to_dict())
+        self.assertEqual(expected, histogram)
+        self.assertEqual(sorted(expected), list(histogram))
+        self.assertEqual(len(expected), len(histogram))
+        self.assertEqual(13, histogram.total)
+
+    def test_percentile_without_sorting(self):
+        histogram = ResponseTimeHistogram()
+        for response_time in range(100):
+            histogram.log(response_time)
+        histogram.log(200_000)
+        self.assertEqual(50, histogram.percentile(101, 0.5))
+        self.assertEqual(95, histogram.percentile(101, 0.95))
+        self.assertEqual(200_000, histogram.percentile(101, 1.0))
+        self.assertEqual(0, ResponseTimeHistogram().percentile(0, 0.5))
+
+    def test_extend(self):
+        a = ResponseTimeHistogram({10: 1, 150: 2, 250_000: 1})
+        b = ResponseTimeHistogram({10: 2, 9900: 1})
+        a.extend(b)
+        self.assertEqual({10: 3, 150: 2, 9900: 1, 250_000: 1}, a)
+        a.extend({150: 1, 147: 1})
+        self.assertEqual({10: 3, 147: 1, 150: 3, 9900: 1, 250_000: 1}, a)
+        # b is unchanged
+        self.assertEqual({10: 2, 9900: 1}, b)
+
+    def test_copy_is_independent(self):
+        a = ResponseTimeHistogram({10: 1})
+        b = copy(a)
+        b.log(10)
+        self.assertEqual({10: 1}, a)
+        self.assertEqual({10: 2}, b)
+
+    def test_serialized_as_dict(self):
+        s = StatsEntry(RequestStats(), "/", "GET")
+        s.log(147, 0)
+        data = s.serialize()
+        self.assertEqual(dict, type(data["response_times"]))
+        self.assertEqual({150: 1}, data["response_times"])
+        unserialized = StatsEntry.unserialize(data, RequestStats())
+        self.assertIsInstance(unserialized.response_times, ResponseTimeHistogram)
+        self.assertEqual(150, unserialized.get_response_time_percentile(0.5))
+
+    def test_subtract(self):
+        a = ResponseTimeHistogram({10: 3, 150: 2, 250_000: 1})
+        a.subtract(ResponseTimeHistogram({10: 1, 250_000: 1}))
+        self.assertEqual({10: 2, 150: 2}, a)
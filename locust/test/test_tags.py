@@ -1,6 +1,6 @@
 from locust import TaskSet, User, tag, task
 from locust.env import Environment
-from locust.user.task import filter_tasks_by_tags
+from locust.user.task import filter_tasks_by_tags, get_task_weights
 
 from .testcases import LocustTestCase
 
@@ -237,34 +237,25 @@ class TestTags(LocustTestCase):
             MyTaskSet.tasks,
             [
                 MyTaskSet.include_twice,
-                MyTaskSet.include_twice,
-                MyTaskSet.include_3_times,
-                MyTaskSet.include_3_times,
                 MyTaskSet.include_3_times,
                 MyTaskSet.dont_include_4_times,
-                MyTaskSet.dont_include_4_times,
-                MyTaskSet.dont_include_4_times,
-                MyTaskSet.dont_include_4_times,
-                MyTaskSet.dont_include_5_times,
-                MyTaskSet.dont_include_5_times,
-                MyTaskSet.dont_include_5_times,
-                MyTaskSet.dont_include_5_times,
                 MyTaskSet.dont_include_5_times,
             ],
         )
+        self.assertEqual(
+            {
+                MyTaskSet.include_twice: 2,
+                MyTaskSet.include_3_times: 3,
+                MyTaskSet.dont_include_4_times: 4,
+                MyTaskSet.dont_include_5_times: 5,
+            },
+            get_task_weights(MyTaskSet),
+        )
 
         filter_tasks_by_tags(MyTaskSet, tags={"included"})
 
-        self.assertListEqual(
-            MyTaskSet.tasks,
-            [
-                MyTaskSet.include_twice,
-                MyTaskSet.include_twice,
-                MyTaskSet.include_3_times,
-                MyTaskSet.include_3_times,
-                MyTaskSet.include_3_times,
-            ],
-        )
+        self.assertListEqual(MyTaskSet.tasks, [MyTaskSet.include_twice, MyTaskSet.include_3_times])
+        self.assertEqual({MyTaskSet.include_twice: 2, MyTaskSet.include_3_times: 3}, get_task_weights(MyTaskSet))
 
     def test_excluding_tags_with_weights(self):
         class MyTaskSet(TaskSet):
@@ -291,33 +282,26 @@ class TestTags(LocustTestCase):
             MyTaskSet.tasks,
             [
                 MyTaskSet.dont_exclude_twice,
-                MyTaskSet.dont_exclude_twice,
-                MyTaskSet.dont_exclude_3_times,
-                MyTaskSet.dont_exclude_3_times,
                 MyTaskSet.dont_exclude_3_times,
                 MyTaskSet.exclude_4_times,
-                MyTaskSet.exclude_4_times,
-                MyTaskSet.exclude_4_times,
-                MyTaskSet.exclude_4_times,
-                MyTaskSet.exclude_5_times,
-                MyTaskSet.exclude_5_times,
-                MyTaskSet.exclude_5_times,
-                MyTaskSet.exclude_5_times,
                 MyTaskSet.exclude_5_times,
             ],
         )
+        self.assertEqual(
+            {
+                MyTaskSet.dont_exclude_twice: 2,
+                MyTaskSet.dont_exclude_3_times: 3,
+                MyTaskSet.exclude_4_times: 4,
+                MyTaskSet.exclude_5_times: 5,
+            },
+            get_task_weights(MyTaskSet),
+        )
 
         filter_tasks_by_tags(MyTaskSet, exclude_tags={"excluded"})
 
-        self.assertListEqual(
-            MyTaskSet.tasks,
-            [
-                MyTaskSet.dont_exclude_twice,
-                MyTaskSet.dont_exclude_twice,
-                MyTaskSet.dont_exclude_3_times,
-                MyTaskSet.dont_exclude_3_times,
-                MyTaskSet.dont_exclude_3_times,
-            ],
+        self.assertListEqual(MyTaskSet.tasks, [MyTaskSet.dont_exclude_twice, MyTaskSet.dont_exclude_3_times])
+        self.assertEqual(
+            {MyTaskSet.dont_exclude_twice: 2, MyTaskSet.dont_exclude_3_times: 3}, get_task_weights(MyTaskSet)
         )
 
     def test_tagged_tasks_shared_across_tasksets(self):
@@ -0,0 +1,69 @@
+from locust import User, constant, task
+from locust.env import Environment
+from locust.timer_wheel import TimerWheel
+
+import time
+
+import gevent
+
+from .testcases import LocustTestCase
+
+
+class TestTimerWheel(LocustTestCase):
+    def test_sleepers_wake_up_in_order(self):
+        wheel = TimerWheel(tick=0.01, slots=8)
+        woken = []
+
+        def sleeper(seconds):
+            start = time.perf_counter()
+            wheel.sleep(seconds)
+            woken.append((seconds, time.perf_counter() - start))
+
+        # longer than a revolution of the wheel (0.08s) too
+        greenlets = [gevent.spawn(sleeper, seconds) for seconds in [0.2, 0.05, 0.013, 0.1, 0.031]]
+        gevent.sleep(0)
+        self.assertEqual(5, len(wheel))
+        gevent.joinall(greenlets, timeout=1)
+        self.assertEqual([0.013, 0.031, 0.05, 0.1, 0.2], [seconds for seconds, _ in woken])
+        for seconds, slept in woken:
+            self.assertGreaterEqual(slept, seconds)
+            self.assertLess(slept, seconds + 0.02)
+        self.assertEqual(0, len(wheel))
+
+    def test_short_sleep_is_not_added_to_wheel(self):
+        wheel = TimerWheel(tick=0.01)
+        greenlet = gevent.spawn(wheel.sleep, 0.005)
+        gevent.sleep(0)
+        self.assertEqual(0, len(wheel))
+        greenlet.join(timeout=1)
+        self.assertTrue(greenlet.dead)
+
+    def test_killed_sleeper(self):
+        wheel = TimerWheel(tick=0.01)
+        killed = gevent.spawn(wheel.sleep, 0.02)
+        other = gevent.spawn(wheel.sleep, 0.03)
+        gevent.sleep(0)
+        killed.kill()
+        other.join(timeout=1)
+        self.assertTrue(other.dead)
+        self.assertTrue(other.successful())
+
+    def test_users_sleep_on_the_wheel(self):
+        class MyUser(User):
+            wait_time = constant(0.05)
+            task_run_count = 0
+
+            @task
+            def t(self):
+                MyUser.task_run_count += 1
+
+        environment = Environment(user_classes=[MyUser])
+        environment.timer_wheel = TimerWheel()
+        runner = environment.create_local_runner()
+        runner.start(10, 10, wait=False)
+        runner.spawning_greenlet.join()
+        gevent.sleep(0.02)
+        self.assertEqual(10, len(environment.timer_wheel))
+        gevent.sleep(0.2)
+        runner.quit()
+        self.assertGreaterEqual(MyUser.task_run_count, 40)
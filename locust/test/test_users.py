@@ -67,3 +67,16 @@ class TestHttpUserWithWebserver(WebserverTestCase):
 
         self.assertEqual(2, self.connections_count)
         self.assertEqual(4, self.requests_count)
+
+    def test_pool_manager_created_on_first_request(self):
+        class MyUser(HttpUser):
+            host = "http://127.0.0.1:%i" % self.port
+
+        user = MyUser(self.environment)
+        adapter = user.client.get_adapter(MyUser.host)
+        self.assertIs(adapter, user.client.get_adapter("https://127.0.0.1"))
+        self.assertIsNone(adapter._poolmanager)
+
+        user.client.get("/ultra_fast")
+        self.assertIsInstance(adapter._poolmanager, PoolManager)
+        self.assertEqual(1, self.requests_count)
@@ -1,8 +1,10 @@
+from locust.util.alias_table import AliasTable
 from locust.util.rounding import proper_round
 from locust.util.timespan import parse_timespan
-from locust.util.url import is_url
+from locust.util.url import is_url, template_path
 
 import unittest
+from collections import Counter
 
 
 class TestParseTimespan(unittest.TestCase):
@@ -32,6 +34,19 @@ class TestIsUrl(unittest.TestCase):
         self.assertFalse(is_url("http://"))
 
 
+class TestTemplatePath(unittest.TestCase):
+    def test_ids_are_replaced(self):
+        self.assertEqual("/user/{number}/orders", template_path("/user/123/orders"))
+        self.assertEqual("/item?id={number}&page={number}", template_path("/item?id=-5&page=2.5"))
+        self.assertEqual("/a/{uuid}", template_path("/a/550e8400-e29b-41d4-a716-446655440000"))
+        self.assertEqual("/commit/{hex}", template_path("/commit/4db3765a1f"))
+
+    def test_other_parts_are_kept(self):
+        self.assertEqual("/v1/items", template_path("/v1/items"))
+        self.assertEqual("/deadbeef/cafe/abc1", template_path("/deadbeef/cafe/abc1"))
+        self.assertEqual("http://example.com/p/{number}", template_path("http://example.com/p/1"))
+
+
 class TestRounding(unittest.TestCase):
     def test_rounding_down(self):
         self.assertEqual(1, proper_round(1.499999999))
@@ -54,3 +69,37 @@ class TestRounding(unittest.TestCase):
         self.assertEqual(1.0, proper_round(1, 2))
         self.assertEqual(5.0, proper_round(5, 2))
         self.assertEqual(9.0, proper_round(9, 2))
+
+
+class TestAliasTable(unittest.TestCase):
+    def get_probabilities(self, table):
+        # the probability of each item, given that each column is picked with the same probability
+        probabilities = Counter()
+        for i, probability in enumerate(table._probabilities):
+            probabilities[table.items[i]] += probability / len(table._probabilities)
+            probabilities[table.items[table._aliases[i]]] += (1 - probability) / len(table._probabilities)
+        return probabilities
+
+    def test_probabilities_match_weights(self):
+        weights = {"a": 1, "b": 1000, "c": 7, "d": 0, "e": 250_000}
+        table = AliasTable(list(weights), list(weights.values()))
+        total = sum(weights.values())
+        for item, probability in self.get_probabilities(table).items():
+            self.assertAlmostEqual(weights[item] / total, probability, places=12)
+        self.assertEqual(5, len(table))
+
+    def test_pick(self):
+        table = AliasTable(["a", "b", "c"], [3, 0, 1])
+        picks = Counter(table.pick() for _ in range(10_000))
+        self.assertEqual({"a", "c"}, set(picks))
+        self.assertTrue(2.5 < picks["a"] / picks["c"] < 3.5, picks)
+
+    def test_single_item(self):
+        table = AliasTable(["a"], [12])
+        self.assertEqual("a", table.pick())
+
+    def test_no_positive_weights(self):
+        self.assertRaises(IndexError, AliasTable([], []).pick)
+        self.assertRaises(IndexError, AliasTable(["a"], [0]).pick)
+        self.assertRaises(ValueError, AliasTable, ["a"], [-1])
+        self.assertRaises(ValueError, AliasTable, ["a", "b"], [1])
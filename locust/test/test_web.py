@@ -8,7 +8,7 @@ from locust.log import LogReader
 from locust.runners import Runner
 from locust.stats import StatsCSVFileWriter
 from locust.user import User, task
-from locust.web import WebUI
+from locust.web import WebUI, diff_stats_reports
 
 import csv
 import json
@@ -130,6 +130,25 @@ class TestWebUI(LocustTestCase, _HeaderCheckMixin):
         self.assertEqual("Aggregated", data["stats"][1]["name"])
         self.assertEqual(1, data["stats"][1]["num_requests"])
 
+    def test_stats_hub_lag(self):
+        self.stats.log_request("GET", "/", 120, 5612, lagged=True)
+        for _ in range(10):
+            self.stats.log_hub_lag(40)
+        data = requests.get("http://127.0.0.1:%i/stats/requests" % self.web_port).json()
+        self.assertEqual(1, data["stats"][0]["num_lagged_requests"])
+        self.assertEqual(40, data["hub_lag_percentile_99"])
+
+    def test_stats_arrival_rate_iterations(self):
+        data = requests.get("http://127.0.0.1:%i/stats/requests" % self.web_port).json()
+        self.assertNotIn("dropped_iterations", data)
+        self.environment.runner.set_arrival_rate(10)
+        self.environment.arrival_rate_scheduler.dropped_iterations = 3
+        self.environment.arrival_rate_scheduler.late_iterations = 2
+        self.web_ui.app.view_functions["locust.request_stats"].clear_cache()
+        data = requests.get("http://127.0.0.1:%i/stats/requests" % self.web_port).json()
+        self.assertEqual(3, data["dropped_iterations"])
+        self.assertEqual(2, data["late_iterations"])
+
     def test_html_report_uses_total_rps_not_current_rps(self):
         self.stats.log_request("GET", "/test", 100, 1000)
         self.stats.log_request("GET", "/test", 120, 1200)
@@ -183,12 +202,150 @@ class TestWebUI(LocustTestCase, _HeaderCheckMixin):
         response = requests.get("http://127.0.0.1:%i/stats/requests_full_history/csv" % self.web_port)
         self.assertEqual(404, response.status_code)
 
+    def test_stats_history(self):
+        for i in range(10):
+            self.stats.history.append(1_700_000_000 + i * 5, {"current_rps": i, "user_count": 5})
+        response = requests.get("http://127.0.0.1:%i/stats/history?points=2" % self.web_port)
+        self.assertEqual(200, response.status_code)
+        history = response.json()["history"]
+        self.assertEqual(2, len(history))
+        self.assertEqual(["2023-11-14T22:13:20Z", 2], history[0]["current_rps"])
+        self.assertEqual(["2023-11-14T22:13:45Z", 7], history[1]["current_rps"])
+
+        response = requests.get("http://127.0.0.1:%i/stats/history?points=0" % self.web_port)
+        self.assertEqual(400, response.status_code)
+
+    def test_stats_stream(self):
+        self.web_ui.stats_stream.interval = 0.05
+        self.stats.log_request("GET", "/a", 120, 5612)
+        self.stats.log_request("GET", "/b", 120, 5612)
+
+        def read_event(lines):
+            event = {}
+            for line in lines:
+                if not line:
+                    return event
+                field, _, value = line.partition(": ")
+                event[field] = value
+
+        with requests.get("http://127.0.0.1:%i/stats/stream" % self.web_port, stream=True, timeout=5) as response:
+            self.assertEqual(200, response.status_code)
+            self.assertTrue(response.headers["Content-Type"].startswith("text/event-stream"))
+            lines = response.iter_lines(decode_unicode=True)
+            event = read_event(lines)
+            self.assertEqual("snapshot", event["event"])
+            snapshot = json.loads(event["data"])
+            self.assertEqual(["/a", "/b", "Aggregated"], [row["name"] for row in snapshot["stats"]])
+            self.assertEqual(3, snapshot["stats"][-1]["num_requests"] + 1)
+
+            self.stats.log_request("GET", "/a", 300, 5612)
+            self.stats.log_error("GET", "/a", Exception("Error1337"))
+            event = read_event(lines)
+            self.assertEqual("delta", event["event"])
+            delta = json.loads(event["data"])
+            changed = {row["name"]: row for row in delta["stats"]["changed"]}
+            self.assertEqual(2, changed["/a"]["num_requests"])
+            self.assertEqual(3, changed["Aggregated"]["num_requests"])
+            self.assertEqual([], delta["stats"]["removed"])
+            self.assertEqual(["Exception('Error1337')"], [row["error"] for row in delta["errors"]["changed"]])
+            self.assertNotIn("state", delta)
+
+        # the server notices that the viewer is gone when sending it the next updates fails
+        for _ in range(40):
+            if not self.web_ui.stats_stream.viewers:
+                break
+            self.stats.log_request("GET", "/a", 300, 5612)
+            gevent.sleep(0.05)
+        self.assertEqual(0, self.web_ui.stats_stream.viewers)
+        # and then stops building reports, and forgets the last one
+        gevent.sleep(0.1)
+        self.assertEqual(0, self.web_ui.stats_stream.version)
+        self.stats.log_request("GET", "/a", 300, 5612)
+        gevent.sleep(0.2)
+        self.assertEqual(0, self.web_ui.stats_stream.version)
+
+        # so the next viewer gets an up to date snapshot
+        num_requests = self.stats.total.num_requests
+        with requests.get("http://127.0.0.1:%i/stats/stream" % self.web_port, stream=True, timeout=5) as response:
+            event = read_event(response.iter_lines(decode_unicode=True))
+            self.assertEqual("snapshot", event["event"])
+            self.assertEqual(num_requests, json.loads(event["data"])["stats"][-1]["num_requests"])
+
+    def test_diff_stats_reports(self):
+        old = {
+            "stats": [
+                {"method": "GET", "name": "/a", "num_requests": 1},
+                {"method": "GET", "name": "/b", "num_requests": 1},
+            ],
+            "errors": [],
+            "state": "running",
+            "user_count": 1,
+        }
+        new = {
+            "stats": [
+                {"method": "GET", "name": "/b", "num_requests": 2},
+                {"method": "GET", "name": "/c", "num_requests": 1},
+            ],
+            "errors": [],
+            "state": "running",
+            "user_count": 2,
+        }
+        self.assertEqual(
+            {
+                "user_count": 2,
+                "stats": {
+                    "changed": [
+                        {"method": "GET", "name": "/b", "num_requests": 2},
+                        {"method": "GET", "name": "/c", "num_requests": 1},
+                    ],
+                    "removed": [["GET", "/a"]],
+                },
+            },
+            diff_stats_reports(old, new),
+        )
+        self.assertEqual({}, diff_stats_reports(new, new))
+
     def test_failure_stats_csv(self):
         self.stats.log_error("GET", "/", Exception("Error1337"))
         response = requests.get("http://127.0.0.1:%i/stats/failures/csv" % self.web_port)
         self.assertEqual(200, response.status_code)
         self._check_csv_headers(response.headers, "failures")
 
+    def test_request_stats_page(self):
+        for i in range(20):
+            self.stats.log_request("GET", f"/item/{i:02}", i * 10, 0)
+        self.stats.log_request("GET", "/other", 1000, 0)
+        self.stats.log_error("GET", "/item/01", Exception("Error1337"))
+        self.stats.log_error("GET", "/other", Exception("Error1337"))
+
+        response = requests.get("http://127.0.0.1:%i/stats/requests?offset=5&limit=3" % self.web_port)
+        self.assertEqual(200, response.status_code)
+        data = response.json()
+        self.assertEqual(["/item/05", "/item/06", "/item/07", "Aggregated"], [row["name"] for row in data["stats"]])
+        self.assertEqual(21, data["num_stats"])
+        self.assertEqual(2, data["num_errors"])
+
+        response = requests.get("http://127.0.0.1:%i/stats/requests?limit=2&sort=p95&filter=item" % self.web_port)
+        data = response.json()
+        self.assertEqual(["/item/19", "/item/18", "Aggregated"], [row["name"] for row in data["stats"]])
+        self.assertEqual(20, data["num_stats"])
+        self.assertEqual(["/item/01"], [row["name"] for row in data["errors"]])
+
+        response = requests.get("http://127.0.0.1:%i/stats/requests?sort=median" % self.web_port)
+        self.assertEqual(400, response.status_code)
+        response = requests.get("http://127.0.0.1:%i/stats/requests?offset=-1" % self.web_port)
+        self.assertEqual(400, response.status_code)
+
+    def test_failures_stats(self):
+        self.stats.log_error("GET", "/a", Exception("Error1337"))
+        self.stats.log_error("GET", "/b", Exception("Error1337"))
+        self.stats.log_error("GET", "/b", Exception("Error1337"))
+        response = requests.get("http://127.0.0.1:%i/stats/failures?sort=failures&limit=1" % self.web_port)
+        self.assertEqual(200, response.status_code)
+        data = response.json()
+        self.assertEqual(2, data["num_errors"])
+        self.assertEqual([("/b", 2)], [(row["name"], row["occurrences"]) for row in data["errors"]])
+
     def test_request_stats_with_errors(self):
         self.stats.log_error("GET", "/", Exception("Error with special characters {'foo':'bar'}"))
         response = requests.get("http://127.0.0.1:%i/stats/requests" % self.web_port)
@@ -225,6 +382,22 @@ class TestWebUI(LocustTestCase, _HeaderCheckMixin):
         self.assertEqual(0, self.stats.get("/test", "GET").num_requests)
         self.assertEqual(0, self.stats.get("/test", "GET").num_failures)
 
+    def test_listener_timings(self):
+        response = requests.get("http://127.0.0.1:%i/stats/listeners" % self.web_port)
+        self.assertEqual({"enabled": False, "listener_timings": []}, response.json())
+
+        self.environment.events.enable_listener_timing()
+        self.stats.log_request("GET", "/test", 120, 5612)
+        self.environment.events.request.fire(request_type="GET", name="/", response_time=1, response_length=0)
+        data = requests.get("http://127.0.0.1:%i/stats/listeners" % self.web_port).json()
+        self.assertTrue(data["enabled"])
+        self.assertIn("on_request", data["listener_timings"][0]["listener"])
+        self.assertEqual(1, data["listener_timings"][0]["calls"])
+
+        requests.get("http://127.0.0.1:%i/stats/reset" % self.web_port)
+        data = requests.get("http://127.0.0.1:%i/stats/listeners" % self.web_port).json()
+        self.assertEqual([], data["listener_timings"])
+
     def test_exceptions(self):
         try:
             raise Exception("A cool test exception")
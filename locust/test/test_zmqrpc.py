@@ -1,9 +1,15 @@
-from locust.exception import RPCError, RPCSendError
-from locust.rpc import Message, zmqrpc
+from locust.exception import RPCError, RPCReceiveError, RPCSendError
+from locust.rpc import Message, protocol, zmqrpc
 from locust.test.testcases import LocustTestCase
 
+import os
+import tempfile
+import threading
+import unittest
 from time import sleep
+from unittest import mock
 
+import msgpack
 import zmq
 
 
@@ -56,3 +62,147 @@ class ZMQRPC_tests(LocustTestCase):
         server.close()
         with self.assertRaises(RPCSendError):
             server.send_to_client(Message("test", "message", "identity"))
+
+    def test_recv_malformed_compact_message(self):
+        header = bytes((protocol.COMPACT_FORMAT_MARKER, protocol.COMPACT_FORMAT_VERSION, 0))
+        self.client.socket.send(header + msgpack.dumps((99, "identity", [])))
+        with self.assertRaises(RPCReceiveError):
+            self.server.recv_from_client()
+
+    def test_client_send_compact(self):
+        self.client.compact = True
+        self.client.compression = "zlib"
+        data = {"state": "running", "current_cpu_usage": 12.5, "current_memory_usage": 1234}
+        self.client.send(Message("heartbeat", data, "identity"))
+        addr, msg = self.server.recv_from_client()
+        self.assertEqual(addr, "identity")
+        self.assertEqual(msg.type, "heartbeat")
+        self.assertEqual(msg.data, data)
+        # messages without a compact schema use the regular format
+        self.client.send(Message("test", "message", "identity"))
+        addr, msg = self.server.recv_from_client()
+        self.assertEqual(msg.type, "test")
+        self.assertEqual(msg.data, "message")
+
+    @unittest.skipIf(not zmq.has("ipc"), "ipc transport is not available")
+    def test_ipc_transport(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ipc_path = os.path.join(tmpdir, "master.ipc")
+            server = zmqrpc.Server("*", 0, ipc_path=ipc_path)
+            ipc_client = zmqrpc.Client("localhost", server.port, "ipc_identity", ipc_path=ipc_path)
+            tcp_client = zmqrpc.Client("localhost", server.port, "tcp_identity")
+            try:
+                ipc_client.send(Message("test", "message", "ipc_identity"))
+                addr, msg = server.recv_from_client()
+                self.assertEqual(addr, "ipc_identity")
+                self.assertEqual(msg.data, "message")
+                server.send_to_client(Message("test", "reply", "ipc_identity"))
+                self.assertEqual(ipc_client.recv().data, "reply")
+                # tcp clients can still connect
+                tcp_client.send(Message("test", "message", "tcp_identity"))
+                self.assertEqual(server.recv_from_client()[0], "tcp_identity")
+            finally:
+                ipc_client.close()
+                tcp_client.close()
+                server.close()
+
+    def test_server_decode_in_thread(self):
+        server = zmqrpc.Server("*", 0, decode_in_thread=True)
+        client = zmqrpc.Client("localhost", server.port, "identity")
+        try:
+            decoded_in = []
+            unserialize = Message.unserialize
+
+            def record_thread(data):
+                decoded_in.append(threading.get_ident())
+                return unserialize(data)
+
+            with mock.patch.object(Message, "unserialize", side_effect=record_thread):
+                client.send(Message("test", "small", "identity"))
+                client.send(Message("test", "x" * zmqrpc.THREADED_DECODE_THRESHOLD, "identity"))
+                client.socket.send(b"\x93corrupt" + b"x" * zmqrpc.THREADED_DECODE_THRESHOLD)
+                addr, msg = server.recv_from_client()
+                self.assertEqual(msg.data, "small")
+                addr, msg = server.recv_from_client()
+                self.assertEqual(addr, "identity")
+                self.assertEqual(msg.data, "x" * zmqrpc.THREADED_DECODE_THRESHOLD)
+                with self.assertRaises(RPCReceiveError):
+                    server.recv_from_client()
+            # only the large messages were decoded outside of the gevent loop
+            self.assertEqual(threading.get_ident(), decoded_in[0])
+            self.assertNotEqual(threading.get_ident(), decoded_in[1])
+        finally:
+            server.close()
+            client.close()
+
+
+class ProtocolTests(LocustTestCase):
+    def stats_message(self):
+        return Message(
+            "stats",
+            {
+                "stats_delta": {
+                    "version": 1,
+                    "names": {0: ["/", "GET"]},
+                    "entries": [[0, 1.0, 2.0, 10, 0, 1, 500, 100, 10, 12345, {50: 5, 100: 5}, {1: 10}, {1: 1}]] * 50,
+                    "total": [1.0, 2.0, 10, 0, 1, 500, 100, 10, 12345, {50: 5, 100: 5}, {1: 10}, {1: 1}],
+                },
+                "errors": {
+                    "a" * 64: {
+                        "method": "GET",
+                        "name": "/",
+                        "error": "500",
+                        "occurrences": 1,
+                        "first_seen": 1.0,
+                        "last_seen": 2.0,
+                    }
+                },
+                "user_count": 5,
+                "user_classes_count": {"MyUser": 5},
+                "custom": {"key": "value"},
+            },
+            "node",
+        )
+
+    def test_compact_stats_roundtrip(self):
+        msg = self.stats_message()
+        regular = msg.serialize()
+        compact = msg.serialize(compact=True)
+        self.assertLess(len(compact), len(regular))
+        rebuilt = Message.unserialize(compact)
+        self.assertEqual("stats", rebuilt.type)
+        self.assertEqual("node", rebuilt.node_id)
+        self.assertEqual(msg.data, rebuilt.data)
+
+    def test_compact_compressed_roundtrip(self):
+        msg = self.stats_message()
+        compressed = msg.serialize(compact=True, compression="zlib")
+        self.assertLess(len(compressed), len(msg.serialize(compact=True)))
+        self.assertEqual(msg.data, Message.unserialize(compressed).data)
+
+    def test_compact_fallback(self):
+        # legacy stats reports and messages without a schema are sent in the regular format
+        for msg in [Message("stats", {"stats": [], "errors": {}}, "node"), Message("custom", {"a": 1}, "node")]:
+            self.assertEqual(msg.serialize(), msg.serialize(compact=True))
+        spawning = Message.unserialize(Message("spawning", None, "node").serialize(compact=True))
+        self.assertEqual(("spawning", None, "node"), (spawning.type, spawning.data, spawning.node_id))
+
+    def test_unsupported_compact_version(self):
+        data = bytearray(Message("spawning", None, "node").serialize(compact=True))
+        data[1] = 99
+        with self.assertRaises(ValueError):
+            Message.unserialize(bytes(data))
+
+    def test_malformed_compact_message(self):
+        header = bytes((protocol.COMPACT_FORMAT_MARKER, protocol.COMPACT_FORMAT_VERSION, 0))
+        for body in [
+            (99, "node", []),  # a schema from a newer version
+            ([1], "node", []),
+            (3, "node", [1]),
+            (3, "node", None),
+            (1, "node"),
+        ]:
+            with self.assertRaises(ValueError):
+                Message.unserialize(header + msgpack.dumps(body))
+        with self.assertRaises(ValueError):
+            Message.unserialize(bytes((protocol.COMPACT_FORMAT_MARKER, protocol.COMPACT_FORMAT_VERSION, 1)) + b"broken")
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+from operator import itemgetter
+
+import gevent
+from gevent.hub import Waiter
+
+"""Resolution (in seconds) of the timer wheel. Shorter sleeps are handed to gevent as usual"""
+TIMER_WHEEL_TICK = 0.01
+"""Number of slots in the timer wheel (one revolution is TIMER_WHEEL_TICK * TIMER_WHEEL_SLOTS seconds)"""
+TIMER_WHEEL_SLOTS = 1024
+"""Wake-ups within a tick are grouped into slices of this many seconds"""
+WAKE_UP_RESOLUTION = 0.001
+
+
+class TimerWheel:
+    """
+    Puts greenlets (usually users waiting for their wait_time) to sleep using a hashed timer wheel driven by a
+    single greenlet, instead of giving each of them a gevent timer.
+
+    With a very large number of mostly idle users this saves the hub from managing a timer per user. Sleepers
+    are woken up in the order of their deadlines, and the wake-ups within a tick are spread out over the tick
+    instead of all happening at its start.
+    """
+
+    def __init__(self, tick: float = TIMER_WHEEL_TICK, slots: int = TIMER_WHEEL_SLOTS) -> None:
+        self.tick = tick
+        # (tick number, deadline, waiter), in the slot of the tick number modulo the number of slots
+        self._slots: list[list[tuple[int, float, Waiter]]] = [[] for _ in range(slots)]
+        self._sleepers = 0
+        self._next_tick = 0
+        self._greenlet: gevent.Greenlet | None = None
+
+    def __len__(self) -> int:
+        """Number of sleeping greenlets"""
+        return self._sleepers
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Block the calling greenlet for the given number of seconds (like gevent.sleep)
+        """
+        if seconds < self.tick:
+            gevent.sleep(seconds)
+            return
+        if self._greenlet is None:
+            self._next_tick = int(time.perf_counter() / self.tick)
+            self._greenlet = gevent.spawn(self._run)
+        deadline = time.perf_counter() + seconds
+        # a sleeper can't be added to a tick that has already been processed
+        tick = max(int(deadline / self.tick), self._next_tick)
+        waiter = Waiter()
+        self._slots[tick % len(self._slots)].append((tick, deadline, waiter))
+        self._sleepers += 1
+        # if the greenlet is killed while sleeping, the waiter is simply ignored when it's due
+        waiter.get()
+
+    def _run(self) -> None:
+        try:
+            while self._sleepers:
+                tick = self._next_tick
+                delay = tick * self.tick - time.perf_counter()
+                if delay > 0:
+                    gevent.sleep(delay)
+                self._next_tick = tick + 1
+                slot_index = tick % len(self._slots)
+                slot = self._slots[slot_index]
+                if not slot:
+                    continue
+                due = [sleeper for sleeper in slot if sleeper[0] <= tick]
+                if not due:
+                    continue
+                # sleepers that are due in a later revolution of the wheel stay in the slot
+                self._slots[slot_index] = [sleeper for sleeper in slot if sleeper[0] > tick]
+                self._sleepers -= len(due)
+                due.sort(key=itemgetter(1))
+                for _, deadline, waiter in due:
+                    delay = deadline - time.perf_counter()
+                    if delay > 0:
+                        # sleep until the end of the slice of the tick that the deadline is in, and then wake
+                        # up everyone whose deadline has passed together
+                        gevent.sleep(delay + WAKE_UP_RESOLUTION - deadline % WAKE_UP_RESOLUTION)
+                    waiter.hub.loop.run_callback(waiter.switch, None)
+        finally:
+            self._greenlet = None
@@ -57,25 +57,27 @@ def get_ratio(user_classes: list[type[User]], user_spawned: dict[str, int], tota
     task_dict: dict[str, dict[str, float]] = {}
     for u, r in ratio_percent.items():
         d = {"ratio": r}
-        d["tasks"] = _get_task_ratio(u.tasks, total, r)
+        d["tasks"] = _get_task_ratio(u.tasks, total, r, u.task_weights)
         task_dict[u.__name__] = d
 
     return task_dict
 
 
-def _get_task_ratio(tasks, total, parent_ratio):
+def _get_task_ratio(tasks, total, parent_ratio, task_weights=None):
     parent_ratio = parent_ratio if total else 1.0
+    task_weights = task_weights or {}
     ratio = defaultdict(int)
     for task in tasks:
-        ratio[task] += 1
+        ratio[task] += task_weights.get(task, 1)
 
-    ratio_percent = {t: r * parent_ratio / len(tasks) for t, r in ratio.items()}
+    total_weight = sum(ratio.values())
+    ratio_percent = {t: r * parent_ratio / total_weight for t, r in ratio.items()}
 
     task_dict = {}
     for t, r in ratio_percent.items():
         d = {"ratio": r}
         if inspect.isclass(t) and issubclass(t, TaskSet):
-            d["tasks"] = _get_task_ratio(t.tasks, total, r)
+            d["tasks"] = _get_task_ratio(t.tasks, total, r, t.task_weights)
         task_dict[t.__name__] = d
 
     return task_dict
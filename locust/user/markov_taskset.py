@@ -1,9 +1,10 @@
 from locust.exception import LocustError
 from locust.user.task import TaskSetMeta
 from locust.user.users import TaskSet
+from locust.util.alias_table import AliasTable
 
 import logging
-import random
+import warnings
 from collections.abc import Callable
 
 MarkovTaskT = Callable[..., None]
@@ -134,8 +135,42 @@ def get_markov_tasks(class_dict: dict) -> list:
     return [fn for fn in class_dict.values() if is_markov_task(fn)]
 
 
-def to_weighted_list(transitions: dict):
-    return [name for name in transitions.keys() for _ in range(transitions[name])]
+def to_weighted_list(transitions: dict) -> list[str]:
+    """
+    Converts the transitions of a Markov task to a list with each function name repeated weight times.
+
+    Deprecated: transitions are picked using an AliasTable (see to_alias_table) instead.
+
+    :param transitions: Dictionary mapping function names to weights
+    :return: A list of function names
+    """
+    warnings.warn(
+        "to_weighted_list is deprecated, Markov transitions are picked using to_alias_table instead",
+        DeprecationWarning,
+        stacklevel=2,
+    )
+    return [name for name, weight in transitions.items() for _ in range(weight)]
+
+
+def get_positive_transitions(transitions: dict) -> dict[str, int]:
+    """
+    Transitions with a weight of zero (or less) are never taken
+
+    :param transitions: Dictionary mapping function names to weights
+    :return: The transitions that have a positive weight
+    """
+    return {name: weight for name, weight in transitions.items() if weight > 0}
+
+
+def to_alias_table(transitions: dict) -> AliasTable[str]:
+    """
+    Converts the transitions of a Markov task to an AliasTable for picking the next task in constant time.
+
+    :param transitions: Dictionary mapping function names to weights
+    :return: An AliasTable of function names
+    """
+    transitions = get_positive_transitions(transitions)
+    return AliasTable(list(transitions), list(transitions.values()))
 
 
 def validate_has_markov_tasks(tasks: list, classname: str):
@@ -200,8 +235,8 @@ def validate_no_unreachable_tasks(tasks: list, class_dict: dict, classname: str)
 
     def dfs(task_name):
         visited.add(task_name)
-        # Convert to a weighted list first to handle bad weights
-        for dest in set(to_weighted_list(class_dict.get(task_name).transitions)):
+        # Ignore transitions with bad weights
+        for dest in get_positive_transitions(class_dict.get(task_name).transitions):
             if dest not in visited:
                 dfs(dest)
 
@@ -286,7 +321,7 @@ class MarkovTaskSetMeta(TaskSetMeta):
             validate_markov_chain(tasks, class_dict, classname)
             class_dict["current"] = tasks[0]
             for task in tasks:
-                task.transitions = to_weighted_list(task.transitions)
+                task.transitions = to_alias_table(task.transitions)
 
         return type.__new__(mcs, classname, bases, class_dict)
 
@@ -316,7 +351,7 @@ class MarkovTaskSet(TaskSet, metaclass=MarkovTaskSetMeta):
         fn = self.current
 
         transitions = getattr(fn, "transitions")
-        next = random.choice(transitions)
+        next = transitions.pick()
         self.current = getattr(self, next)
 
         return fn
@@ -2,7 +2,7 @@ from locust.exception import LocustError
 
 from itertools import cycle
 
-from .task import TaskSet, TaskSetMeta
+from .task import TaskSet, TaskSetMeta, get_task_weights
 
 
 class SequentialTaskSetMeta(TaskSetMeta):
@@ -19,7 +19,9 @@ class SequentialTaskSetMeta(TaskSetMeta):
         for base in bases:
             # first get tasks from base classes
             if hasattr(base, "tasks") and base.tasks:
-                new_tasks += base.tasks
+                # in a sequence, a task with a weight is repeated that many times
+                for task, weight in get_task_weights(base).items():
+                    new_tasks += [task] * weight
         for key, value in class_dict.items():
             if key == "tasks":
                 # we want to insert tasks from the tasks attribute at the point of it's declaration
@@ -39,6 +41,7 @@ class SequentialTaskSetMeta(TaskSetMeta):
                     new_tasks.append(value)
 
         class_dict["tasks"] = new_tasks
+        class_dict["task_weights"] = {}
         return type.__new__(mcs, classname, bases, class_dict)
 
 
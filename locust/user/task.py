@@ -8,6 +8,8 @@ from locust.exception import (
     StopTest,
     StopUser,
 )
+from locust.stats import current_iteration_schedule
+from locust.util.alias_table import AliasTable
 
 import logging
 import random
@@ -141,15 +143,23 @@ def tag(*tags: str) -> Callable[[TaskT], TaskT]:
     return decorator_func
 
 
-def get_tasks_from_base_classes(bases, class_dict):
+def get_tasks_from_base_classes(bases, class_dict) -> dict:
     """
     Function used by both TaskSetMeta and UserMeta for collecting all declared tasks
     on the TaskSet/User class and all its base classes
+
+    :returns: The weight of each task, in order of declaration
     """
-    new_tasks = []
+    new_tasks: dict = {}
+
+    def add_task(task, weight):
+        if weight > 0:
+            new_tasks[task] = new_tasks.get(task, 0) + weight
+
     for base in bases:
         if hasattr(base, "tasks") and base.tasks:
-            new_tasks += base.tasks
+            for task, weight in get_task_weights(base).items():
+                add_task(task, weight)
 
     if "tasks" in class_dict and class_dict["tasks"] is not None:
         tasks = class_dict["tasks"]
@@ -158,20 +168,62 @@ def get_tasks_from_base_classes(bases, class_dict):
 
         for task in tasks:
             if isinstance(task, tuple):
-                task, count = task
-                for _ in range(count):
-                    new_tasks.append(task)
+                add_task(*task)
             else:
-                new_tasks.append(task)
+                add_task(task, 1)
 
     for item in class_dict.values():
         if "locust_task_weight" in dir(item):
-            for i in range(item.locust_task_weight):
-                new_tasks.append(item)
+            add_task(item, item.locust_task_weight)
 
     return new_tasks
 
 
+def get_task_weights(task_holder) -> dict:
+    """
+    Get the weight of each of the tasks of a TaskSet/User (class). A task that is in the tasks
+    list more than once (e.g. if it was set to a list with duplicates) gets the sum of its weights.
+    """
+    task_weights = getattr(task_holder, "task_weights", {})
+    weights: dict = {}
+    for task in task_holder.tasks:
+        weights[task] = weights.get(task, 0) + task_weights.get(task, 1)
+    return weights
+
+
+_NO_TASK_WEIGHTS: dict = {}
+
+
+def get_task_picker(task_holder) -> AliasTable:
+    """
+    Get an AliasTable for picking tasks of a TaskSet/User (class) according to their weights.
+
+    It's cached on the class (or on the instance, if it has tasks or task_weights of its own), and rebuilt
+    when tasks or task_weights is set to another list/dict, or has a task added or removed. Checking that
+    is O(1), so replacing a task or changing a weight in place isn't noticed: set a new list/dict instead.
+    """
+    tasks = task_holder.tasks
+    task_weights = getattr(task_holder, "task_weights", _NO_TASK_WEIGHTS)
+    owner = task_holder
+    if not isinstance(task_holder, type):
+        own_attributes = vars(task_holder)
+        if "tasks" not in own_attributes and "task_weights" not in own_attributes:
+            owner = type(task_holder)
+    cached = vars(owner).get("_task_picker")
+    # the cache keeps the list and dict, so that their ids can't be reused by new ones
+    if (
+        cached is None
+        or cached[0] is not tasks
+        or cached[1] is not task_weights
+        or cached[2] != len(tasks)
+        or cached[3] != len(task_weights)
+    ):
+        weights = get_task_weights(task_holder)
+        cached = (tasks, task_weights, len(tasks), len(task_weights), AliasTable(list(weights), list(weights.values())))
+        setattr(owner, "_task_picker", cached)
+    return cached[4]
+
+
 def is_markov_taskset(task: type):
     """
     Determines if a task is a MarkovTaskSet by checking its meta class
@@ -233,7 +285,9 @@ class TaskSetMeta(type):
     """
 
     def __new__(mcs, classname, bases, class_dict):
-        class_dict["tasks"] = get_tasks_from_base_classes(bases, class_dict)
+        task_weights = get_tasks_from_base_classes(bases, class_dict)
+        class_dict["tasks"] = list(task_weights)
+        class_dict["task_weights"] = task_weights
         return type.__new__(mcs, classname, bases, class_dict)
 
 
@@ -271,6 +325,13 @@ class TaskSet(metaclass=TaskSetMeta):
             tasks = {ThreadPage:15, write_post:1}
     """
 
+    task_weights: dict[TaskSet | Callable, int] = {}
+    """
+    The weight of each of the tasks, collected from the *tasks* attribute and the @task decorators when the
+    class is created. Tasks that aren't in it have a weight of 1. (*tasks* is then set to a list that holds
+    each task once, instead of repeating it as many times as its weight.)
+    """
+
     min_wait: float | None = None
     """
     Deprecated: Use wait_time instead.
@@ -428,7 +489,7 @@ class TaskSet(metaclass=TaskSetMeta):
             raise Exception(
                 f"No tasks defined on {self.__class__.__name__}{extra_message} use the @task decorator or set the 'tasks' attribute of the TaskSet"
             )
-        return random.choice(self.tasks)
+        return get_task_picker(self).pick()
 
     def wait_time(self):
         """
@@ -462,13 +523,32 @@ class TaskSet(metaclass=TaskSetMeta):
         if self.user._state == LOCUST_STATE_STOPPING:
             raise StopUser()
         self.user._state = LOCUST_STATE_WAITING
-        self._sleep(self.wait_time())
+        environment = self.user.environment
+        if (arrival_rate_scheduler := environment.arrival_rate_scheduler) is not None:
+            # open workload model, the next task starts when the scheduler says so
+            schedule_lag = arrival_rate_scheduler.wait_for_iteration()
+            if environment.correct_coordinated_omission:
+                current_iteration_schedule.set((schedule_lag, 0.0))
+        else:
+            self._sleep(self.wait_time())
+            if environment.correct_coordinated_omission:
+                current_iteration_schedule.set((0.0, self._pacing_interval()))
         if self.user._state == LOCUST_STATE_STOPPING:
             raise StopUser()
         self.user._state = LOCUST_STATE_RUNNING
 
     def _sleep(self, seconds):
-        gevent.sleep(seconds)
+        if (timer_wheel := self.user.environment.timer_wheel) is not None:
+            timer_wheel.sleep(seconds)
+        else:
+            gevent.sleep(seconds)
+
+    def _pacing_interval(self) -> float:
+        # the time between task starts if using constant_pacing/constant_throughput, otherwise 0
+        wait_time = self.wait_time
+        if getattr(wait_time, "__func__", None) is TaskSet.wait_time:
+            wait_time = self.user.wait_time
+        return getattr(wait_time, "pacing_interval", 0.0)
 
     def interrupt(self, reschedule=True):
         """
@@ -502,7 +582,7 @@ class DefaultTaskSet(TaskSet):
             raise Exception(
                 f"No tasks defined on {self.user.__class__.__name__}{extra_message} Use the @task decorator or set the 'tasks' attribute of the User (or mark it as abstract = True if you only intend to subclass it)"
             )
-        return random.choice(self.user.tasks)
+        return get_task_picker(self.user).pick()
 
     def execute_task(self, task):
         if hasattr(task, "tasks") and issubclass(task, TaskSet):
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from locust.clients import HttpSession
 from locust.exception import CatchResponseError, StopTest, StopUser
+from locust.stats import current_iteration_schedule
 from locust.user.task import (
     LOCUST_STATE_RUNNING,
     LOCUST_STATE_STOPPING,
@@ -45,8 +46,9 @@ class UserMeta(type):
 
     def __new__(mcs, classname, bases, class_dict):
         # gather any tasks that is declared on the class (or it's bases)
-        tasks = get_tasks_from_base_classes(bases, class_dict)
-        class_dict["tasks"] = tasks
+        task_weights = get_tasks_from_base_classes(bases, class_dict)
+        class_dict["tasks"] = list(task_weights)
+        class_dict["task_weights"] = task_weights
 
         if not class_dict.get("abstract"):
             # Not a base class
@@ -115,6 +117,13 @@ class User(metaclass=UserMeta):
             tasks = {ThreadPage:15, write_post:1}
     """
 
+    task_weights: dict[TaskSet | Callable, int] = {}
+    """
+    The weight of each of the tasks, collected from the *tasks* attribute and the @task decorators when the
+    class is created. Tasks that aren't in it have a weight of 1. (*tasks* is then set to a list that holds
+    each task once, instead of repeating it as many times as its weight.)
+    """
+
     weight: float = 1
     """Probability of user class being chosen. The higher the weight, the greater the chance of it being chosen."""
 
@@ -164,6 +173,12 @@ class User(metaclass=UserMeta):
                 logger.error("%s\n%s", e, traceback.format_exc())
                 raise
 
+            if self.environment.arrival_rate_scheduler is not None:
+                # even the first task has to wait for its turn
+                self._taskset_instance.wait()
+            elif self.environment.correct_coordinated_omission:
+                # the first task isn't preceded by a wait, which is where the iteration schedule is normally set
+                current_iteration_schedule.set((0.0, self._taskset_instance._pacing_interval()))
             self._taskset_instance.run()
         except (GreenletExit, StopUser, StopTest):
             # run the on_stop method, if it has one
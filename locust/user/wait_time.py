@@ -57,6 +57,8 @@ def constant_pacing(wait_time: float) -> Callable[["User"], float]:
         self._cp_last_run = time()
         return self._cp_last_wait_time
 
+    # the intended time between task starts, used for coordinated omission correction
+    wait_time_func.pacing_interval = wait_time  # type: ignore[attr-defined]
     return wait_time_func
 
 
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import random
+from collections.abc import Sequence
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class AliasTable(Generic[T]):
+    """
+    Picks random items with probabilities proportional to their weights, using Walker's alias method.
+
+    Picking an item takes constant time, and the table only takes memory proportional to the number of
+    items, no matter how large the weights are (unlike picking from a list where every item is repeated
+    as many times as its weight).
+    """
+
+    def __init__(self, items: Sequence[T], weights: Sequence[int | float]) -> None:
+        if len(items) != len(weights):
+            raise ValueError("There must be exactly one weight per item")
+        if any(weight < 0 for weight in weights):
+            raise ValueError("Weights can't be negative")
+
+        self.items = list(items)
+        self.weights = list(weights)
+        total = sum(self.weights)
+        # if all weights are zero there is nothing to pick from
+        count = len(self.items) if total > 0 else 0
+        self._columns = count
+        # scale the weights so that they average 1, and then split them into count columns of height 1, where each
+        # column holds (part of) at most two items: its own, and an "alias" that fills the rest of the column
+        scaled = [weight * count / total for weight in self.weights] if count else []
+        self._probabilities = [1.0] * count
+        self._aliases = list(range(count))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._probabilities[less] = scaled[less]
+            self._aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # whatever remains (because of rounding errors) fills its column on its own
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def pick(self) -> T:
+        """
+        Pick a random item
+
+        :raises IndexError: If there are no items with a positive weight
+        """
+        if not self._columns:
+            raise IndexError("Cannot pick from an empty AliasTable")
+        column = random.random() * self._columns
+        i = int(column)
+        if column - i < self._probabilities[i]:
+            return self.items[i]
+        return self.items[self._aliases[i]]
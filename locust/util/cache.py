@@ -1,33 +1,43 @@
 import functools
 from time import time
 
+"""Maximum number of results that a memoized function with a cache key keeps (expired ones are dropped first)"""
+MAX_CACHED_RESULTS = 100
 
-def memoize(timeout, dynamic_timeout=False):
+
+def memoize(timeout, dynamic_timeout=False, key=None):
     """
     Memoization decorator with support for timeout.
 
     If dynamic_timeout is set, the cache timeout is doubled if the cached function
     takes longer time to run than the timeout time
+
+    If key is set, it is called (with the same arguments as the function) to get the cache key,
+    so that different results can be cached (e.g. for each query string of a web request)
     """
     cache = {"timeout": timeout}
+    results = {}
 
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs) if key is not None else None
             start = time()
-            if (not "time" in cache) or (start - cache["time"] > cache["timeout"]):
+            if cache_key not in results or start - results[cache_key][0] > cache["timeout"]:
                 # cache miss
-                cache["result"] = func(*args, **kwargs)
-                cache["time"] = time()
-                if dynamic_timeout and cache["time"] - start > cache["timeout"]:
+                if len(results) >= MAX_CACHED_RESULTS:
+                    for expired in [k for k, (t, _) in results.items() if start - t > cache["timeout"]]:
+                        del results[expired]
+                    if len(results) >= MAX_CACHED_RESULTS:
+                        results.clear()
+                result = func(*args, **kwargs)
+                results[cache_key] = (time(), result)
+                if dynamic_timeout and results[cache_key][0] - start > cache["timeout"]:
                     cache["timeout"] *= 2
-            return cache["result"]
+            return results[cache_key][1]
 
         def clear_cache():
-            if "time" in cache:
-                del cache["time"]
-            if "result" in cache:
-                del cache["result"]
+            results.clear()
 
         wrapper.clear_cache = clear_cache
         return wrapper
@@ -1,3 +1,4 @@
+import re
 from urllib.parse import urlparse
 
 
@@ -10,3 +11,27 @@ def is_url(url: str) -> bool:
         return result.scheme in ("https", "http") and bool(result.netloc)
     except ValueError:
         return False
+
+
+_PATH_SEPARATORS = re.compile(r"([/?&=;,])")
+_PATH_TEMPLATES = [
+    (re.compile(r"-?\d+(\.\d+)?"), "{number}"),
+    (re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"), "{uuid}"),
+    # at least one digit, so that it isn't just a word made of the letters a-f
+    (re.compile(r"(?=[a-fA-F]*\d)[0-9a-fA-F]{8,}"), "{hex}"),
+]
+
+
+def template_path(path: str) -> str:
+    """
+    Replace the parts of a path (or request name) that look like ids (numbers, UUIDs and long hex strings)
+    with placeholders, e.g. /user/123/orders?id=1f0e2d3c4b5a6978 becomes /user/{number}/orders?id={hex}
+    """
+    parts = _PATH_SEPARATORS.split(path)
+    # every other part is a separator
+    for i in range(0, len(parts), 2):
+        for pattern, placeholder in _PATH_TEMPLATES:
+            if pattern.fullmatch(parts[i]):
+                parts[i] = placeholder
+                break
+    return "".join(parts)
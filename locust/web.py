@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import csv
-import itertools
 import json
 import logging
 import mimetypes
@@ -29,6 +28,7 @@ from flask import (
 from flask_cors import CORS
 from flask_login import LoginManager, login_required
 from gevent import pywsgi
+from gevent.event import Event
 
 from . import __version__ as version
 from . import argument_parser, stats
@@ -43,6 +43,8 @@ from .util.date import format_safe_timestamp
 from .util.timespan import parse_timespan
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
     from .env import Environment
 
 
@@ -51,6 +53,13 @@ greenlet_exception_handler = greenlet_exception_logger(logger)
 
 DEFAULT_CACHE_TIME = 2.0
 HOST_IS_REQUIRED = False
+"""Default number of rows of stats and errors sent to the web UI, since a lot of rows make it render very slowly"""
+STATS_PAGE_SIZE = 500
+
+"""How often (in seconds) the stats are pushed to the viewers of /stats/stream"""
+STATS_STREAM_INTERVAL_SEC = 2.0
+"""How long /stats/stream can go without sending anything before it sends a comment, so proxies don't time it out"""
+STATS_STREAM_KEEPALIVE_SEC = 15.0
 
 
 class InputField(TypedDict, total=False):
@@ -84,6 +93,94 @@ class AuthArgs(TypedDict, total=False):
     info: str
 
 
+def _diff_rows(old_rows: list[dict], new_rows: list[dict], key: Callable[[dict], tuple]) -> dict | None:
+    old = {key(row): row for row in old_rows}
+    new = {key(row): row for row in new_rows}
+    changed = [row for row_key, row in new.items() if old.get(row_key) != row]
+    removed = [list(row_key) for row_key in old if row_key not in new]
+    if changed or removed:
+        return {"changed": changed, "removed": removed}
+    return None
+
+
+def diff_stats_reports(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """
+    The changes from one stats report (as sent by /stats/requests) to the next: the top level fields that
+    changed, and for "stats" and "errors" the {"changed": [rows], "removed": [keys]} rows, where stats rows
+    are identified by [method, name] and errors by [method, name, error]
+    """
+    delta = {key: value for key, value in new.items() if key not in ("stats", "errors") and old.get(key) != value}
+    if stats_delta := _diff_rows(old["stats"], new["stats"], lambda row: (row["method"], row["name"])):
+        delta["stats"] = stats_delta
+    if errors_delta := _diff_rows(old["errors"], new["errors"], lambda row: (row["method"], row["name"], row["error"])):
+        delta["errors"] = errors_delta
+    return delta
+
+
+class StatsStream:
+    """
+    Pushes the stats shown in the web UI to any number of viewers, as Server-Sent Events.
+
+    While anyone is connected, a single greenlet builds the report every STATS_STREAM_INTERVAL_SEC, works out
+    what changed since the previous one (see :func:`diff_stats_reports`), and JSON encodes both once for all
+    viewers. A viewer gets the whole report (a "snapshot" event) when it connects or if it has missed an update,
+    and only the changes (a "delta" event) otherwise. Nothing is sent when nothing has changed.
+    """
+
+    def __init__(self, get_report: Callable[[], dict[str, Any]], interval: float = STATS_STREAM_INTERVAL_SEC):
+        self._get_report = get_report
+        self.interval = interval
+        self.version = 0
+        """ Number of updates so far (0 until the first report has been built, and again when nobody is connected) """
+        self.viewers = 0
+        self._report: dict[str, Any] | None = None
+        self._snapshot = ""
+        self._delta = ""
+        self._updated = Event()
+        self._greenlet: gevent.Greenlet | None = None
+
+    def _publish(self) -> None:
+        while self.viewers:
+            report = self._get_report()
+            delta = diff_stats_reports(self._report, report) if self._report is not None else None
+            if delta is None or delta:
+                self._report = report
+                self._snapshot = json.dumps(report)
+                self._delta = json.dumps(delta)
+                self.version += 1
+                # wake up the viewers, and give the next update a new event to wait for
+                updated, self._updated = self._updated, Event()
+                updated.set()
+            gevent.sleep(self.interval)
+        # forget the last report, so the next viewer to connect doesn't get a stale one
+        self._report = None
+        self._snapshot = ""
+        self._delta = ""
+        self.version = 0
+        self._greenlet = None
+
+    def events(self) -> Iterator[str]:
+        """The events for one viewer, for use as the body of a streaming response"""
+        self.viewers += 1
+        if self._greenlet is None:
+            self._greenlet = gevent.spawn(self._publish)
+            self._greenlet.link_exception(greenlet_exception_handler)
+        try:
+            version = 0
+            while True:
+                if self.version == version:
+                    if not self._updated.wait(STATS_STREAM_KEEPALIVE_SEC):
+                        yield ": keep-alive\n\n"
+                elif version and self.version == version + 1:
+                    version = self.version
+                    yield f"event: delta\ndata: {self._delta}\n\n"
+                else:
+                    version = self.version
+                    yield f"event: snapshot\ndata: {self._snapshot}\n\n"
+        finally:
+            self.viewers -= 1
+
+
 class WebUI:
     """
     Sets up and runs a Flask web app that can start and stop load tests using the
@@ -163,6 +260,7 @@ class WebUI:
         self._swarm_greenlet: gevent.Greenlet | None = None
         self.template_args = {}
         self.auth_args = {}
+        self.stats_stream = StatsStream(self._request_stats_report)
         self.app.template_folder = build_path or DEFAULT_BUILD_PATH
         self.app.static_url_path = "/assets/"
 
@@ -356,6 +454,7 @@ class WebUI:
         @self.auth_required_if_enabled
         def reset_stats() -> str:
             environment.events.reset_stats.fire()
+            environment.events.reset_listener_timings()
             if environment.runner is not None:
                 environment.runner.stats.reset_all()
                 environment.runner.exceptions = {}
@@ -447,74 +546,67 @@ class WebUI:
 
         @app_blueprint.route("/stats/requests")
         @self.auth_required_if_enabled
-        @memoize(timeout=DEFAULT_CACHE_TIME, dynamic_timeout=True)
+        @memoize(timeout=DEFAULT_CACHE_TIME, dynamic_timeout=True, key=lambda: request.query_string)
         def request_stats() -> Response:
-            _stats: list[dict[str, Any]] = []
-            errors: list[stats.StatsErrorDict] = []
+            # ?offset=N&limit=N&sort=name|rps|p95|failures&filter=<part of the name>
+            offset = request.args.get("offset", 0, type=int)
+            limit = request.args.get("limit", STATS_PAGE_SIZE, type=int)
+            if offset < 0 or limit < 0:
+                return make_response("Error: offset and limit can't be negative", 400)
+            try:
+                report = self._request_stats_report(
+                    offset, limit, request.args.get("sort", "name"), request.args.get("filter")
+                )
+            except ValueError as e:
+                return make_response(f"Error: {e}", 400)
+            return jsonify(report)
 
+        @app_blueprint.route("/stats/failures")
+        @self.auth_required_if_enabled
+        def failures_stats() -> Response:
+            # ?offset=N&limit=N&sort=name|failures|insertion&filter=<part of the name>
+            offset = request.args.get("offset", 0, type=int)
+            limit = request.args.get("limit", STATS_PAGE_SIZE, type=int)
+            if offset < 0 or limit < 0:
+                return make_response("Error: offset and limit can't be negative", 400)
             if environment.runner is None:
-                report = {
-                    "stats": _stats,
-                    "errors": errors,
-                    "total_rps": 0.0,
-                    "total_fail_per_sec": 0.0,
-                    "fail_ratio": 0.0,
-                    "current_response_time_percentile_1": None,
-                    "current_response_time_percentile_2": None,
-                    "state": STATE_MISSING,
-                    "user_count": 0,
-                }
-
-                if isinstance(environment.runner, MasterRunner):
-                    report.update({"workers": []})
-
-                return jsonify(report)
+                return jsonify({"errors": [], "num_errors": 0})
+            try:
+                num_errors, errors = environment.runner.stats.query_errors(
+                    offset, limit, request.args.get("sort", "name"), request.args.get("filter")
+                )
+            except ValueError as e:
+                return make_response(f"Error: {e}", 400)
+            return jsonify({"errors": [e.serialize() for e in errors], "num_errors": num_errors})
 
-            # Truncate the total number of stats and errors displayed since a large number of rows will cause the app
-            # to render extremely slowly. Aggregate stats should be preserved.
-            _stats.extend(
-                stat.to_dict() for stat in itertools.islice(stats.sort_stats(environment.runner.stats.entries), 500)
+        @app_blueprint.route("/stats/stream")
+        @self.auth_required_if_enabled
+        def request_stats_stream() -> Response:
+            return Response(
+                self.stats_stream.events(),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
             )
-            _stats.append(environment.runner.stats.total.to_dict())
 
-            errors = [e.serialize() for e in itertools.islice(environment.runner.errors.values(), 500)]
-
-            report = {"stats": _stats, "errors": errors}
-
-            total_stats = _stats[-1]
-
-            if _stats:
-                report["current_rps"] = total_stats["current_rps"]
-                report["current_fail_per_sec"] = total_stats["current_fail_per_sec"]
-                report["total_rps"] = total_stats["total_rps"]
-                report["total_fail_per_sec"] = total_stats["total_fail_per_sec"]
-                report["fail_ratio"] = environment.runner.stats.total.fail_ratio
-                report["current_response_time_percentiles"] = {
-                    f"response_time_percentile_{percentile}": environment.runner.stats.total.get_current_response_time_percentile(
-                        percentile
-                    )
-                    for percentile in stats.PERCENTILES_TO_CHART
+        @app_blueprint.route("/stats/history")
+        @self.auth_required_if_enabled
+        def request_stats_history() -> Response:
+            # at most ?points=N points (e.g. the width of the chart), by merging consecutive ones
+            max_points = request.args.get("points", stats.HISTORY_CHART_POINTS, type=int)
+            if max_points < 1:
+                return make_response("Error: points must be a positive number", 400)
+            history = environment.runner.stats.history if environment.runner is not None else None
+            return jsonify({"history": history.points(max_points) if history else []})
+
+        @app_blueprint.route("/stats/listeners")
+        @self.auth_required_if_enabled
+        def listener_timings() -> Response:
+            return jsonify(
+                {
+                    "enabled": environment.events.listener_timing_enabled,
+                    "listener_timings": environment.events.get_listener_timings(),
                 }
-
-            if isinstance(environment.runner, MasterRunner):
-                workers = [
-                    {
-                        "id": worker.id,
-                        "state": worker.state,
-                        "user_count": worker.user_count,
-                        "cpu_usage": worker.cpu_usage,
-                        "memory_usage": worker.memory_usage,
-                    }
-                    for worker in environment.runner.clients.values()
-                ]
-
-                report["workers"] = workers
-                report["worker_count"] = environment.runner.worker_count
-
-            report["state"] = environment.runner.state
-            report["user_count"] = environment.runner.user_count
-
-            return jsonify(report)
+            )
 
         @app_blueprint.route("/exceptions")
         @self.auth_required_if_enabled
@@ -729,7 +821,9 @@ class WebUI:
             "user_count": self.environment.runner.user_count,
             "version": version,
             "host": host or "",
-            "history": request_stats.history if request_stats.num_requests > 0 else [],
+            "history": request_stats.history.points(stats.HISTORY_CHART_POINTS)
+            if request_stats.num_requests > 0
+            else [],
             "override_host_warning": override_host_warning,
             "missing_host_warning": missing_host_warning,
             "num_users": options and options.num_users,
@@ -752,12 +846,97 @@ class WebUI:
             "users": users,
             "percentiles_to_chart": stats.PERCENTILES_TO_CHART,
             "percentiles_to_statistics": stats.PERCENTILES_TO_STATISTICS,
+            "correct_coordinated_omission": self.environment.correct_coordinated_omission,
             "is_host_required": HOST_IS_REQUIRED,
             "profile": self.environment.profile,
         }
 
         self.template_args = {**self.template_args, **new_template_args}
 
+    def _request_stats_report(
+        self, offset: int = 0, limit: int = STATS_PAGE_SIZE, sort: str = "name", name_filter: str | None = None
+    ) -> dict[str, Any]:
+        """
+        The stats that /stats/requests and /stats/stream send to the web UI: a page of the entries (see
+        RequestStats.query_entries) and the aggregated stats, and the errors of the entries that match name_filter
+        """
+        _stats: list[dict[str, Any]] = []
+        errors: list[stats.StatsErrorDict] = []
+
+        if self.environment.runner is None:
+            report = {
+                "stats": _stats,
+                "errors": errors,
+                "total_rps": 0.0,
+                "total_fail_per_sec": 0.0,
+                "fail_ratio": 0.0,
+                "current_response_time_percentile_1": None,
+                "current_response_time_percentile_2": None,
+                "state": STATE_MISSING,
+                "user_count": 0,
+            }
+
+            if isinstance(self.environment.runner, MasterRunner):
+                report.update({"workers": []})
+
+            return report
+
+        request_stats = self.environment.runner.stats
+        # Only send a page of the stats and errors, since a large number of rows will cause the app to render
+        # extremely slowly. Aggregate stats should be preserved.
+        num_stats, entries = request_stats.query_entries(offset, limit, sort, name_filter)
+        _stats.extend(stat.to_dict() for stat in entries)
+        _stats.append(request_stats.total.to_dict())
+
+        num_errors, errors_page = request_stats.query_errors(
+            0, STATS_PAGE_SIZE, sort="insertion", name_filter=name_filter
+        )
+        errors = [e.serialize() for e in errors_page]
+
+        report = {"stats": _stats, "errors": errors, "num_stats": num_stats, "num_errors": num_errors}
+
+        total_stats = _stats[-1]
+
+        if _stats:
+            report["current_rps"] = total_stats["current_rps"]
+            report["current_fail_per_sec"] = total_stats["current_fail_per_sec"]
+            report["total_rps"] = total_stats["total_rps"]
+            report["total_fail_per_sec"] = total_stats["total_fail_per_sec"]
+            report["fail_ratio"] = self.environment.runner.stats.total.fail_ratio
+            report["current_response_time_percentiles"] = {
+                f"response_time_percentile_{percentile}": self.environment.runner.stats.total.get_current_response_time_percentile(
+                    percentile
+                )
+                for percentile in stats.PERCENTILES_TO_CHART
+            }
+            report["hub_lag_percentile_99"] = self.environment.runner.stats.get_hub_lag_percentile(0.99)
+
+        if isinstance(self.environment.runner, MasterRunner):
+            workers = [
+                {
+                    "id": worker.id,
+                    "state": worker.state,
+                    "user_count": worker.user_count,
+                    "cpu_usage": worker.cpu_usage,
+                    "memory_usage": worker.memory_usage,
+                    "hub_lag_percentile_99": worker.hub_lag.percentile(worker.hub_lag.total, 0.99),
+                }
+                for worker in self.environment.runner.clients.values()
+            ]
+
+            report["workers"] = workers
+            report["worker_count"] = self.environment.runner.worker_count
+
+        if self.environment.runner.arrival_rate is not None:
+            # on a master, these are the totals of the numbers reported by the workers
+            report["dropped_iterations"] = self.environment.runner.dropped_iterations
+            report["late_iterations"] = self.environment.runner.late_iterations
+
+        report["state"] = self.environment.runner.state
+        report["user_count"] = self.environment.runner.user_count
+
+        return report
+
     def _update_shape_class(self, shape_class_name):
         if shape_class_name:
             shape_class = self.environment.available_shape_classes[shape_class_name]
@@ -8,6 +8,7 @@ import { renderWithProvider } from 'test/testUtils';
 const mockUiState = {
   currentRps: '5',
   failRatio: '3',
+  hubLag: '12',
   stats: [],
   errors: [],
   exceptions: [],
@@ -44,6 +45,9 @@ describe('SwarmMonitor', () => {
     expect(getByText('RPS').nextElementSibling?.textContent).toBe(mockUiState.currentRps);
     expect(getByText('Users').nextElementSibling?.textContent).toBe(mockUiState.userCount);
     expect(getByText('Failures').nextElementSibling?.textContent).toBe(`${mockUiState.failRatio}%`);
+    expect(getByText('Hub lag (p99)').nextElementSibling?.textContent).toBe(
+      `${mockUiState.hubLag}ms`,
+    );
   });
 
   test('should render workers on distributed test run', () => {
@@ -8,7 +8,10 @@ import { ISwarmState } from 'types/swarm.types';
 
 interface ISwarmMonitor
   extends Pick<ISwarmState, 'isDistributed' | 'host' | 'state' | 'workerCount'>,
-    Pick<IUiState, 'currentRps' | 'failRatio' | 'userCount'> {}
+    Pick<
+      IUiState,
+      'currentRps' | 'failRatio' | 'hubLag' | 'droppedIterations' | 'lateIterations' | 'userCount'
+    > {}
 
 function SwarmMonitor({
   isDistributed,
@@ -16,6 +19,9 @@ function SwarmMonitor({
   host,
   currentRps,
   failRatio,
+  hubLag,
+  droppedIterations,
+  lateIterations,
   userCount,
   workerCount,
 }: ISwarmMonitor) {
@@ -78,19 +84,38 @@ function SwarmMonitor({
         <Typography sx={{ fontWeight: 'bold' }}>Failures</Typography>
         <Typography noWrap variant='button'>{`${failRatio}%`}</Typography>
       </Box>
+      <Divider flexItem orientation='vertical' />
+      <Box sx={{ display: 'flex', flexDirection: 'column', alignItems: { md: 'center' } }}>
+        <Typography sx={{ fontWeight: 'bold' }}>Hub lag (p99)</Typography>
+        <Typography noWrap variant='button'>{`${hubLag}ms`}</Typography>
+      </Box>
+      {droppedIterations !== undefined && (
+        <>
+          <Divider flexItem orientation='vertical' />
+          <Box sx={{ display: 'flex', flexDirection: 'column', alignItems: { md: 'center' } }}>
+            <Typography sx={{ fontWeight: 'bold' }}>Dropped / late iterations</Typography>
+            <Typography noWrap variant='button'>
+              {`${droppedIterations} / ${lateIterations}`}
+            </Typography>
+          </Box>
+        </>
+      )}
     </Box>
   );
 }
 
 const storeConnector = ({
   swarm: { isDistributed, state, host, workerCount },
-  ui: { currentRps, failRatio, userCount },
+  ui: { currentRps, failRatio, hubLag, droppedIterations, lateIterations, userCount },
 }: IRootState) => ({
   isDistributed,
   state,
   host,
   currentRps,
   failRatio,
+  hubLag,
+  droppedIterations,
+  lateIterations,
   userCount,
   workerCount,
 });
@@ -0,0 +1,19 @@
+import Table from 'components/Table/Table';
+import { IListenerTiming } from 'types/ui.types';
+
+const tableStructure = [
+  { key: 'event', title: 'Event' },
+  { key: 'listener', title: 'Listener' },
+  { key: 'calls', title: '# calls' },
+  { key: 'totalTime', title: 'Total (ms)', round: 2 },
+  { key: 'avgTime', title: 'Average (ms)', round: 3 },
+  { key: 'maxTime', title: 'Max (ms)', round: 2 },
+];
+
+export default function ListenerTimingsTable({
+  listenerTimings,
+}: {
+  listenerTimings: IListenerTiming[];
+}) {
+  return <Table<IListenerTiming> rows={listenerTimings} structure={tableStructure} />;
+}
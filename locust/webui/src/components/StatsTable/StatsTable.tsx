@@ -12,6 +12,14 @@ const percentilesToStatisticsRows = swarmTemplateArgs.percentilesToStatistics
     }))
   : [];
 
+const correctedPercentilesToStatisticsRows =
+  swarmTemplateArgs.correctCoordinatedOmission && swarmTemplateArgs.percentilesToStatistics
+    ? swarmTemplateArgs.percentilesToStatistics.map(percentile => ({
+        title: `Corrected ${percentile * 100}%ile (ms)`,
+        key: `correctedResponseTimePercentile${percentile}` as keyof ISwarmStat,
+      }))
+    : [];
+
 export const baseTableStructure = [
   { key: 'method', title: 'Type' },
   { key: 'name', title: 'Name' },
@@ -19,12 +27,14 @@ export const baseTableStructure = [
   { key: 'numFailures', title: '# Fails' },
   { key: 'medianResponseTime', title: 'Median (ms)', round: 2 },
   ...percentilesToStatisticsRows,
+  ...correctedPercentilesToStatisticsRows,
   { key: 'avgResponseTime', title: 'Average (ms)', round: 2 },
   { key: 'minResponseTime', title: 'Min (ms)' },
   { key: 'maxResponseTime', title: 'Max (ms)' },
   { key: 'avgContentLength', title: 'Average size (bytes)', round: 2 },
   { key: 'currentRps', title: 'Current RPS', round: 2 },
   { key: 'currentFailPerSec', title: 'Current Failures/s', round: 2 },
+  { key: 'numLaggedRequests', title: '# Lagged' },
 ];
 
 interface IStatsTable {
@@ -1,8 +1,14 @@
-import { connect } from 'react-redux';
-
 import StatsTable from 'components/StatsTable/StatsTable';
-import { IRootState } from 'redux/store';
+import StatsTableControls from 'components/StatsTable/StatsTableControls';
+import { useSelector } from 'redux/hooks';
 
-const storeConnector = ({ ui: { stats } }: IRootState) => ({ stats });
+export default function StatsTableContainer() {
+  const stats = useSelector(({ ui }) => ui.stats);
 
-export default connect(storeConnector)(StatsTable);
+  return (
+    <>
+      <StatsTableControls />
+      <StatsTable stats={stats} />
+    </>
+  );
+}
@@ -0,0 +1,46 @@
+import { fireEvent } from '@testing-library/react';
+import { describe, test, expect } from 'vitest';
+
+import StatsTableControls from 'components/StatsTable/StatsTableControls';
+import { renderWithProvider } from 'test/testUtils';
+
+const uiState = {
+  stats: [],
+  numStats: 1200,
+  statsQuery: { offset: 500, limit: 500, sort: 'name', filter: '' },
+};
+
+describe('StatsTableControls', () => {
+  test('pages through the stats', () => {
+    const { getByLabelText, getByText, store } = renderWithProvider(<StatsTableControls />, {
+      ui: uiState,
+    });
+
+    expect(getByText('501–1000 of 1200')).toBeTruthy();
+
+    fireEvent.click(getByLabelText('Go to next page'));
+
+    expect(store.getState().ui.statsQuery.offset).toBe(1000);
+  });
+
+  test('goes back to the first page when filtering', () => {
+    const { getByLabelText, store } = renderWithProvider(<StatsTableControls />, { ui: uiState });
+
+    fireEvent.change(getByLabelText('Filter by name'), { target: { value: '/api' } });
+
+    expect(store.getState().ui.statsQuery).toEqual({
+      offset: 0,
+      limit: 500,
+      sort: 'name',
+      filter: '/api',
+    });
+  });
+
+  test('goes back to the first page when there are fewer stats', () => {
+    const { store } = renderWithProvider(<StatsTableControls />, {
+      ui: { ...uiState, numStats: 20 },
+    });
+
+    expect(store.getState().ui.statsQuery.offset).toBe(0);
+  });
+});
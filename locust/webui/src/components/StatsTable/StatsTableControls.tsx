@@ -0,0 +1,64 @@
+import { useEffect } from 'react';
+import { MenuItem, Stack, TablePagination, TextField } from '@mui/material';
+
+import { useAction, useSelector } from 'redux/hooks';
+import { uiActions } from 'redux/slice/ui.slice';
+import { IStatsQuery, StatsSort } from 'types/ui.types';
+
+const sortOptions: { value: StatsSort; label: string }[] = [
+  { value: 'name', label: 'Name' },
+  { value: 'rps', label: 'Current RPS' },
+  { value: 'p95', label: '95%ile' },
+  { value: 'failures', label: '# Fails' },
+];
+
+const rowsPerPageOptions = [100, 500, 1000];
+
+export default function StatsTableControls() {
+  const setUi = useAction(uiActions.setUi);
+  const numStats = useSelector(({ ui }) => ui.numStats);
+  const statsQuery = useSelector(({ ui }) => ui.statsQuery);
+
+  const setStatsQuery = (query: Partial<IStatsQuery>) =>
+    setUi({ statsQuery: { ...statsQuery, ...query } });
+
+  useEffect(() => {
+    // e.g. after the stats are reset, or a filter leaves fewer of them
+    if (statsQuery.offset && statsQuery.offset >= numStats) {
+      setStatsQuery({ offset: 0 });
+    }
+  }, [numStats]);
+
+  return (
+    <Stack direction='row' sx={{ alignItems: 'center', columnGap: 2, flexWrap: 'wrap', my: 1 }}>
+      <TextField
+        label='Filter by name'
+        onChange={event => setStatsQuery({ filter: event.target.value, offset: 0 })}
+        size='small'
+        value={statsQuery.filter}
+      />
+      <TextField
+        label='Sort by'
+        onChange={event => setStatsQuery({ sort: event.target.value as StatsSort, offset: 0 })}
+        select
+        size='small'
+        value={statsQuery.sort}
+      >
+        {sortOptions.map(({ value, label }) => (
+          <MenuItem key={value} value={value}>
+            {label}
+          </MenuItem>
+        ))}
+      </TextField>
+      <TablePagination
+        component='div'
+        count={numStats}
+        onPageChange={(_, page) => setStatsQuery({ offset: page * statsQuery.limit })}
+        onRowsPerPageChange={event => setStatsQuery({ limit: Number(event.target.value), offset: 0 })}
+        page={Math.floor(statsQuery.offset / statsQuery.limit)}
+        rowsPerPage={statsQuery.limit}
+        rowsPerPageOptions={rowsPerPageOptions}
+      />
+    </Stack>
+  );
+}
@@ -11,6 +11,7 @@ const tableStructure = [
   { key: 'userCount', title: '# users' },
   { key: 'cpuUsage', title: 'CPU usage' },
   { key: 'memoryUsage', title: 'Memory usage', formatter: formatBytes },
+  { key: 'hubLagPercentile99', title: 'Hub lag p99 (ms)' },
 ];
 
 function WorkersTable({ workers = [] }: { workers?: ISwarmWorker[] }) {
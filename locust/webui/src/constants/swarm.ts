@@ -13,6 +13,9 @@ export const SWARM_STATE = {
   MISSING: 'missing',
 };
 
+// the number of stats rows the server sends by default (STATS_PAGE_SIZE in web.py)
+export const STATS_PAGE_SIZE = 500;
+
 export const swarmTemplateArgs = window.templateArgs
   ? camelCaseKeys(window.templateArgs)
   : ({} as ISwarmState | IReportTemplateArgs);
@@ -16,10 +16,11 @@ export default function useFetchStats() {
   const updateCharts = useAction(uiActions.updateCharts);
   const updateChartMarkers = useAction(uiActions.updateChartMarkers);
   const swarm = useSelector(({ swarm }) => swarm);
+  const statsQuery = useSelector(({ ui }) => ui.statsQuery);
   const previousSwarmState = useRef(swarm.state);
   const [shouldAddMarker, setShouldAddMarker] = useState(false);
 
-  const { data: statsData, refetch: refetchStats } = useGetStatsQuery();
+  const { data: statsData, refetch: refetchStats } = useGetStatsQuery(statsQuery);
 
   const shouldRunRefetchInterval =
     swarm.state === SWARM_STATE.SPAWNING || swarm.state == SWARM_STATE.RUNNING;
@@ -42,6 +43,10 @@ export default function useFetchStats() {
       workerCount,
       userCount,
       totalAvgResponseTime,
+      hubLagPercentile99,
+      droppedIterations,
+      lateIterations,
+      numStats,
     } = statsData;
 
     const time = new Date().toISOString();
@@ -75,9 +80,13 @@ export default function useFetchStats() {
     setUi({
       extendedStats,
       stats,
+      numStats: numStats || 0,
       errors,
       currentRps: currentRpsRounded,
       failRatio: totalFailureRatioRounded,
+      hubLag: hubLagPercentile99 || 0,
+      droppedIterations,
+      lateIterations,
       workers,
       userCount,
     });
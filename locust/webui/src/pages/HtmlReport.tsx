@@ -5,6 +5,7 @@ import { ThemeProvider } from '@mui/material/styles';
 
 import ExceptionsTable from 'components/ExceptionsTable/ExceptionsTable';
 import FailuresTable from 'components/FailuresTable/FailuresTable';
+import ListenerTimingsTable from 'components/ListenerTimingsTable/ListenerTimingsTable';
 import ResponseTimeTable from 'components/ResponseTimeTable/ResponseTimeTable';
 import StatsTable from 'components/StatsTable/StatsTable';
 import SwarmCharts from 'components/SwarmCharts/SwarmCharts';
@@ -39,9 +40,11 @@ export default function HtmlReport({
   charts,
   host,
   exceptionsStatistics,
+  listenerTimingsStatistics,
   requestsStatistics,
   failuresStatistics,
   responseTimeStatistics,
+  correctedResponseTimeStatistics,
   tasks,
 }: IReport) {
   useEffect(() => {
@@ -110,6 +113,14 @@ export default function HtmlReport({
               <ResponseTimeTable responseTimes={responseTimeStatistics} />
             </Box>
           )}
+          {!!correctedResponseTimeStatistics.length && (
+            <Box>
+              <Typography component='h2' noWrap sx={{ mb: 1 }} variant='h4'>
+                Corrected Response Time Statistics (coordinated omission)
+              </Typography>
+              <ResponseTimeTable responseTimes={correctedResponseTimeStatistics} />
+            </Box>
+          )}
           <Box>
             <Typography component='h2' noWrap sx={{ mb: 1 }} variant='h4'>
               Failures Statistics
@@ -124,6 +135,14 @@ export default function HtmlReport({
               <ExceptionsTable exceptions={exceptionsStatistics} />
             </Box>
           )}
+          {!!listenerTimingsStatistics.length && (
+            <Box>
+              <Typography component='h2' noWrap sx={{ mb: 1 }} variant='h4'>
+                Event Listener Timings
+              </Typography>
+              <ListenerTimingsTable listenerTimings={listenerTimingsStatistics} />
+            </Box>
+          )}
 
           <Box>
             <Typography component='h2' noWrap sx={{ mb: 1 }} variant='h4'>
@@ -77,4 +77,22 @@ describe('HtmlReport', () => {
     expect(getByRole('heading', { name: 'Exceptions Statistics' })).toBeTruthy();
     expect(getByText(exception.msg)).toBeTruthy();
   });
+
+  test('renders the event listener timings table when listener timings are present', () => {
+    const listenerTiming = {
+      event: 'request',
+      listener: 'locustfile.on_request',
+      calls: 10,
+      totalTime: 5,
+      avgTime: 0.5,
+      maxTime: 2,
+    };
+
+    const { getByRole, getByText } = renderWithProvider(
+      <HtmlReport {...swarmReportMock} listenerTimingsStatistics={[listenerTiming]} />,
+    );
+
+    expect(getByRole('heading', { name: 'Event Listener Timings' })).toBeTruthy();
+    expect(getByText(listenerTiming.listener)).toBeTruthy();
+  });
 });
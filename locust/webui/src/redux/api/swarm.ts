@@ -2,6 +2,7 @@ import { createApi, fetchBaseQuery } from '@reduxjs/toolkit/query/react';
 
 import { IStartSwarmResponse, ISwarmFormInput } from 'types/swarm.types';
 import {
+  IStatsQuery,
   IStatsResponse,
   ISwarmExceptionsResponse,
   ISwarmRatios,
@@ -25,8 +26,18 @@ export const api = createApi({
   baseQuery: baseQuery,
   tagTypes: ['stats'],
   endpoints: builder => ({
-    getStats: builder.query<IStatsResponse, void>({
-      query: () => 'stats/requests',
+    getStats: builder.query<IStatsResponse, IStatsQuery | void>({
+      query: statsQuery => ({
+        url: 'stats/requests',
+        params: statsQuery
+          ? {
+              offset: statsQuery.offset,
+              limit: statsQuery.limit,
+              sort: statsQuery.sort,
+              ...(statsQuery.filter ? { filter: statsQuery.filter } : {}),
+            }
+          : undefined,
+      }),
       transformResponse: camelCaseKeys<IStatsResponse>,
       providesTags: ['stats'],
     }),
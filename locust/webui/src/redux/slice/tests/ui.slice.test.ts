@@ -12,6 +12,7 @@ const responseTimePercentileKey2 =
 const initialState = {
   currentRps: 0,
   failRatio: 0,
+  hubLag: 0,
   startTime: '',
   stats: [],
   errors: [],
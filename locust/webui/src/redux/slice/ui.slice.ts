@@ -1,6 +1,6 @@
 import { createSlice, PayloadAction } from '@reduxjs/toolkit';
 
-import { swarmTemplateArgs } from 'constants/swarm';
+import { STATS_PAGE_SIZE, swarmTemplateArgs } from 'constants/swarm';
 import { updateStateWithPayload } from 'redux/utils';
 import {
   ICharts,
@@ -10,6 +10,7 @@ import {
   ISwarmException,
   ISwarmWorker,
   IExtendedStat,
+  IStatsQuery,
 } from 'types/ui.types';
 import { updateArraysAtProps } from 'utils/object';
 
@@ -17,8 +18,13 @@ export interface IUiState {
   extendedStats?: IExtendedStat[];
   currentRps: number;
   failRatio: number;
+  hubLag: number;
+  droppedIterations?: number;
+  lateIterations?: number;
   startTime: string;
   stats: ISwarmStat[];
+  numStats: number;
+  statsQuery: IStatsQuery;
   errors: ISwarmError[];
   workers?: ISwarmWorker[];
   exceptions: ISwarmException[];
@@ -32,8 +38,12 @@ export type UiAction = PayloadAction<Partial<IUiState>>;
 const initialState = {
   currentRps: 0,
   failRatio: 0,
+  hubLag: 0,
   startTime: '',
   stats: [] as ISwarmStat[],
+  numStats: 0,
+  // the page of the stats that is fetched (the server only sends a page of them)
+  statsQuery: { offset: 0, limit: STATS_PAGE_SIZE, sort: 'name', filter: '' } as IStatsQuery,
   errors: [] as ISwarmError[],
   exceptions: [] as ISwarmException[],
   charts: (swarmTemplateArgs.history || []).reduce(updateArraysAtProps, {}) as ICharts,
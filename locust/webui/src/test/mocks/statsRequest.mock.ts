@@ -16,6 +16,7 @@ export const statsResponseMock = {
     },
   ],
   fail_ratio: 1.0,
+  hub_lag_percentile_99: 0,
   state: 'running',
   stats: [
     {
@@ -32,6 +33,7 @@ export const statsResponseMock = {
       'response_time_percentile_0.99': 1,
       num_failures: 12652,
       num_requests: 12652,
+      num_lagged_requests: 0,
     },
     {
       avg_content_length: 0.0,
@@ -47,6 +49,7 @@ export const statsResponseMock = {
       'response_time_percentile_0.99': 1,
       num_failures: 12652,
       num_requests: 12652,
+      num_lagged_requests: 0,
     },
   ],
   total_avg_response_time: 0.41064205516736735,
@@ -119,6 +122,7 @@ export const statsResponseTransformed = {
       'responseTimePercentile0.99': 1,
       numFailures: 12652,
       numRequests: 12652,
+      numLaggedRequests: 0,
     },
     {
       avgContentLength: 0,
@@ -134,6 +138,7 @@ export const statsResponseTransformed = {
       'responseTimePercentile0.99': 1,
       numFailures: 12652,
       numRequests: 12652,
+      numLaggedRequests: 0,
     },
   ],
   errors: [
@@ -41,9 +41,11 @@ export const swarmReportMock: IReport = {
   duration: '1 hour, 13 minutes and 48 seconds',
   host: 'http://0.0.0.0:8089/',
   exceptionsStatistics: [],
+  listenerTimingsStatistics: [],
   requestsStatistics: [],
   failuresStatistics: [],
   responseTimeStatistics: [],
+  correctedResponseTimeStatistics: [],
   tasks: {} as ISwarmRatios,
   charts: {
     currentRps: [['', 0]],
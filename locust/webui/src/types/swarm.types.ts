@@ -8,6 +8,7 @@ import {
   IResponseTime,
   ISwarmRatios,
   ISwarmException,
+  IListenerTiming,
 } from 'types/ui.types';
 
 export interface IExtraOptionParameter extends Omit<ICustomInput, 'name' | 'label'> {
@@ -56,6 +57,7 @@ export interface ISwarmState {
   isHostRequired: boolean;
   percentilesToChart: number[];
   percentilesToStatistics: number[];
+  correctCoordinatedOmission?: boolean;
   runTime?: string | number;
   showUserclassPicker: boolean;
   spawnRate: number | null;
@@ -81,7 +83,9 @@ export interface IReport {
   requestsStatistics: ISwarmStat[];
   failuresStatistics: ISwarmError[];
   responseTimeStatistics: IResponseTime[];
+  correctedResponseTimeStatistics: IResponseTime[];
   exceptionsStatistics: ISwarmException[];
+  listenerTimingsStatistics: IListenerTiming[];
   tasks: ISwarmRatios;
 }
 
@@ -14,8 +14,10 @@ export interface ISwarmStat {
   minResponseTime: number;
   name: string;
   [key: `responseTimePercentile${number}`]: number;
+  [key: `correctedResponseTimePercentile${number}`]: number | undefined;
   numFailures: number;
   numRequests: number;
+  numLaggedRequests: number;
 }
 
 export interface ISwarmError {
@@ -39,6 +41,15 @@ export interface IResponseTime {
   [percentile: string]: string | number;
 }
 
+export interface IListenerTiming {
+  event: string;
+  listener: string;
+  calls: number;
+  totalTime: number;
+  avgTime: number;
+  maxTime: number;
+}
+
 export interface ISwarmExceptionsResponse {
   exceptions: ISwarmException[];
 }
@@ -47,6 +58,7 @@ export interface ISwarmWorker {
   cpuUsage: number;
   id: string;
   memoryUsage: number;
+  hubLagPercentile99: number;
   state: (typeof SWARM_STATE)[keyof typeof SWARM_STATE];
   userCount: number;
 }
@@ -103,6 +115,20 @@ export interface IStatsResponse {
   };
   failRatio: number;
   userCount: number;
+  hubLagPercentile99?: number;
+  droppedIterations?: number;
+  lateIterations?: number;
+  numStats?: number;
+  numErrors?: number;
+}
+
+export type StatsSort = 'name' | 'rps' | 'p95' | 'failures';
+
+export interface IStatsQuery {
+  offset: number;
+  limit: number;
+  sort: StatsSort;
+  filter: string;
 }
 
 export interface ILogsResponse {